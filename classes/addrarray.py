@@ -0,0 +1,199 @@
+######################################
+# Vectorised operations on many Address
+# Author: MattTheCoder-W
+######################################
+
+import unittest
+from typing import Union, Iterable
+
+import numpy as np
+
+from .address import Address
+from .network import Network, AddressRange
+
+
+class AddressArray:
+    """Array of IPv4 addresses stored as uint32 values (for bulk operations).
+
+    Arguments:
+        values (Iterable|np.ndarray) -- Addresses as [Address|str|int] values or array of integers.
+    """
+
+    __slots__ = ["_values"]
+
+    def __init__(self, values: Union[Iterable, np.ndarray] = ()) -> None:
+        self.values = values
+
+    @classmethod
+    def from_strings(cls, values: Iterable[str]) -> "AddressArray":
+        """Parse many addresses in "x.x.x.x" format at once."""
+        values = list(values)
+        if not values:
+            return cls()
+        if any(value.count(".") != 3 for value in values):
+            raise ValueError("Values are not correct addresses!")
+        joined = ".".join(values)
+        try:
+            octets = np.array(joined.split("."), dtype=np.int64)
+        except ValueError:
+            raise ValueError("Values are not correct addresses!")
+        if octets.min() < 0 or octets.max() > 255:
+            raise ValueError("Octet value out of range 0-255!")
+        octets = octets.reshape(-1, 4).astype(np.uint32)
+        return cls((octets[:, 0] << 24) | (octets[:, 1] << 16) | (octets[:, 2] << 8) | octets[:, 3])
+
+    @classmethod
+    def from_range(cls, addresses: AddressRange) -> "AddressArray":
+        """Create array from lazy address range (e.g. `Network.hosts`)."""
+        if not isinstance(addresses, AddressRange):
+            raise TypeError("Value should be `AddressRange` object!")
+        int_range = addresses._range
+        return cls(np.arange(int_range.start, int_range.stop, int_range.step, dtype=np.uint32))
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._values
+
+    @values.setter
+    def values(self, value: Union[Iterable, np.ndarray]) -> None:
+        if isinstance(value, np.ndarray):
+            if value.ndim != 1:
+                raise ValueError("Address array should be one-dimensional!")
+            if value.size and value.dtype != np.uint32 and (value.min() < 0 or value.max() > 0xFFFFFFFF):
+                raise ValueError("Values out of IPv4 address range!")
+            self._values = value.astype(np.uint32, copy=False)
+            return
+        if isinstance(value, AddressArray):
+            self._values = value._values.copy()
+            return
+        value = list(value)
+        if value and all(type(x) is str for x in value):
+            self._values = AddressArray.from_strings(value)._values
+            return
+        converted = []
+        for elem in value:
+            if isinstance(elem, Address):
+                converted.append(elem.value)
+            elif type(elem) is str:
+                converted.append(Address.from_str(elem).value)
+            elif type(elem) is int:
+                converted.append(Address.from_int(elem).value)
+            else:
+                raise TypeError(f"Cannot create address from type: {type(elem)}")
+        self._values = np.array(converted, dtype=np.uint32)
+
+    ### Returning specific format
+
+    def octets(self) -> np.ndarray:
+        """Return (n, 4) array of octet values."""
+        shifts = np.array([24, 16, 8, 0], dtype=np.uint32)
+        return ((self._values[:, None] >> shifts) & 0xFF).astype(np.uint8)
+
+    def to_strings(self) -> list:
+        """Format all addresses in "x.x.x.x" format."""
+        if not len(self):
+            return []
+        octets = self.octets().astype(str)
+        result = octets[:, 0]
+        for i in range(1, 4):
+            result = np.char.add(np.char.add(result, "."), octets[:, i])
+        return result.tolist()
+
+    def to_list(self) -> list:
+        """Return list of `Address` objects."""
+        return [Address.from_int(int(x)) for x in self._values]
+
+    ### Masks and networks
+
+    def apply_mask(self, mask: Address) -> "AddressArray":
+        """Return network addresses of all addresses for given mask."""
+        if not isinstance(mask, Address) or not mask.mask:
+            raise TypeError("Mask should be mask `Address` object!")
+        return AddressArray(self._values & np.uint32(mask.value))
+
+    def in_network(self, network: Network) -> np.ndarray:
+        """Return boolean array telling which addresses belong to network."""
+        if not isinstance(network, Network):
+            raise TypeError("Value should be `Network` object!")
+        mask = np.uint32(network.mask.value)
+        return (self._values & mask) == np.uint32(network.net_addr.value & network.mask.value)
+
+    def filter_network(self, network: Network) -> "AddressArray":
+        """Return only addresses that belong to network."""
+        return AddressArray(self._values[self.in_network(network)])
+
+    ### Sorting and sets
+
+    def sort(self) -> "AddressArray":
+        return AddressArray(np.sort(self._values))
+
+    def unique(self) -> "AddressArray":
+        """Return sorted array without duplicates."""
+        return AddressArray(np.unique(self._values))
+
+    def isin(self, other: "AddressArray") -> np.ndarray:
+        """Return boolean array telling which addresses are in other array."""
+        return np.isin(self._values, AddressArray._coerce(other)._values)
+
+    def union(self, other: "AddressArray") -> "AddressArray":
+        return AddressArray(np.union1d(self._values, AddressArray._coerce(other)._values))
+
+    def intersection(self, other: "AddressArray") -> "AddressArray":
+        return AddressArray(np.intersect1d(self._values, AddressArray._coerce(other)._values))
+
+    def difference(self, other: "AddressArray") -> "AddressArray":
+        return AddressArray(np.setdiff1d(self._values, AddressArray._coerce(other)._values))
+
+    @staticmethod
+    def _coerce(value: Union["AddressArray", Iterable]) -> "AddressArray":
+        return value if isinstance(value, AddressArray) else AddressArray(value)
+
+    ### Sequence protocol
+
+    def __len__(self) -> int:
+        return int(self._values.size)
+
+    def __getitem__(self, index) -> Union[Address, "AddressArray"]:
+        if isinstance(index, (int, np.integer)):
+            return Address.from_int(int(self._values[index]))
+        return AddressArray(self._values[index])
+
+    def __iter__(self):
+        for value in self._values.tolist():
+            yield Address.from_int(value)
+
+    def __contains__(self, addr: Address) -> bool:
+        if not isinstance(addr, Address):
+            return False
+        return bool((self._values == np.uint32(addr.value)).any())
+
+    def __str__(self) -> str:
+        return f"[{', '.join(self.to_strings())}]"
+
+
+class AddressArrayTest(unittest.TestCase):
+    def test_parsing(self):
+        arr = AddressArray.from_strings(["192.168.1.20", "10.0.0.1"])
+        self.assertEqual(arr.to_strings(), ["192.168.1.20", "10.0.0.1"], "Wrong batch parsing")
+        self.assertEqual(arr[0], Address("192.168.1.20"), "Wrong item conversion")
+        self.assertRaises(ValueError, AddressArray.from_strings, ["10.0.0.256"])
+        self.assertRaises(ValueError, AddressArray.from_strings, ["10.0.0"])
+
+    def test_network(self):
+        arr = AddressArray(["192.168.1.20", "192.168.2.1", Address("192.168.1.1")])
+        net = Network(Address("192.168.1.0"), Address(24))
+        self.assertEqual(arr.filter_network(net).to_strings(), ["192.168.1.20", "192.168.1.1"], "Wrong network filter")
+        self.assertEqual(arr.apply_mask(Address(16)).unique().to_strings(), ["192.168.0.0"], "Wrong mask applying")
+        self.assertEqual(len(AddressArray.from_range(net.hosts)), 254, "Wrong range conversion")
+
+    def test_sets(self):
+        first = AddressArray(["10.0.0.3", "10.0.0.1", "10.0.0.3"])
+        second = AddressArray(["10.0.0.1", "10.0.0.2"])
+        self.assertEqual(first.unique().to_strings(), ["10.0.0.1", "10.0.0.3"], "Wrong unique")
+        self.assertEqual(first.difference(second).to_strings(), ["10.0.0.3"], "Wrong difference")
+        self.assertEqual(first.intersection(second).to_strings(), ["10.0.0.1"], "Wrong intersection")
+        self.assertEqual(len(first.union(second)), 3, "Wrong union")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,70 +4,123 @@
 #################################
 
 import os
-import copy
 import socket
+import unittest
 from typing import Union, TypeVar
 
-from .binary import binary_sum, binary_sub
-from .octet import Octet
-
 # Custom types
 TAddress = TypeVar("TAddress", bound="Address")
 TOctet = TypeVar("TOctet", bound="Octet")
 
+MAX_VALUE = 0xFFFFFFFF  # Highest 32-bit address value (255.255.255.255)
+
+
+def prefix_to_int(prefix: int) -> int:
+    """Return 32-bit integer value of mask with `prefix` leading ones."""
+    if prefix not in range(0, 33):
+        raise ValueError(f"Mask prefix out of range 0-32! Got: {prefix}")
+    return (MAX_VALUE << (32 - prefix)) & MAX_VALUE
+
+
+def is_mask_int(value: int) -> bool:
+    """Check if 32-bit integer is a mask (ones followed only by zeros)."""
+    inverted = ~value & MAX_VALUE
+    return inverted & (inverted + 1) == 0
+
 
 class Address:
     """Class for representation of IPv4 Address.
 
+    Address is stored as a single 32-bit integer, octets are built on demand.
+
     Arguments:
         octets (str|int|list) -- Octet values of address
-            str -- "x.x.x.x" format
-            int -- 0-30 format (for masks)
+            str -- "x.x.x.x" format (or 32-bit binary string)
+            int -- 0-32 format (for masks)
             list -- list of 4 values in [Octet|str|int] format
     """
 
-    _octets = []  # List for octet values
-    _mask = False  # Mask mode flag
-    
+    __slots__ = ["_value", "_mask"]
+
     def __init__(self, octets: Union[str, int, list]) -> None:
+        self._mask = False  # Mask mode flag
         self.octets = octets
-    
+
+    @classmethod
+    def from_int(cls, value: int) -> TAddress:
+        """Create address from 32-bit integer value."""
+        if value < 0 or value > MAX_VALUE:
+            raise ValueError(f"Value {value} is out of IPv4 address range!")
+        addr = cls.__new__(cls)
+        addr._value = value
+        addr._mask = is_mask_int(value)
+        return addr
+
+    @classmethod
+    def from_str(cls, value: str) -> TAddress:
+        """Create address from string in "x.x.x.x" format."""
+        parts = value.split(".")
+        if len(parts) != 4:
+            raise ValueError(f"Value {value} is not correct address!")
+        result = 0
+        for part in parts:
+            octet = int(part)
+            if octet < 0 or octet > 255:
+                raise ValueError(f"Octet value out of range 0-255! Got: {octet}")
+            result = (result << 8) | octet
+        return cls.from_int(result)
+
+    @classmethod
+    def from_prefix(cls, prefix: int) -> TAddress:
+        """Create mask address from prefix length (0-32)."""
+        addr = cls.from_int(prefix_to_int(prefix))
+        addr._mask = True
+        return addr
+
+    @property
+    def value(self) -> int:
+        """Return address as 32-bit integer."""
+        return self._value
+
     @property
     def octets(self) -> list:
-        return self._octets
-    
+        return [Octet((self._value >> shift) & 0xFF) for shift in (24, 16, 8, 0)]
+
     @octets.setter
     def octets(self, value: Union[str, int, list]) -> None:
-        if type(value) is int or (type(value) is str and value.isnumeric() and int(value) in range(0, 31)):
-            value = int(value)
-            value = [f"{'1'*value}{'0'*(32-value)}"[x*8:(x+1)*8] for x in range(4)]
+        if type(value) is int or (type(value) is str and value.isnumeric() and int(value) in range(0, 33)):
+            self._value = prefix_to_int(int(value))
             self._mask = True
+            return
         elif type(value) is str:
             if "." in value:
                 if value.count(".") != 3:
                     raise ValueError(f"Value {value} is not correct address!")
                 value = value.split(".")
             else:
-                if len(value) != 32:
+                if len(value) != 32 or value.count("1") + value.count("0") != 32:
                     raise ValueError(f"Value {value} is not correct address!")
-                value = [value[x*8:(x+1)*8] for x in range(4)]
-        
+                self._value = int(value, 2)
+                self._mask = self._mask or is_mask_int(self._value)
+                return
+
         if type(value) is not list:
             raise ValueError(f"Cannot create address from type: {type(value)}")
-        
-        if all([True if isinstance(x, Octet) else False for x in value]):
-            self._octets = value
-        else:
-            self._octets = [Octet(x) for x in value]
+        if len(value) != 4:
+            raise ValueError(f"Address should have 4 octets! Got: {len(value)}")
 
-        if not self._mask:
-            if "01" not in self.get_binary():
-                self._mask = True
+        result = 0
+        for octet in value:
+            if not isinstance(octet, Octet):
+                octet = Octet(octet)
+            result = (result << 8) | int(octet)
+        self._value = result
+        self._mask = self._mask or is_mask_int(result)
 
     @property
     def mask(self) -> bool:
         return self._mask
-    
+
     @mask.setter
     def mask(self, value: bool) -> None:
         if type(value) is not bool:
@@ -76,62 +129,62 @@ class Address:
 
     def get_binary(self) -> str:
         """Return binary representation of address in 32-bit binary string format."""
-        return f"{self._octets[0].get_binary()}{self._octets[1].get_binary()}{self._octets[2].get_binary()}{self._octets[3].get_binary()}"
+        return format(self._value, "032b")
 
     def increment_with_difference_mask(self, difference_mask: TAddress, value = 1) -> TAddress:
         """Increment address using difference mask (used for calculating sub-network addresses)."""
         if not isinstance(difference_mask, type(self)):
             raise TypeError("Difference mask should be `Address` object")
-        str_addr = ''.join(self.get_binary())
+        diff = difference_mask._value
+        if diff == 0:
+            return Address.from_int(self._value)
+        shift = (diff & -diff).bit_length() - 1
+        field = (((self._value & diff) >> shift) + value) & (diff >> shift)
+        return Address.from_int((self._value & ~diff & MAX_VALUE) | (field << shift))
 
-        mask = difference_mask.get_binary()
-        start, end = [mask.find("1"), mask.rfind("1")+1]
-        str_part = binary_sum(str_addr[start:end], str(bin(value))[2:])
-        str_addr = f"{str_addr[:start]}{str_part}{str_addr[end:]}"
-
-        return Address(str_addr)
-    
     ### Returning specific format
 
     def __str__(self) -> str:
-        return f"{self._octets[0]}.{self._octets[1]}.{self._octets[2]}.{self._octets[3]}"
-    
+        value = self._value
+        return f"{value >> 24}.{(value >> 16) & 0xFF}.{(value >> 8) & 0xFF}.{value & 0xFF}"
+
     def __int__(self) -> int:
         if not self._mask:
             raise NotImplementedError("Cannot represent not mask as integer")
-        return self.get_binary().count("1")
-    
+        return 32 - ((~self._value & MAX_VALUE).bit_length())
+
     def __bool__(self) -> bool:
         return True if os.system(f"ping -c 1 -W 0.2 {str(self)} > /dev/null") == 0 else False
-    
+
+    def __hash__(self) -> int:
+        return self._value
+
     ### Comparing
 
     def __gt__(self, other: TAddress) -> bool:
         if isinstance(other, Address):
-            sum_other = int(other.get_binary(), 2)
-            return int(self.get_binary(), 2) > sum_other
-        else:
-            raise TypeError(f"Cannot compare Address with {type(other)}")
+            return self._value > other._value
+        raise TypeError(f"Cannot compare Address with {type(other)}")
 
     def __lt__(self, other: TAddress) -> bool:
         if isinstance(other, Address):
-            sum_other = int(other.get_binary(), 2)
-            return int(self.get_binary(), 2) < sum_other
-        else:
-            raise TypeError(f"Cannot compare Address with {type(other)}")
-    
+            return self._value < other._value
+        raise TypeError(f"Cannot compare Address with {type(other)}")
+
     def __eq__(self, other: TAddress) -> bool:
         if isinstance(other, Address):
-            sum_other = int(other.get_binary(), 2)
-            return int(self.get_binary(), 2) == sum_other
-        else:
-            raise TypeError(f"Cannot compare Address with {type(other)}")
-    
+            return self._value == other._value
+        raise TypeError(f"Cannot compare Address with {type(other)}")
+
     def __ge__(self, other: TAddress) -> bool:
-        return self > other or self == other
-    
+        if isinstance(other, Address):
+            return self._value >= other._value
+        raise TypeError(f"Cannot compare Address with {type(other)}")
+
     def __le__(self, other: TAddress) -> bool:
-        return self < other or self == other
+        if isinstance(other, Address):
+            return self._value <= other._value
+        raise TypeError(f"Cannot compare Address with {type(other)}")
 
     def __ne__(self, other: TAddress) -> bool:
         return not self == other
@@ -141,30 +194,18 @@ class Address:
     def __add__(self, other: int) -> TAddress:
         if type(other) is not int:
             raise TypeError(f"Cannot add value of type `{type(other)}` to Address")
-        new_octets = copy.copy(self._octets)
-        new_octets[-1] += other
-        while max(new_octets) > 255:
-            for i in range(len(new_octets)):
-                if new_octets[i] > 255:
-                    if i-1 < 0:
-                        raise ValueError(f"Cannot add {other} to {str(self)}! Value is too high!")
-                    new_octets[i-1] += 1
-                    new_octets[i] -= 255
-        return Address(new_octets)
-    
+        value = self._value + other
+        if value > MAX_VALUE or value < 0:
+            raise ValueError(f"Cannot add {other} to {str(self)}! Value is too high!")
+        return Address.from_int(value)
+
     def __sub__(self, other: int) -> TAddress:
         if type(other) is not int:
             raise TypeError(f"Cannot add value of type `{type(other)}` to Address")
-        new_octets = copy.copy(self._octets)
-        new_octets[-1] -= other
-        while min(new_octets) < 0:
-            for i in range(len(new_octets)):
-                if new_octets[i] < 0:
-                    if i-1 < 0:
-                        raise ValueError(f"Cannot substract {other} from {str(self)}! Value is too high!")
-                    new_octets[i-1] -= 1
-                    new_octets[i] += 255
-        return Address(new_octets)
+        value = self._value - other
+        if value < 0 or value > MAX_VALUE:
+            raise ValueError(f"Cannot substract {other} from {str(self)}! Value is too high!")
+        return Address.from_int(value)
 
 
 class Port:
@@ -178,11 +219,11 @@ class Port:
     def __init__(self, addr: Address, value: int):
         self.value = value
         self.addr = addr
-    
+
     @property
     def value(self) -> int:
         return self._value
-    
+
     @value.setter
     def value(self, value: int) -> None:
         if not isinstance(value, int):
@@ -191,17 +232,17 @@ class Port:
         if value not in range(0, 65536):
             raise ValueError("Port number out of range!")
         self._value = value
-    
+
     @property
     def addr(self) -> Address:
         return self._addr
-    
+
     @addr.setter
     def addr(self, value: Address) -> None:
         if not isinstance(value, Address):
             raise TypeError("Address should be an `Address` object!")
         self._addr = value
-    
+
     def _check_state(self) -> bool:
         """Check if Port is up in network.
 
@@ -216,10 +257,10 @@ class Port:
 
     def __int__(self) -> int:
         return self._value
-    
+
     def __bool__(self) -> bool:
         return True if bool(self._addr) and self._check_state() else False
-    
+
     def __str__(self) -> str:
         return f"{self.addr}:{self.value}"
 
@@ -232,17 +273,16 @@ class Octet:
         ignore_range [opt] (bool) -- Allow for value out of 0-255 range (Default: False).
     """
 
-    _value = 0
-    _ignore_range = False
+    __slots__ = ["_value", "_ignore_range"]
 
     def __init__(self, value: Union[int, str], ignore_range: bool = False) -> None:
         self._ignore_range = ignore_range
         self.value = value
-    
+
     @property
     def value(self) -> int:
-        return int(self.value)
-    
+        return self._value
+
     @value.setter
     def value(self, value: Union[int, str]) -> None:
         if type(value) is str and Octet._check_binary(value):
@@ -250,10 +290,10 @@ class Octet:
         else:
             value = int(value)
 
-        if value not in range(0, 256) and not self._ignore_range:
+        if (value < 0 or value > 255) and not self._ignore_range:
             raise ValueError(f"Octet value out of range 0-255! Got: {value}, ignore_range: {self._ignore_range}")
         self._value = value
-    
+
     @staticmethod
     def _check_binary(value: str) -> bool:
         """Check if value is 8-bit binary."""
@@ -261,14 +301,17 @@ class Octet:
 
     def get_binary(self) -> str:
         """Return binary representation of octet value."""
-        return str(format(self._value, "#010b")[2:])
-    
+        return format(self._value, "08b")
+
     def __int__(self) -> int:
-        return int(self._value)
-    
+        return self._value
+
     def __str__(self) -> str:
         return str(self._value)
 
+    def __hash__(self) -> int:
+        return self._value
+
     ### Comparing
 
     def __gt__(self, other: Union[int, TOctet]) -> bool:
@@ -277,30 +320,30 @@ class Octet:
         elif type(other) is int:
             return self._value > other
         else:
-            raise TypeError(f"Cannot compare Octet with {type(value)}!")
-    
+            raise TypeError(f"Cannot compare Octet with {type(other)}!")
+
     def __lt__(self, other: Union[int, TOctet]) -> bool:
         if isinstance(other, Octet):
             return self._value < other._value
         elif type(other) is int:
             return self._value < other
         else:
-            raise TypeError(f"Cannot compare Octet with {type(value)}!")
+            raise TypeError(f"Cannot compare Octet with {type(other)}!")
 
     def __ge__(self, other: Union[int, TOctet]) -> bool:
         return self > other or self == other
-    
+
     def __le__(self, other: Union[int, TOctet]) -> bool:
         return self < other or self == other
-    
+
     def __eq__(self, other: Union[int, TOctet]) -> bool:
         if isinstance(other, Octet):
             return self._value == other._value
         elif type(other) is int:
             return self._value == other
         else:
-            raise TypeError(f"Cannot compare Octet with {type(value)}!")
-    
+            raise TypeError(f"Cannot compare Octet with {type(other)}!")
+
     def __ne__(self, other: Union[int, TOctet]) -> bool:
         return not self == other
 
@@ -310,10 +353,41 @@ class Octet:
         if type(other) is not int:
             raise TypeError(f"Cannot add value of type `{type(other)}` to octet!")
         return Octet(int(self) + other, ignore_range=True)
-    
+
     def __sub__(self, other: Union[int, TOctet]) -> TOctet:
         if isinstance(other, Octet):
             other = int(other)
         if type(other) is not int:
             raise TypeError(f"Cannot substract value of type `{type(other)}` from octet!")
         return Octet(int(self) - other, ignore_range=True)
+
+
+class AddressTest(unittest.TestCase):
+    def test_parsing(self):
+        self.assertEqual(str(Address("192.168.1.20")), "192.168.1.20", "Wrong address parsing")
+        self.assertEqual(Address("192.168.1.20"), Address.from_str("192.168.1.20"), "Wrong address parsing")
+        self.assertEqual(Address("11000000101010000000000100010100").value, 0xC0A80114, "Wrong binary parsing")
+        self.assertEqual(str(Address(["10", 0, Octet(1), "00000010"])), "10.0.1.2", "Wrong list parsing")
+        self.assertRaises(ValueError, Address.from_str, "192.168.1.256")
+
+    def test_mask(self):
+        self.assertEqual(str(Address(24)), "255.255.255.0", "Wrong mask from prefix")
+        self.assertEqual(int(Address("255.255.240.0")), 20, "Wrong mask prefix")
+        self.assertTrue(Address.from_prefix(32).mask, "Prefix address is not mask")
+        self.assertFalse(Address("192.168.1.0").mask, "Address wrongly detected as mask")
+
+    def test_math(self):
+        self.assertEqual(str(Address("10.0.0.255") + 1), "10.0.1.0", "Wrong address carry")
+        self.assertEqual(str(Address("10.0.1.0") - 1), "10.0.0.255", "Wrong address borrow")
+        self.assertRaises(ValueError, lambda: Address("255.255.255.255") + 1)
+        diff = Address("0.0.3.0")
+        self.assertEqual(str(Address("10.0.1.0").increment_with_difference_mask(diff)), "10.0.2.0",
+                         "Wrong difference mask increment")
+
+    def test_ordering(self):
+        self.assertLess(Address("10.0.0.2"), Address("10.0.1.1"), "Wrong address ordering")
+        self.assertEqual(len({Address("10.0.0.1"), Address.from_int(0x0A000001)}), 1, "Wrong address hashing")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,295 @@
+#############################################
+# Benchmarks of addressing, discovery, auth and configuration
+# Author: MattTheCoder-W
+#############################################
+
+import os
+import gc
+import json
+import time
+import random
+import asyncio
+import platform
+import unittest
+import tempfile
+import tracemalloc
+from collections import namedtuple
+from typing import Callable, Iterator
+
+from .address import Address
+from .network import Network
+from .finder import Finder
+from .sshtools import PasswordFinder
+from .sysconfig import SystemConfig, sample_config
+from .profile import Profile
+from .simulator import Simulator
+
+# Result of one benchmark, latencies are seconds per call of measured function (call = `ops` operations)
+Result = namedtuple("Result", ["name", "ops_per_sec", "p50", "p99", "peak_memory", "rounds", "note"])
+Result.__new__.__defaults__ = (None,)
+
+SUITE = ["address_parse", "address_math", "network_addresses", "sub_networks", "sysconfig", "finder_sweep",
+         "password_search", "configure_device"]
+BENCH_PROFILE = {"dns": ["91.232.50.10", "91.232.52.10"], "ntp": "91.232.52.123", "timezone": "-1",
+                 "snmp": {"community": "local", "contact": "bench@example.com", "location": "Bench"},
+                 "compliance_test": False}
+
+
+def percentile(values: list, q: float) -> float:
+    """Return q-th percentile (0-100) of values using nearest rank."""
+    if not values:
+        raise ValueError("No values!")
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))  # Ceiling without float rounding
+    return ordered[int(rank) - 1]
+
+
+def measure(name: str, func: Callable, rounds: int, ops: int = 1, setup: Callable = None,
+            min_round_time: float = 0.01) -> Result:
+    """Time `func` and record peak memory of one extra call.
+
+    Fast functions are called several times per round, so every round
+    takes at least `min_round_time` and timer resolution or scheduler
+    hiccups do not dominate results. Memory is measured in separate call,
+    because `tracemalloc` slows allocation-heavy code several times and
+    would distort timings.
+
+    Arguments:
+        name (str) -- Benchmark name.
+        func (Callable) -- Measured function, called without arguments.
+        rounds (int) -- Number of timed rounds.
+        ops [opt] (int) -- Operations done by one call (Default: 1).
+        setup [opt] (Callable) -- Called before every call, outside of timing (Default: None).
+        min_round_time [opt] (float) -- Minimal round time in seconds for functions without setup (Default: 0.01).
+    """
+    if rounds < 1:
+        raise ValueError("At least one round is required!")
+    if setup is not None:
+        setup()
+    start = time.perf_counter()
+    func()  # Warm up caches and measure single call
+    elapsed = time.perf_counter() - start
+    repeat = 1 if setup is not None or elapsed >= min_round_time else int(min_round_time / max(elapsed, 1e-7)) + 1
+
+    latencies = []  # Seconds per call
+    gc_enabled = gc.isenabled()
+    gc.disable()  # Collector pauses land in random rounds and only add noise to p99
+    try:
+        for _ in range(rounds):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            for _ in range(repeat):
+                func()
+            latencies.append((time.perf_counter() - start) / repeat)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    total = sum(latencies)
+    return Result(name, ops * rounds / total if total else float("inf"), percentile(latencies, 50),
+                  percentile(latencies, 99), peak, rounds)
+
+
+# Benchmarks ================================================================
+
+def bench_address_parse(quick: bool = False) -> Iterator[Result]:
+    rng = random.Random(1)
+    strings = [".".join(str(rng.randrange(256)) for _ in range(4)) for _ in range(1000)]
+    yield measure("address_parse", lambda: [Address(s) for s in strings], rounds=5 if quick else 50, ops=len(strings))
+    yield measure("address_str", lambda: [str(Address.from_int(v)) for v in range(1000)], rounds=5 if quick else 50,
+                  ops=1000)
+
+
+def bench_address_math(quick: bool = False) -> Iterator[Result]:
+    addr, other = Address("10.0.0.1"), Address("10.200.0.1")
+
+    def math():
+        for i in range(1000):
+            (addr + i) < other
+    yield measure("address_math", math, rounds=5 if quick else 50, ops=1000)
+
+
+def bench_network_addresses(quick: bool = False) -> Iterator[Result]:
+    """Iterate addresses of /24, /16 and /8 (/8 only first 65536 addresses, whole one takes minutes)."""
+    for prefix in (24, 16, 8):
+        network = Network(Address("10.0.0.0"), Address(prefix))
+        count = min(len(network.addresses), 1 << 16)
+        yield measure(f"network_addresses_/{prefix}", lambda: [addr for addr in network.addresses[:count]],
+                      rounds=2 if quick else (20 if prefix == 24 else 5), ops=count)
+
+
+def bench_sub_networks(quick: bool = False) -> Iterator[Result]:
+    """Split /24, /16 and /8 into 256 sub networks each."""
+    for prefix in (24, 16, 8):
+        network = Network(Address("10.0.0.0"), Address(prefix))
+        mask = Address(prefix + 8)
+        yield measure(f"sub_networks_/{prefix}", lambda: list(network.get_sub_networks(mask)),
+                      rounds=5 if quick else 50, ops=256)
+
+
+def bench_sysconfig(quick: bool = False) -> Iterator[Result]:
+    data = sample_config()
+
+    def round_trip():
+        cfg = SystemConfig(data)
+        cfg["system.timezone"] = "GMT-1"
+        cfg.to_bytes()
+    yield measure("sysconfig_round_trip", round_trip, rounds=10 if quick else 200)
+
+
+def bench_finder_sweep(quick: bool = False) -> Iterator[Result]:
+    """Sweep loopback /22 (every address answers) in `icmp` mode, ops are swept hosts."""
+    finder = Finder(Address("127.0.0.0"), Address(22), mode="icmp", timeout=0.05, rate=100000)
+    hosts = len(finder.network.hosts)
+
+    def sweep():
+        finder.found = []
+        asyncio.run(finder._sweep(lambda _: None))
+    try:
+        sweep()
+    except PermissionError:
+        yield Result("finder_sweep_/22", None, None, None, None, 0, "skipped: ICMP sockets are not allowed")
+        return
+    yield measure("finder_sweep_/22", sweep, rounds=2 if quick else 10, ops=hosts)
+
+
+def bench_password_search(quick: bool = False) -> Iterator[Result]:
+    """Search password on simulated device, correct one is last of 6 candidates (ops are attempts)."""
+    candidates = [f"wrong{i}" for i in range(5)] + ["ubnt"]
+    with Simulator(1, first="127.0.0.1", port=0, max_auth_tries=len(candidates)) as sim:
+        device = sim.devices[0]
+
+        def search():
+            finder = PasswordFinder(device.addr, "ubnt", port=device.port)
+            passwd, transport = finder.find(candidates)
+            transport.close()
+            if passwd != "ubnt":
+                raise RuntimeError("Password was not found")
+        yield measure("password_search", search, rounds=3 if quick else 20, ops=len(candidates))
+
+
+def bench_configure_device(configure: Callable, quick: bool = False) -> Iterator[Result]:
+    """Configure simulated device from scratch (`configure_device` of `setup-dev-oop.py`)."""
+    with Simulator(1, first="127.0.0.1", port=0) as sim:
+        device = sim.devices[0]
+        factory = device.read("/tmp/system.cfg")
+        patch = Profile(BENCH_PROFILE).patch_for(device.addr)
+
+        def reset():
+            device.write("/tmp/system.cfg", factory)
+
+        def run():
+            outcome, message = configure(device.addr, "ubnt", "ubnt", patch, port=device.port)
+            if outcome != "configured":
+                raise RuntimeError(f"Configuration failed: {message}")
+        yield measure("configure_device", run, rounds=3 if quick else 30, setup=reset)
+
+
+def run_suite(names: list = None, quick: bool = False, configure: Callable = None) -> Iterator[Result]:
+    """Run benchmarks (all from `SUITE` by default) and yield their results.
+
+    Arguments:
+        names [opt] (list) -- Benchmarks to run (Default: all).
+        quick [opt] (bool) -- Few rounds only, for checking that benchmarks work (Default: False).
+        configure [opt] (Callable) -- `configure_device` function, `configure_device` benchmark is skipped without it.
+    """
+    for name in names or SUITE:
+        if name not in SUITE:
+            raise ValueError(f"Unknown benchmark: {name}! Available: {', '.join(SUITE)}")
+        if name == "configure_device":
+            if configure is None:
+                yield Result(name, None, None, None, None, 0, "skipped: no configure function")
+            else:
+                yield from bench_configure_device(configure, quick)
+        else:
+            yield from globals()[f"bench_{name}"](quick)
+
+
+# Baseline ==================================================================
+
+def save_baseline(path: str, results: list) -> None:
+    data = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "time": time.time(),
+        "results": {r.name: r._asdict() for r in results if r.ops_per_sec is not None},
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def load_baseline(path: str) -> dict:
+    """Return {name: Result} from baseline file (empty when file does not exist)."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        data = json.load(f)
+    return {name: Result(**result) for name, result in data["results"].items()}
+
+
+def compare(result: Result, baseline: dict, tolerance: float = 0.25) -> tuple:
+    """Compare result with baseline.
+
+    Ratio is computed from median round time, which (unlike mean
+    throughput) is not moved by few rounds slowed down by other processes.
+
+    Returns:
+        tuple -- (throughput ratio to baseline or None, True when throughput dropped more than `tolerance`)
+    """
+    base = baseline.get(result.name)
+    if base is None or result.p50 is None or not base.p50:
+        return None, False
+    ratio = base.p50 / result.p50
+    return ratio, ratio < 1 - tolerance
+
+
+def format_result(result: Result, ratio: float = None, regressed: bool = False) -> str:
+    if result.ops_per_sec is None:
+        return f"{result.name:<24} {result.note}"
+    line = (f"{result.name:<24} {result.ops_per_sec:>14,.1f} ops/s  p50 {result.p50 * 1000:>9.3f} ms  "
+            f"p99 {result.p99 * 1000:>9.3f} ms  peak {result.peak_memory / 1024:>9.1f} KiB")
+    if ratio is not None:
+        line += f"  {ratio:>6.2f}x baseline" + ("  REGRESSION" if regressed else "")
+    return line
+
+
+class BenchmarkTest(unittest.TestCase):
+    def test_measure(self):
+        self.assertEqual(percentile([3, 1, 2, 4], 50), 2, "Wrong median")
+        self.assertEqual(percentile([3, 1, 2, 4], 99), 4, "Wrong 99th percentile")
+        calls = []
+        result = measure("sleep", lambda: time.sleep(0.001), rounds=5, ops=10, setup=lambda: calls.append(1))
+        self.assertEqual(len(calls), 7, "Setup not called before every call")
+        self.assertGreater(measure("fast", lambda: None, rounds=2).p50, 0, "Fast function not timed")
+        self.assertLess(result.ops_per_sec, 10 / 0.001, "Throughput too high")
+        self.assertLessEqual(result.p50, result.p99, "Percentiles out of order")
+        result = measure("alloc", lambda: bytearray(1 << 20), rounds=1)
+        self.assertGreaterEqual(result.peak_memory, 1 << 20, "Peak memory not measured")
+
+    def test_baseline(self):
+        results = list(run_suite(["address_math", "sub_networks"], quick=True))
+        self.assertEqual(len(results), 4, "Missing results")
+        with tempfile.TemporaryDirectory() as path:
+            save_baseline(os.path.join(path, "baseline.json"), results)
+            baseline = load_baseline(os.path.join(path, "baseline.json"))
+        self.assertEqual(baseline["address_math"], results[0], "Baseline not saved")
+        slow = results[0]._replace(p50=results[0].p50 * 2)
+        self.assertEqual(compare(slow, baseline), (0.5, True), "Regression not detected")
+        self.assertEqual(compare(results[0], baseline), (1.0, False), "Same result reported as regression")
+        self.assertEqual(compare(results[0], {}), (None, False), "Result without baseline compared")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+#############################################
+# Ubiquiti device configuration editor
+# Author: MattTheCoder-W
+#############################################
+
+import shlex
+from collections.abc import MutableMapping
+
+from .address import Address
+from .connector import Executor
+from .passhash import password_hash
+
+COMPLIANCE_TEST_FLAG = "/etc/persistent/ct"  # Compliance test is enabled while this file exists
+
+
+class Configurator:
+    """Edit ubiquiti device configuration.
+
+    This class does not upload configuration onto device!
+    It only modify downloaded configuration.
+
+    Arguments:
+        cfg (dict or SystemConfig) -- Configuration from ubnt device.
+
+    Methods:
+        diff -- Changes made to downloaded configuration
+        apply -- Merge compiled profile settings
+        pending_commands -- Queued commands which still change device
+        set_dns -- Set DNS addresses
+        set_snmp -- Set SNMP info
+        set_ntp -- Set NTP address
+        set_timezone -- Set device timezone
+        change_passwd -- Change ubnt user password
+        enable_compliance_test -- Enable compliance test
+        disable_compliance_test -- Disable compliance test
+        set_hostname -- Set device hostname
+        change_language -- Change device Web Configuration language
+    """
+
+    languages = ["pl_PL", "en_US"]  # Supported languages
+    
+    def __init__(self, cfg: dict) -> None:
+        self.cfg = cfg
+        self.original = dict(cfg)  # Configuration as downloaded, for `diff`
+        self.commands = []  # Commands waiting for `Executor.exec_batch` (when no Executor was given)
+
+    @property
+    def cfg(self) -> MutableMapping:
+        """Device configuration -- {property_name: property_value}"""
+        return self._cfg
+ 
+    @cfg.setter
+    def cfg(self, value: MutableMapping) -> None:
+        if not isinstance(value, MutableMapping):
+            raise TypeError("Configuration must be dictionary or `SystemConfig`!")
+        self._cfg = value
+
+    def diff(self) -> dict:
+        """Return changes made to downloaded configuration -- {property_name: (old_value, new_value)}.
+
+        Value is None for added (old) or removed (new) properties.
+        """
+        changes = {key: (self.original.get(key), value) for key, value in self.cfg.items()
+                   if self.original.get(key) != value}
+        changes.update({key: (value, None) for key, value in self.original.items() if key not in self.cfg})
+        return changes
+
+    def apply(self, patch: dict, commands: list = ()) -> None:
+        """Merge compiled settings (e.g. from `Profile.patch_for`) and queue their commands."""
+        for key, value in patch.items():
+            self.cfg[key] = value
+        self.commands.extend(commands)
+
+    def pending_commands(self, compliance_test: bool) -> list:
+        """Return queued commands without compliance test command when flag already has wanted state.
+
+        Arguments:
+            compliance_test (bool) -- Current state of compliance test flag on device.
+        """
+        done = f"touch {COMPLIANCE_TEST_FLAG}" if compliance_test else f"rm -f {COMPLIANCE_TEST_FLAG}"
+        return [cmd for cmd in self.commands if cmd != done]
+
+    @property
+    def changed(self) -> bool:
+        """Return True when configuration differs from downloaded one."""
+        return self.cfg != self.original
+
+    def set_dns(self, dns1: Address, dns2: Address = None) -> None:
+        """Set DNS addresses (only one is required)."""
+        self.cfg["resolv.nameserver.1.ip"] = str(dns1)
+        self.cfg["resolv.nameserver.1.status"] = "enabled"
+        if dns2 is not None:
+            self.cfg["resolv.nameserver.2.status"] = "enabled"
+            self.cfg["resolv.nameserver.2.ip"] = str(dns2)
+
+    def set_snmp(self, community: str, contact: str, location: str) -> None:
+        """Set SNMP related information."""
+        self.cfg["snmp.status"] = "enabled"
+        self.cfg["snmp.community"] = community
+        self.cfg["snmp.contact"] = contact
+        self.cfg["snmp.location"] = location
+
+    def set_ntp(self, addr: Address) -> None:
+        """Set NTP address."""
+        self.cfg["ntpclient.status"] = "enabled"
+        self.cfg["ntpclient.1.status"] = "enabled"
+        self.cfg["ntpclient.1.server"] = str(addr)
+
+    def set_timezone(self, number: str) -> None:
+        """Set timezone in `GMTX` format."""
+        self.cfg["system.timezone"] = f"GMT{number}"
+
+    def change_passwd(self, uname: str, new_password: str, airos: Executor = None, salt: str = None) -> None:
+        """Change password of ubnt user in system configuration.
+
+        Password hash (MD5-crypt) is computed locally and written to
+        `users.1.password` field (permanent after `cfgmtd -w`). Running
+        system gets the same hash in `/etc/passwd` with `sed` command
+        (executed now or queued for batch execution).
+
+        Parameters:
+            uname (str) -- Account username on device.
+            new_password (str) -- New password.
+            airos [opt] (Executor) -- Executor class object with active connection (Default: queue command).
+            salt [opt] (str) -- Salt for hash (Default: random salt, drawn once per run).
+        """
+        passwd_hash = password_hash(new_password, salt)
+        self.cfg['users.1.password'] = passwd_hash  # Apply hash in configuration
+        expression = f"s|^{uname}:[^:]*:|{uname}:{passwd_hash}:|"
+        self._run(f"sed -i {shlex.quote(expression)} /etc/passwd", airos)
+
+    def _run(self, cmd: str, airos: Executor = None) -> None:
+        """Execute command now or queue it for batch execution."""
+        if airos is None:
+            self.commands.append(cmd)
+        else:
+            airos.exec(cmd)
+
+    def enable_compliance_test(self, airos: Executor = None) -> None:
+        """Enable Compliance Test."""
+        self._run(f"touch {COMPLIANCE_TEST_FLAG}", airos)
+        self.cfg['radio.1.countrycode'] = "511"
+        self.cfg['radio.countrycode'] = "511"
+        self.cfg['radio.1.dfs.status'] = "disabled"
+    
+    def disable_compliance_test(self, airos: Executor = None) -> None:
+        """Disable Compliance Test"""
+        self._run(f"rm -f {COMPLIANCE_TEST_FLAG}", airos)
+        self.cfg['radio.1.countrycode'] = "616"
+        self.cfg['radio.countrycode'] = "616"
+        self.cfg['radio.1.dfs.status'] = "enabled"
+
+    def set_hostname(self, hostname: str) -> None:
+        """Set device hostname."""
+        self.cfg["resolv.host.1.status"] = "enabled"
+        self.cfg["resolv.host.1.name"] = hostname
+    
+    def change_language(self, language: str) -> None:
+        """Change device Web Configuration language."""
+        if language not in self.languages:
+            print("Language not in language list!")
+            return
+        self.cfg["gui.language"] = language
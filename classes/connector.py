@@ -1,5 +1,139 @@
-from paramiko import SSHClient
-from paramiko import AutoAddPolicy
+import io
+import os
+import re
+import time
+import shlex
+import socket
+import select
+import hashlib
+import secrets
+import threading
+import unittest
+from contextlib import contextmanager
+from collections import namedtuple
+
+from paramiko import Transport
+from paramiko import HostKeys
+from paramiko import SFTPClient
+from paramiko.ssh_exception import SSHException, BadHostKeyException, BadAuthenticationType
+
+CommandResult = namedtuple("CommandResult", ["command", "out", "err", "status"])  # Result of one command from batch
+
+_host_keys = None  # System host keys, parsed once per process
+_host_keys_lock = threading.Lock()
+
+
+def system_host_keys() -> HostKeys:
+    """Return system host keys (`~/.ssh/known_hosts`), file is parsed only on first call."""
+    global _host_keys
+    with _host_keys_lock:
+        if _host_keys is None:
+            _host_keys = HostKeys()
+            path = os.path.expanduser("~/.ssh/known_hosts")
+            if os.path.exists(path):
+                try:
+                    _host_keys.load(path)
+                except IOError:
+                    pass
+        return _host_keys
+
+
+class OutputStream:
+    """Output of remote command read while it arrives.
+
+    Iterating yields stdout lines (str) or raw chunks (bytes). Stdout and
+    stderr are drained together, so command writing a lot to stderr cannot
+    stall on full channel window. Stderr is kept (up to `max_err_bytes`) in
+    `err` and exit status is in `status` after iteration ends.
+
+    Arguments:
+        chan (Channel) -- Channel with started command.
+        lines [opt] (bool) -- Yield lines instead of chunks (Default: True).
+        max_bytes [opt] (int) -- Stop reading (and close channel) after this many bytes of stdout (Default: no limit).
+        max_err_bytes [opt] (int) -- Number of stderr bytes kept, rest is discarded (Default: 64 KiB).
+        timeout [opt] (float) -- Seconds for the whole command, `TimeoutError` is raised after it (Default: no limit).
+    """
+
+    chunk_size = 32768
+
+    def __init__(self, chan, lines: bool = True, max_bytes: int = None, max_err_bytes: int = 65536,
+                 timeout: float = None) -> None:
+        self.chan = chan
+        self.lines = lines
+        self.max_bytes = max_bytes
+        self.max_err_bytes = max_err_bytes
+        self.timeout = timeout
+        self.read = 0  # Bytes of stdout read so far
+        self.truncated = False  # True when output was cut at `max_bytes`
+        self.status = None  # Exit status (None when command was cut or did not report it)
+        self._err = []
+        self._err_size = 0
+
+    @property
+    def err(self) -> bytes:
+        return b"".join(self._err)
+
+    def _read_err(self) -> None:
+        while self.chan.recv_stderr_ready():
+            data = self.chan.recv_stderr(self.chunk_size)
+            keep = max(0, min(len(data), self.max_err_bytes - self._err_size))
+            if keep:
+                self._err.append(data[:keep])
+                self._err_size += keep
+
+    def _remaining(self, deadline: float) -> float:
+        if deadline is None:
+            return None
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"Command did not finish in {self.timeout} seconds!")
+        return remaining
+
+    def _chunks(self):
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        chan = self.chan
+        while True:
+            remaining = self._remaining(deadline)
+            select.select([chan], [], [], 1.0 if remaining is None else min(1.0, remaining))
+            self._read_err()
+            while chan.recv_ready():
+                data = chan.recv(self.chunk_size)
+                if self.max_bytes is not None and self.read + len(data) > self.max_bytes:
+                    data = data[:self.max_bytes - self.read]
+                    self.read += len(data)
+                    self.truncated = True
+                    if data:
+                        yield data
+                    return
+                self.read += len(data)
+                yield data
+                self._read_err()  # Consumer may be slow, do not let stderr fill up meanwhile
+            if (chan.eof_received or chan.closed) and not chan.recv_ready() and not chan.recv_stderr_ready():
+                break
+        while not chan.status_event.wait(1.0 if deadline is None else min(1.0, self._remaining(deadline))):
+            if chan.closed:
+                return
+        self.status = chan.recv_exit_status()
+
+    def __iter__(self):
+        try:
+            if not self.lines:
+                yield from self._chunks()
+                return
+            pending = b""
+            for data in self._chunks():
+                pending += data
+                *complete, pending = pending.split(b"\n")
+                for line in complete:
+                    yield line.decode(errors="replace") + "\n"
+            if pending:
+                yield pending.decode(errors="replace")
+        finally:
+            self.chan.close()
+
+    def readlines(self) -> list:
+        """Read whole (bounded) output as list of lines."""
+        return list(self) if self.lines else b"".join(self).decode(errors="replace").splitlines(keepends=True)
 
 
 class Executor:
@@ -10,21 +144,49 @@ class Executor:
         port (int) -- Port value (22 for ssh)
         uname (str) -- Username
         passwd (str) -- Password
+        transport [opt] (Transport) -- Already authenticated transport to reuse (e.g. from `PasswordFinder`)
     """
     _addr = _port = _uname = _passwd = None
-    def __init__(self, addr: str, port: int, uname: str, passwd: str) -> None:
+    def __init__(self, addr: str, port: int, uname: str, passwd: str, transport: Transport = None) -> None:
         self._addr = addr
         self._port = port
         self._uname = uname
         self._passwd = passwd
 
-        # Connect to device over SSH
-        self.client = SSHClient()
-        self.client.load_system_host_keys()
-        self.client.set_missing_host_key_policy(AutoAddPolicy())
-        self.client.connect(self._addr, port=self._port, username=self._uname, password=self._passwd, banner_timeout=60)
-        self.transport = self.client.get_transport()  # `transport` is used for connection state check
+        if transport is not None:
+            if not transport.is_authenticated():
+                raise ValueError("Reused transport is not authenticated!")
+            self.transport = transport  # Channels and SFTP are opened straight on transport
+        else:
+            self.transport = self._connect()
+        if isinstance(self.transport.sock, socket.socket):  # Small requests (channel close + open) are not held by Nagle
+            self.transport.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sftp = None
+        self._sftp_supported = None  # Unknown until first transfer (airOS often has no SFTP server)
     
+    def _connect(self, timeout: float = 60) -> Transport:
+        """Connect to device, check its host key against known hosts and log in with password."""
+        sock = socket.create_connection((self._addr, self._port), timeout=timeout)
+        transport = Transport(sock)
+        transport.banner_timeout = timeout
+        try:
+            transport.start_client(timeout=timeout)
+            key = transport.get_remote_server_key()
+            host = self._addr if self._port == 22 else f"[{self._addr}]:{self._port}"
+            known = system_host_keys().lookup(host)  # Unknown hosts are accepted (as with `AutoAddPolicy`)
+            if known is not None and key.get_name() in known and known[key.get_name()] != key:
+                raise BadHostKeyException(host, key, known[key.get_name()])
+            try:
+                transport.auth_password(self._uname, self._passwd)
+            except BadAuthenticationType as e:
+                if "keyboard-interactive" not in e.allowed_types:
+                    raise
+                transport.auth_interactive(self._uname, lambda title, instructions, prompts: [self._passwd for _ in prompts])
+        except Exception:
+            transport.close()
+            raise
+        return transport
+
     @property
     def data(self) -> dict:
         """Return information about device."""
@@ -35,24 +197,96 @@ class Executor:
         """Return state of connection."""
         return self.transport.is_active()
 
-    def exec(self, cmd: str, path: str = None) -> list:
-        """Execute command on device in optionally specified location."""
+    @property
+    def sftp(self) -> SFTPClient:
+        """Return SFTP session opened over the same connection (opened on first use)."""
+        if not self.active:
+            raise ConnectionAbortedError("Lost connection!")
+        if self._sftp is None:
+            self._sftp = SFTPClient.from_transport(self.transport)
+        return self._sftp
+
+    def exec_stream(self, cmd: str, path: str = None, inpt: list = None, lines: bool = True, max_bytes: int = None,
+                    max_err_bytes: int = 65536, timeout: float = None) -> OutputStream:
+        """Start command on device and return its output as `OutputStream` (read while it arrives).
+
+        Example:
+            stream = airos.exec_stream("tail -f /var/log/messages", timeout=60)
+            for line in stream:
+                print(line, end="")
+        """
         if not self.active:
             raise ConnectionAbortedError("Lost connection!")
         if path:
             cmd = f"cd {path}; {cmd}"
-        stdin, stdout, stderr = self.client.exec_command(cmd)
-        return [stdout.readlines(), stderr.readlines()]
+        chan = self.transport.open_session()
+        try:
+            chan.exec_command(cmd)
+            if inpt is not None:  # Lines or raw bytes
+                chan.sendall(inpt if isinstance(inpt, bytes) else "".join(line + "\n" for line in inpt).encode())
+                chan.shutdown_write()
+        except Exception:
+            chan.close()
+            raise
+        return OutputStream(chan, lines=lines, max_bytes=max_bytes, max_err_bytes=max_err_bytes, timeout=timeout)
+
+    def exec(self, cmd: str, path: str = None, max_bytes: int = None, timeout: float = None) -> list:
+        """Execute command on device in optionally specified location."""
+        stream = self.exec_stream(cmd, path=path, max_bytes=max_bytes, timeout=timeout)
+        out = stream.readlines()
+        return [out, stream.err.decode(errors="replace").splitlines(keepends=True)]
 
     def exec_input(self, cmd: str, inpt: list) -> list:
         """Execute command on device with user input."""
-        if not self.active:
-            raise ConnectionAbortedError("Lost connection!")
-        stdin, stdout, stderr = self.client.exec_command(cmd)
-        for line in inpt:
-            stdin.write(line + "\n")
-        stdin.close()
-        return [stdout.readlines(), stderr.readlines()]
+        stream = self.exec_stream(cmd, inpt=inpt)
+        out = stream.readlines()
+        return [out, stream.err.decode(errors="replace").splitlines(keepends=True)]
+
+    def exec_batch(self, commands: list, path: str = None, stop_on_error: bool = False, raw: bool = False) -> list:
+        """Execute many commands over one channel (one round trip instead of one per command).
+
+        Every command is a string or (command, input lines) tuple. Output of
+        each command is ended with random marker, so stdout, stderr and exit
+        status are split back per command. Commands run in subshells, one
+        after another.
+
+        Arguments:
+            raw [opt] (bool) -- Return output as bytes exactly as sent by device, instead of decoded lines
+                                (use it for files which may contain non UTF-8 bytes, eg. `system.cfg`).
+
+        Returns:
+            list -- CommandResult(command, out lines, err lines, exit status) for every finished command
+                    (commands after failed one are missing when `stop_on_error` is set).
+        """
+        marker = f"BATCH{secrets.token_hex(8)}"
+        script, cmds = [], []
+        if path:
+            script.append(f"cd {path} || exit 1")
+        for i, item in enumerate(commands):
+            cmd, inpt = (item, None) if isinstance(item, str) else item
+            cmds.append(cmd)
+            if inpt is None:
+                script.append(f"( {cmd}\n) < /dev/null")
+            else:
+                script.append(f"( {cmd}\n) <<'{marker}'\n" + "".join(line + "\n" for line in inpt) + marker)
+            script.append(f"rc=$?; printf '\\n{marker}:{i}:%d\\n' $rc; printf '\\n{marker}:{i}\\n' >&2")
+            if stop_on_error:
+                script.append("[ $rc -eq 0 ] || exit $rc")
+
+        stream = self.exec_stream("\n".join(script), inpt=b"", lines=False, max_err_bytes=1 << 24)
+        out, err = b"".join(stream), stream.err
+
+        # Marker is printed after new line, so output without trailing new line stays intact
+        out = re.split(rf"\n{marker}:(\d+):(\d+)\n".encode(), out)
+        err = re.split(rf"\n{marker}:(\d+)\n".encode(), err)
+        results = []
+        for i in range(len(out) // 3):
+            cmd_out, cmd_err = out[3 * i], err[2 * i] if 2 * i < len(err) - 1 else b""
+            if not raw:
+                cmd_out = cmd_out.decode(errors="replace").splitlines(keepends=True)
+                cmd_err = cmd_err.decode(errors="replace").splitlines(keepends=True)
+            results.append(CommandResult(cmds[i], cmd_out, cmd_err, int(out[3 * i + 2])))
+        return results
 
     def change_password(self, new_password: str) -> bool:
         """Change password on device (without permanent change)"""
@@ -101,18 +335,107 @@ class Executor:
             return False
         return True
     
-    def read_file(self, filename: str) -> list:
-        """Return file content."""
+    def read_file(self, filename: str, max_bytes: int = None) -> list:
+        """Return file content (optionally only first `max_bytes` bytes)."""
         if type(filename) is not str:
             raise TypeError("Filename should be string!")
         if len(filename) == 0:
             raise ValueError("Filename should not be empty!")
-        out, err = self.exec(f'cat "{filename}"')
+        out, err = self.exec(f'cat "{filename}"', max_bytes=max_bytes)
         if len(err):
             print("Error while reading file:", err)
             return []
         return out
+
+    def iter_file(self, filename: str, lines: bool = True, max_bytes: int = None, timeout: float = None) -> OutputStream:
+        """Return file content as `OutputStream` (lines or chunks, without reading whole file into memory)."""
+        if type(filename) is not str:
+            raise TypeError("Filename should be string!")
+        if len(filename) == 0:
+            raise ValueError("Filename should not be empty!")
+        return self.exec_stream(f'cat "{filename}"', lines=lines, max_bytes=max_bytes, timeout=timeout)
     
+    def _check_path(self, path: str) -> None:
+        if type(path) is not str:
+            raise TypeError("Path should be string!")
+        if len(path) == 0:
+            raise ValueError("Path should not be empty!")
+
+    def _use_sftp(self) -> bool:
+        """Check (once per session) if device has SFTP server."""
+        if self._sftp_supported is None:
+            try:
+                self.sftp
+                self._sftp_supported = True
+            except SSHException:
+                self._sftp_supported = False
+        return self._sftp_supported
+
+    def md5sum(self, path: str) -> str:
+        """Return MD5 checksum of remote file (None when `md5sum` is not available)."""
+        out, err = self.exec(f"md5sum {shlex.quote(path)}")
+        if len(err) or not out:
+            return None
+        return out[0].split()[0]
+
+    def _remote_size(self, path: str) -> int:
+        out, err = self.exec(f"wc -c < {shlex.quote(path)}")
+        if len(err) or not out:
+            raise IOError(f"Cannot read size of remote file {path}: {err}")
+        return int(out[0].strip())
+
+    def _verify(self, path: str, data: bytes) -> None:
+        """Compare remote file with local data (checksum, or size when checksum is not available)."""
+        remote_md5 = self.md5sum(path)
+        if remote_md5 is not None:
+            if remote_md5 != hashlib.md5(data).hexdigest():
+                raise IOError(f"Checksum of remote file {path} does not match!")
+        elif self._remote_size(path) != len(data):
+            raise IOError(f"Size of remote file {path} does not match!")
+
+    def put(self, path: str, data: bytes, verify: bool = True) -> None:
+        """Write bytes from memory to remote file (over SFTP or, when not available, exec channel).
+
+        File is written under temporary name and then moved to `path`, so
+        partially uploaded file never replaces the old one.
+        """
+        self._check_path(path)
+        if not isinstance(data, bytes):
+            raise TypeError("Data should be bytes!")
+        if not self.active:
+            raise ConnectionAbortedError("Lost connection!")
+        tmp_path = f"{path}.upload"
+        if self._use_sftp():
+            self.sftp.putfo(io.BytesIO(data), tmp_path, file_size=len(data), confirm=True)
+            self.sftp.posix_rename(tmp_path, path)
+        else:
+            stream = self.exec_stream(f"cat > {shlex.quote(tmp_path)} && mv {shlex.quote(tmp_path)} {shlex.quote(path)}",
+                                      inpt=data, lines=False)
+            for _ in stream:
+                pass
+            if stream.status != 0:
+                raise IOError(f"Error while uploading {path}: {stream.err.decode(errors='replace').strip()}")
+        if verify:
+            self._verify(path, data)
+
+    def get(self, path: str, verify: bool = True) -> bytes:
+        """Read remote file straight into memory (over SFTP or exec channel)."""
+        self._check_path(path)
+        if not self.active:
+            raise ConnectionAbortedError("Lost connection!")
+        if self._use_sftp():
+            buffer = io.BytesIO()
+            self.sftp.getfo(path, buffer)
+            data = buffer.getvalue()
+        else:
+            stream = self.exec_stream(f"cat {shlex.quote(path)}", lines=False)
+            data = b"".join(stream)
+            if stream.status != 0:
+                raise IOError(f"Error while downloading {path}: {stream.err.decode(errors='replace').strip()}")
+        if verify:
+            self._verify(path, data)
+        return data
+
     def get_location(self) -> str:
         """Return home catalog path."""
         out, err = self.exec("pwd")
@@ -123,13 +446,246 @@ class Executor:
 
     def close(self):
         """Close connection."""
-        self.client.close()
+        if self._sftp is not None:
+            self._sftp.close()
+            self._sftp = None
+        self.transport.close()
 
     def __bool__(self) -> bool:
         """Return connection state."""
         return self.active
 
 
+class SessionPool:
+    """Pool of live `Executor` sessions keyed by device address, port and user name.
+
+    Session of device is shared (it runs every command and SFTP transfer
+    over one connection), so device costs one SSH handshake for as long as
+    session lives, e.g. over many `run_on_fleet` calls. Sessions unused for
+    `idle_timeout` seconds and dead ones are closed on every `get` and `release`.
+
+    Arguments:
+        idle_timeout [opt] (float) -- Seconds after which unused session is closed (Default: 300).
+    """
+
+    def __init__(self, idle_timeout: float = 300) -> None:
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._sessions = {}  # {(addr, port, uname): [Executor, users, last release time]}
+
+    def find(self, addr: str, port: int, uname: str) -> Executor:
+        """Return live session of device without using it (None when there is none)."""
+        with self._lock:
+            entry = self._sessions.get((addr, port, uname))
+        return entry[0] if entry is not None and entry[0].active else None
+
+    def get(self, addr: str, port: int, uname: str, passwd: str, transport: Transport = None) -> Executor:
+        """Return live session of device, new one is created (over `transport` when given) only when there is none."""
+        self.evict()
+        key = (addr, port, uname)
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is not None and entry[0].active:
+                entry[1] += 1
+                if transport is not None and transport is not entry[0].transport:
+                    transport.close()  # Other thread logged in meanwhile
+                return entry[0]
+        executor = Executor(addr, port, uname, passwd, transport=transport)  # Connect without holding the lock
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is None or not entry[0].active:
+                old = entry[0] if entry is not None else None
+                self._sessions[key] = [executor, 1, time.monotonic()]
+            else:
+                entry[1] += 1
+                old, executor = executor, entry[0]  # Other thread connected meanwhile
+        if old is not None:
+            old.close()
+        return executor
+
+    def release(self, executor: Executor) -> None:
+        """Mark session as not used by caller (it stays open until it is idle for `idle_timeout`)."""
+        data = executor.data
+        with self._lock:
+            entry = self._sessions.get((data["addr"], data["port"], data["uname"]))
+            if entry is not None and entry[0] is executor:
+                entry[1] = max(0, entry[1] - 1)
+                entry[2] = time.monotonic()
+        self.evict()
+
+    @contextmanager
+    def session(self, addr: str, port: int, uname: str, passwd: str):
+        """Context manager version of `get` and `release`."""
+        executor = self.get(addr, port, uname, passwd)
+        try:
+            yield executor
+        finally:
+            self.release(executor)
+
+    def evict(self) -> int:
+        """Close idle and dead sessions, return number of closed sessions."""
+        now = time.monotonic()
+        with self._lock:
+            evicted = [key for key, (executor, users, released) in self._sessions.items()
+                       if not executor.active or (users == 0 and now - released >= self.idle_timeout)]
+            entries = [self._sessions.pop(key) for key in evicted]
+        for executor, _, _ in entries:
+            executor.close()
+        return len(entries)
+
+    def close_all(self) -> None:
+        """Close every session."""
+        with self._lock:
+            entries = list(self._sessions.values())
+            self._sessions = {}
+        for executor, _, _ in entries:
+            executor.close()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+class SessionPoolTest(unittest.TestCase):
+    """Tests against simulated device (see `classes/simulator.py`)."""
+
+    def setUp(self):
+        from .simulator import Simulator
+        self.sim = Simulator(1, first="127.0.0.1", port=0).start()
+        self.device = self.sim.devices[0]
+        self.key = (str(self.device.addr), self.device.port, "ubnt")
+        self.pool = SessionPool()
+
+    def tearDown(self):
+        self.pool.close_all()
+        self.sim.stop()
+
+    def test_reuse(self):
+        with self.pool.session(*self.key, "ubnt") as first:
+            first.exec("true")
+        with self.pool.session(*self.key, "ubnt") as second:
+            self.assertIs(second, first, "Session not reused")
+            self.assertEqual(second.exec("echo ok")[0], ["ok\n"], "Reused session does not work")
+        self.assertEqual(self.device.logins, 1, "Device logged in more than once")
+        self.assertIs(self.pool.find(*self.key), first, "Live session not found")
+        self.assertIsNone(self.pool.find(self.key[0], self.key[1], "admin"), "Session of other user found")
+        transport = Executor(*self.key, "ubnt").transport  # E.g. from `PasswordFinder` run in parallel
+        self.assertIs(self.pool.get(*self.key, "ubnt", transport=transport), first, "Second session created")
+        self.assertFalse(transport.is_active(), "Duplicate transport not closed")
+
+    def test_eviction(self):
+        self.pool.idle_timeout = 0.05
+        executor = self.pool.get(*self.key, "ubnt")
+        self.assertEqual(self.pool.evict(), 0, "Used session evicted")
+        self.pool.release(executor)
+        time.sleep(0.1)
+        self.assertEqual(self.pool.evict(), 1, "Idle session not evicted")
+        self.assertFalse(executor.active, "Evicted session not closed")
+        self.assertEqual(len(self.pool), 0, "Evicted session kept")
+        self.assertIsNot(self.pool.get(*self.key, "ubnt"), executor, "Evicted session reused")
+
+    def test_dead_transport(self):
+        executor = self.pool.get(*self.key, "ubnt")
+        self.pool.release(executor)
+        executor.transport.close()  # Device rebooted or dropped connection
+        self.assertIsNone(self.pool.find(*self.key), "Dead session found")
+        fresh = self.pool.get(*self.key, "ubnt")
+        self.assertIsNot(fresh, executor, "Dead session reused")
+        self.assertEqual(fresh.exec("echo ok")[0], ["ok\n"], "New session does not work")
+        self.assertEqual(self.device.logins, 2, "Device not logged in again")
+
+
+class ExecutorTest(unittest.TestCase):
+    """Tests against simulated device (see `classes/simulator.py`)."""
+
+    def setUp(self):
+        from .simulator import Simulator
+        self.sim = Simulator(1, first="127.0.0.1", port=0, time_scale=0.01).start()
+        self.device = self.sim.devices[0]
+        self.airos = Executor(str(self.device.addr), self.device.port, "ubnt", "ubnt")
+
+    def tearDown(self):
+        self.airos.close()
+        self.sim.stop()
+
+    def test_raw_config(self):
+        data = self.device.read("/tmp/system.cfg") + b"wireless.1.ssid=Caf\xe9\n"
+        self.device.write("/tmp/system.cfg", data)
+        backup, current = self.airos.exec_batch(["cp /tmp/system.cfg ~/system.cfg.bak", "cat /tmp/system.cfg"], raw=True)
+        self.assertEqual(current.out, data, "Configuration bytes changed on the way")
+        self.assertEqual(self.airos.get("/tmp/system.cfg"), data, "Downloaded bytes changed")
+        self.airos.put("/tmp/system.cfg", data)
+        self.assertEqual(self.device.read("/tmp/system.cfg"), data, "Uploaded bytes changed")
+
+    def test_connect(self):
+        from paramiko import RSAKey
+        from paramiko.ssh_exception import AuthenticationException
+        with self.assertRaises(AuthenticationException):
+            Executor(str(self.device.addr), self.device.port, "ubnt", "wrong")
+        host = f"[{self.device.addr}]:{self.device.port}"
+        system_host_keys().add(host, "ssh-rsa", RSAKey.generate(1024))  # Known host presents other key
+        try:
+            with self.assertRaises(BadHostKeyException):
+                Executor(str(self.device.addr), self.device.port, "ubnt", "ubnt")
+        finally:
+            del system_host_keys()[host]
+        reused = Executor(str(self.device.addr), self.device.port, "ubnt", "ubnt", transport=self.airos.transport)
+        self.assertEqual(reused.exec("echo ok")[0], ["ok\n"], "Reused transport not used")
+        self.assertEqual(self.device.logins, 1, "Reused transport logged in again")
+
+    def test_truncation(self):
+        self.device.write("/tmp/big", b"x" * 99 + b"\n" * 1000)
+        stream = self.airos.exec_stream("cat /tmp/big", lines=False, max_bytes=150)
+        self.assertEqual(b"".join(stream), b"x" * 99 + b"\n" * 51, "Output not cut at max_bytes")
+        self.assertTrue(stream.truncated, "Truncation not reported")
+        self.assertIsNone(stream.status, "Cut command has exit status")
+        stream = self.airos.exec_stream("cat /tmp/big", max_bytes=2000)
+        self.assertEqual(len(stream.readlines()), 1000, "Output under limit was cut")
+        self.assertFalse(stream.truncated, "Output under limit reported as truncated")
+        self.assertEqual(stream.status, 0, "Wrong exit status")
+
+    def test_timeout(self):
+        stream = self.airos.exec_stream("echo started; sleep 500", timeout=0.3)  # 5 seconds with time_scale 0.01
+        start = time.monotonic()
+        with self.assertRaises(TimeoutError):
+            stream.readlines()
+        self.assertLess(time.monotonic() - start, 2, "Timeout not kept")
+        self.assertIsNone(stream.status, "Timed out command has exit status")
+        self.assertTrue(stream.chan.closed, "Channel not closed after timeout")
+        self.assertEqual(self.airos.exec("echo ok")[0], ["ok\n"], "Connection unusable after timeout")
+
+    def test_stderr(self):
+        stream = self.airos.exec_stream("echo out; echo err >&2; cat /missing; echo end")
+        self.assertEqual(stream.readlines(), ["out\n", "end\n"], "Stderr mixed into stdout")
+        self.assertEqual(stream.err, b"err\ncat: can't open '/missing': No such file or directory\n",
+                         "Stderr not kept separately")
+        stream = self.airos.exec_stream("echo err >&2; echo more >&2", max_err_bytes=5)
+        self.assertEqual(stream.readlines(), [], "Unexpected stdout")
+        self.assertEqual(stream.err, b"err\nm", "Stderr not cut at max_err_bytes")
+
+    def test_batch(self):
+        results = self.airos.exec_batch(["echo one", "printf two", "cat /missing", ("cat", ["a", "b"]), "false"])
+        self.assertEqual([r.out for r in results], [["one\n"], ["two"], [], ["a\n", "b\n"], []], "Wrong stdout split")
+        self.assertEqual([r.status for r in results], [0, 0, 1, 0, 1], "Wrong exit statuses")
+        self.assertEqual(results[2].err, ["cat: can't open '/missing': No such file or directory\n"], "Wrong stderr split")
+        self.assertEqual(sum(len(r.err) for r in results), 1, "Stderr assigned to wrong command")
+        results = self.airos.exec_batch(["echo one", "false", "echo never"], stop_on_error=True)
+        self.assertEqual([r.status for r in results], [0, 1], "Batch not stopped on error")
+        results = self.airos.exec_batch(["pwd"], path="/tmp")
+        self.assertEqual(results[0].out, ["/tmp\n"], "Batch not run in path")
+
+    def test_put_get_fallback(self):
+        data = bytes(range(256)) * 4
+        self.airos.put("/tmp/blob", data)
+        self.assertFalse(self.airos._sftp_supported, "Device without SFTP server used SFTP")
+        self.assertEqual(self.device.read("/tmp/blob"), data, "Uploaded bytes changed")
+        self.assertIsNone(self.device.read("/tmp/blob.upload"), "Temporary file left")
+        self.assertEqual(self.airos.get("/tmp/blob"), data, "Downloaded bytes changed")
+        with self.assertRaises(IOError):
+            self.airos.get("/tmp/missing")
+        with self.assertRaises(IOError):
+            self.airos.put("/missing/dir/file", data)
+
+
 def manual_test(airos: Executor):
     """Test execution of Executor class methods."""
     print("Lista plików", "="*25)
@@ -0,0 +1,168 @@
+#############################################
+# Local memory of working and failed passwords
+# Author: MattTheCoder-W
+#############################################
+
+import os
+import json
+import time
+import threading
+import unittest
+import tempfile
+
+from .address import Address
+
+ARP_TABLE = "/proc/net/arp"
+
+
+def get_mac(addr: Address) -> str:
+    """Return MAC address of host from system ARP table (None when unknown)."""
+    try:
+        with open(ARP_TABLE, "r") as f:
+            lines = f.readlines()[1:]
+    except OSError:
+        return None
+    for line in lines:
+        fields = line.split()
+        if len(fields) >= 4 and fields[0] == str(addr) and fields[3] != "00:00:00:00:00:00":
+            return fields[3].lower()
+    return None
+
+
+class CredentialStore:
+    """Remember working passwords and recent failures between runs.
+
+    Candidates are ordered: last working password of device (by MAC, then by IP)
+    first, then passwords by number of successes on all devices. Passwords that
+    recently failed on device are skipped until their failure expires.
+
+    Arguments:
+        path (str) -- Path to JSON file (created on first save).
+        failure_ttl [opt] (float) -- Seconds after which failed password is tried again (Default: 1 day).
+    """
+
+    def __init__(self, path: str, failure_ttl: float = 86400) -> None:
+        self.path = path
+        self.failure_ttl = failure_ttl
+        self._lock = threading.Lock()
+        self.by_ip = {}  # {ip: password}
+        self.by_mac = {}  # {mac: password}
+        self.hits = {}  # {password: number of successes}
+        self.failures = {}  # {ip: {password: expiry timestamp}}
+        self.load()
+
+    def load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r") as f:
+            data = json.load(f)
+        self.by_ip = data.get("by_ip", {})
+        self.by_mac = data.get("by_mac", {})
+        self.hits = data.get("hits", {})
+        self.failures = data.get("failures", {})
+
+    def save(self) -> None:
+        """Save store to file (readable only by owner, it contains passwords)."""
+        with self._lock:
+            self._purge(time.time())
+            data = {"by_ip": self.by_ip, "by_mac": self.by_mac, "hits": self.hits, "failures": self.failures}
+            tmp_path = f"{self.path}.tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f, indent=1)
+            os.replace(tmp_path, self.path)
+
+    def _purge(self, now: float) -> None:
+        """Remove expired failures."""
+        for ip in list(self.failures):
+            alive = {k: v for k, v in self.failures[ip].items() if v > now}
+            if alive:
+                self.failures[ip] = alive
+            else:
+                del self.failures[ip]
+
+    def ordered(self, addr: Address, pass_list: list, mac: str = None) -> list:
+        """Return candidates in order of probability, without recently failed ones."""
+        ip = str(addr)
+        now = time.time()
+        with self._lock:
+            failed = {k for k, v in self.failures.get(ip, {}).items() if v > now}
+            first = [x for x in (self.by_mac.get(mac) if mac else None, self.by_ip.get(ip)) if x is not None]
+            position = {passwd: i for i, passwd in reversed(list(enumerate(pass_list)))}
+            rest = sorted(position, key=lambda x: (-self.hits.get(x, 0), position[x]))
+        result = []
+        for passwd in first + rest:
+            if passwd in position and passwd not in failed and passwd not in result:
+                result.append(passwd)
+        return result
+
+    def record_success(self, addr: Address, passwd: str, mac: str = None) -> None:
+        """Store password found by search (it also counts as hit for ordering other devices)."""
+        with self._lock:
+            self._remember(str(addr), passwd, mac)
+            self.hits[passwd] = self.hits.get(passwd, 0) + 1
+
+    def remember(self, addr: Address, passwd: str, mac: str = None) -> None:
+        """Store password set on device by us (e.g. after password change), without counting it as hit."""
+        with self._lock:
+            self._remember(str(addr), passwd, mac)
+
+    def _remember(self, ip: str, passwd: str, mac: str) -> None:
+        self.by_ip[ip] = passwd
+        if mac:
+            self.by_mac[mac] = passwd
+        self.failures.get(ip, {}).pop(passwd, None)
+
+    def record_failure(self, addr: Address, passwd: str, mac: str = None) -> None:
+        ip = str(addr)
+        with self._lock:
+            self.failures.setdefault(ip, {})[passwd] = time.time() + self.failure_ttl
+            if self.by_ip.get(ip) == passwd:  # Device password was changed
+                del self.by_ip[ip]
+            if mac and self.by_mac.get(mac) == passwd:
+                del self.by_mac[mac]
+
+
+class CredentialStoreTest(unittest.TestCase):
+    def test_ordering(self):
+        with tempfile.TemporaryDirectory() as path:
+            store = CredentialStore(os.path.join(path, "credentials.json"))
+            first, second = Address("10.0.0.1"), Address("10.0.0.2")
+            passwords = ["ubnt", "haslo", "secret", "admin"]
+            store.record_success(first, "secret")
+            store.record_failure(first, "ubnt")
+            self.assertEqual(store.ordered(first, passwords), ["secret", "haslo", "admin"], "Wrong order for known host")
+            self.assertEqual(store.ordered(second, passwords), ["secret", "ubnt", "haslo", "admin"], "Wrong order by hits")
+            store.record_success(second, "admin", mac="aa:bb:cc:dd:ee:ff")
+            self.assertEqual(store.ordered(Address("10.0.0.9"), passwords, mac="aa:bb:cc:dd:ee:ff")[0], "admin",
+                             "MAC was not used")
+            store.save()
+
+            loaded = CredentialStore(store.path)
+            self.assertEqual(loaded.ordered(first, passwords), ["secret", "admin", "haslo"], "Store was not saved")
+
+    def test_changed_password(self):
+        with tempfile.TemporaryDirectory() as path:
+            store = CredentialStore(os.path.join(path, "credentials.json"))
+            addr, mac, passwords = Address("10.0.0.1"), "aa:bb:cc:dd:ee:ff", ["ubnt", "secret"]
+            store.record_success(addr, "secret", mac=mac)
+            store.record_failure(addr, "secret", mac=mac)
+            self.assertNotIn(mac, store.by_mac, "Failed password kept for MAC")
+            self.assertNotIn(str(addr), store.by_ip, "Failed password kept for IP")
+            store.record_success(Address("10.0.0.2"), "ubnt", mac=mac)  # Same device got new address and password
+            self.assertEqual(store.ordered(Address("10.0.0.2"), passwords, mac=mac)[0], "ubnt", "MAC not overwritten")
+
+            store.remember(addr, "rotated", mac=mac)  # Password set by configuration
+            self.assertEqual(store.ordered(Address("10.0.0.9"), passwords + ["rotated"], mac=mac)[0], "rotated",
+                             "Remembered password not tried first")
+            self.assertNotIn("rotated", store.hits, "Remembered password counted as hit")
+
+    def test_failure_expiry(self):
+        with tempfile.TemporaryDirectory() as path:
+            store = CredentialStore(os.path.join(path, "credentials.json"), failure_ttl=-1)
+            store.record_failure(Address("10.0.0.1"), "ubnt")
+            self.assertEqual(store.ordered(Address("10.0.0.1"), ["ubnt"]), ["ubnt"], "Failure did not expire")
+
+
+if __name__ == "__main__":
+    unittest.main()
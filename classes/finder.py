@@ -1,25 +1,317 @@
 from .address import Address
 from .network import Network
-from argparse import ArgumentParser
-import os
+from .icmp import Pinger
+from .ratecontrol import RateController
+from .snapshot import Snapshot, SnapshotStore
+import time
+import queue
+import asyncio
+import threading
 import concurrent.futures
+import itertools
+import unittest
+from typing import AsyncIterator, Callable, Iterable, Iterator
 
 
 class Finder:
-    """Class for finding all active devices in netowrk."""
+    """Class for finding all active devices in netowrk.
+
+    Arguments:
+        addr (Address) -- Network address.
+        mask (Address) -- Mask address.
+        mode [opt] (str) -- Scan mode (Default: "system"):
+            system -- `ping` command for every host (thread pool)
+            icmp -- in-process asynchronous ICMP sweep (see `classes/icmp.py`)
+        timeout [opt] (float) -- Reply timeout in seconds for `icmp` mode (Default: 1.0).
+        rate [opt] (int) -- Probes per second for `icmp` mode (Default: 1000).
+        controller [opt] (RateController) -- Adaptive window and rate control (Default: fixed limits).
+        store [opt] (SnapshotStore) -- Save every scan result as snapshot (Default: None).
+        known_first [opt] (bool) -- Check hosts live in last snapshot before the rest of network (Default: False).
+        ttl [opt] (float) -- Do not scan when last snapshot is younger than `ttl` seconds (Default: None).
+        retries [opt] (int) -- Additional probes for silent hosts. Loss is detected only from hosts answering
+            a retry, so adaptive `controller` needs at least one (Default: 1 with controller, 0 otherwise).
+    """
+
+    modes = ["system", "icmp"]  # Supported scan modes
     
-    def __init__(self, addr: Address, mask: Address) -> None:
+    def __init__(self, addr: Address, mask: Address, mode: str = "system", timeout: float = 1.0, rate: int = 1000,
+                 controller: RateController = None, store: SnapshotStore = None, known_first: bool = False,
+                 ttl: float = None, retries: int = None) -> None:
+        if mode not in self.modes:
+            raise ValueError(f"Unknown scan mode: {mode}! Supported modes: {self.modes}")
+        if (known_first or ttl is not None) and store is None:
+            raise ValueError("Snapshot store is required for `known_first` and `ttl`!")
         self.addr = addr
         self.mask = mask
+        self.mode = mode
+        self.timeout = timeout
+        self.rate = rate
+        self.controller = controller
+        self.store = store
+        self.known_first = known_first
+        self.ttl = ttl
+        self.retries = (1 if controller is not None else 0) if retries is None else retries
+        self.previous = None  # Last snapshot before this scan
+        self.snapshot = None  # Snapshot of this scan
         self.found = []
 
-    def find_all(self) -> list:
-        with concurrent.futures.ThreadPoolExecutor(max_workers=15) as executor:
-            executor.map(self.check_host, Network(self.addr, self.mask).addresses)
+    @property
+    def network(self) -> Network:
+        return Network(self.addr, self.mask)
+
+    def _targets(self) -> Iterable[Address]:
+        """Return hosts to check (known live hosts first in `known_first` mode)."""
+        hosts = self.network.hosts
+        if not self.known_first or self.previous is None:
+            return hosts
+        known = self.previous
+        return itertools.chain(known.hosts(), (addr for addr in hosts if addr not in known))
+
+    def _load_previous(self) -> list:
+        """Load last snapshot, return its hosts when it is fresh enough to skip scan (None otherwise)."""
+        if self.store is None:
+            return None
+        self.previous = self.store.latest(self.network)
+        if self.ttl is not None and self.previous is not None and self.previous.age < self.ttl:
+            self.snapshot = self.previous
+            self.previous = self.store.latest(self.network, skip=1)
+            return list(self.snapshot.hosts())
+        return None
+
+    def _save_snapshot(self) -> None:
+        """Save result of finished scan."""
+        self.snapshot = Snapshot(self.network, self.found)
+        if self.store is not None:
+            self.store.save(self.snapshot)
+
+    def diff(self) -> tuple:
+        """Return (appeared, disappeared) hosts compared to previous snapshot."""
+        if self.snapshot is None:
+            raise ValueError("Network was not scanned yet!")
+        if self.previous is None:
+            return list(self.snapshot.hosts()), []
+        return self.snapshot.diff(self.previous)
+
+    def find_all(self, max_workers: int = 15, callback: Callable = None) -> list:
+        """Check every host in network and return list of active ones.
+
+        Arguments:
+            max_workers [opt] (int) -- Number of threads in `system` mode (Default: 15).
+            callback [opt] (Callable) -- Called as `callback(addr)` as soon as host is found.
+        """
+        for addr in self.iter_found(max_workers):
+            if callback is not None:
+                callback(addr)
         return self.found
 
+    def iter_found(self, max_workers: int = 15) -> Iterator[Address]:
+        """Yield active hosts as soon as they answer.
+
+        Scan runs in background thread, so it continues while caller
+        is working on already found hosts.
+        """
+        cached = self._load_previous()
+        if cached is not None:  # Last snapshot is still fresh
+            self.found.extend(cached)
+            yield from cached
+            return
+
+        if self.mode == "icmp":
+            scan = lambda on_found: asyncio.run(self._sweep(on_found))
+        else:
+            scan = lambda on_found: self._scan(on_found, max_workers)
+
+        found = queue.Queue()
+        errors = []
+
+        def run() -> None:
+            try:
+                scan(found.put)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                found.put(None)  # End of scan
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        while (addr := found.get()) is not None:
+            yield addr
+        thread.join()
+        if errors:
+            raise errors[0]
+        self._save_snapshot()
+
+    def _scan(self, on_found: Callable, max_workers: int = 15) -> None:
+        """Ping every host using thread pool, call `on_found(addr)` for active ones.
+
+        Hosts are taken lazily from network, only a bounded number of
+        checks is queued at once (so large networks are not allocated up front).
+        """
+        if self.controller is not None:
+            return self._scan_adaptive(on_found)
+        hosts = iter(self._targets())
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = {}  # {Future: Address}
+            for addr in hosts:
+                pending[executor.submit(self._timed_check, addr)] = addr
+                if len(pending) >= max_workers * 2:
+                    done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                    self._collect(pending, done, on_found)
+            while pending:
+                done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                self._collect(pending, done, on_found)
+
+    def _scan_adaptive(self, on_found: Callable) -> None:
+        """Ping hosts with number of checks in flight set by controller.
+
+        Every check has its own thread, so number of threads follows current
+        window (not its maximum) and slot is free as soon as check finishes.
+        """
+        controller = self.controller
+        results = queue.Queue()  # (addr, alive, elapsed, retried) of finished checks
+        running = 0
+
+        def check(addr: Address) -> None:
+            results.put((addr, *self._timed_check(addr)))
+
+        for addr in self._targets():
+            while not controller.can_send(addr) or not results.empty():  # Wait for free slot in window
+                self._report(*results.get(), on_found)
+                running -= 1
+            time.sleep(controller.delay())
+            controller.on_send(addr)
+            threading.Thread(target=check, args=(addr,), daemon=True).start()
+            running += 1
+        for _ in range(running):
+            self._report(*results.get(), on_found)
+
+    def _timed_check(self, addr: Address) -> tuple:
+        """Check host (retry silent one `retries` times), return its state, time of answered check and retry flag."""
+        for attempt in range(1 + self.retries):
+            start = time.monotonic()
+            if self.check_host(addr):
+                return True, time.monotonic() - start, attempt > 0
+        return False, time.monotonic() - start, False
+
+    def _collect(self, pending: dict, done: set, on_found: Callable) -> None:
+        """Remove finished checks from pending dict and report found hosts."""
+        for future in done:
+            self._report(pending.pop(future), *future.result(), on_found)
+
+    def _report(self, addr: Address, alive: bool, elapsed: float, retried: bool, on_found: Callable) -> None:
+        """Pass result of check to controller and report found host."""
+        if self.controller is not None:
+            if alive:
+                self.controller.on_reply(addr, elapsed)
+                if retried:  # Host is up, so first probe (or its reply) was lost
+                    self.controller.on_loss(addr)
+            else:
+                self.controller.on_timeout(addr)
+        if alive:
+            on_found(addr)
+
+    async def _sweep(self, on_found: Callable) -> None:
+        """Sweep whole network with asynchronous ICMP probes."""
+        def on_reply(addr: Address, _) -> None:
+            self.found.append(addr)
+            on_found(addr)
+        pinger = Pinger(timeout=self.timeout, rate=self.rate, retries=self.retries, controller=self.controller)
+        await pinger.sweep(self._targets(), callback=on_reply)
+
+    async def find_all_async(self) -> list:
+        """Asynchronous version of `find_all`."""
+        async for _ in self.aiter_found():
+            pass
+        return self.found
+
+    async def aiter_found(self) -> AsyncIterator[Address]:
+        """Asynchronously yield active hosts as soon as they answer."""
+        cached = self._load_previous()
+        if cached is not None:  # Last snapshot is still fresh
+            self.found.extend(cached)
+            for addr in cached:
+                yield addr
+            return
+
+        loop = asyncio.get_running_loop()
+        found = asyncio.Queue()
+        if self.mode == "icmp":
+            task = asyncio.ensure_future(self._sweep(found.put_nowait))
+        else:
+            on_found = lambda addr: loop.call_soon_threadsafe(found.put_nowait, addr)
+            task = loop.run_in_executor(None, self._scan, on_found)
+        task.add_done_callback(lambda _: found.put_nowait(None))  # End of scan
+        while (addr := await found.get()) is not None:
+            yield addr
+        await task  # Raise scan errors
+        self._save_snapshot()
+
     def check_host(self, addr: Address) -> bool:
         if bool(addr):
             self.found.append(addr)
             return True
-    
\ No newline at end of file
+        return False
+
+
+class FinderTest(unittest.TestCase):
+    def test_adaptive_loss(self):
+        import socket
+        import asyncio.selector_events
+        from unittest import mock
+        try:
+            socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP).close()
+        except PermissionError:
+            try:
+                socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP).close()
+            except PermissionError:
+                self.skipTest("ICMP sockets are not allowed")
+
+        # Network drops first probe to every host, so every host answers only to retry
+        dropped = set()
+        sendto = asyncio.selector_events.BaseSelectorEventLoop.sock_sendto
+
+        async def lossy_sendto(loop, sock, data, address):
+            if address[0] not in dropped:
+                dropped.add(address[0])
+                return len(data)
+            return await sendto(loop, sock, data, address)
+
+        controller = RateController(window=8, max_window=64)
+        finder = Finder(Address("127.0.0.0"), Address(28), mode="icmp", timeout=0.1, controller=controller)
+        with mock.patch.object(asyncio.selector_events.BaseSelectorEventLoop, "sock_sendto", lossy_sendto):
+            found = list(finder.iter_found())
+        self.assertEqual(len(found), 14, "Hosts answering to retry were not found")
+        self.assertEqual(controller.losses, 14, "Lost probes were not detected")
+        self.assertLess(controller.window, 8, "Window did not shrink after loss")
+
+    def test_adaptive_system(self):
+        class FlakyFinder(Finder):  # `ping` of every host fails once, at most `window` pings run at once
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.lock = threading.Lock()
+                self.tried, self.running, self.peak = set(), 0, 0
+
+            def check_host(self, addr):
+                with self.lock:
+                    self.running += 1
+                    self.peak = max(self.peak, self.running)
+                    first = addr not in self.tried
+                    self.tried.add(addr)
+                time.sleep(0.01)
+                with self.lock:
+                    self.running -= 1
+                    if first:
+                        return False
+                    self.found.append(addr)
+                    return True
+
+        controller = RateController(window=8, max_window=1024)
+        finder = FlakyFinder(Address("10.0.0.0"), Address(27), controller=controller)
+        self.assertEqual(len(finder.find_all()), 30, "Hosts answering to retry were not found")
+        self.assertEqual(controller.losses, 30, "Lost probes were not detected")
+        self.assertLess(controller.window, 8, "Window did not shrink after loss")
+        self.assertLessEqual(finder.peak, controller.peak_window, "More checks running than window allows")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+#############################################
+# Local record of configurations applied on devices
+# Author: MattTheCoder-W
+#############################################
+
+import os
+import json
+import time
+import hashlib
+import threading
+import unittest
+import tempfile
+
+from .address import Address
+
+
+def config_fingerprint(data: bytes) -> str:
+    """Return fingerprint of configuration file (same as `md5sum` on device)."""
+    return hashlib.md5(data).hexdigest()
+
+
+class FingerprintStore:
+    """Remember checksum of configuration applied on every device.
+
+    When checksum of `/tmp/system.cfg` on device is the same as recorded one
+    and device is configured with the same profile, configuration does not
+    have to be downloaded, patched and uploaded again.
+
+    Arguments:
+        path (str) -- Path to JSON file (created on first save).
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self.devices = {}  # {ip: {"config": config checksum, "profile": profile fingerprint, "time": timestamp}}
+        self.load()
+
+    def load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r") as f:
+            self.devices = json.load(f)
+
+    def save(self) -> None:
+        with self._lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.devices, f, indent=1)
+            os.replace(tmp_path, self.path)
+
+    def matches(self, addr: Address, config: str, profile: str) -> bool:
+        """Check if device has configuration recorded for given profile."""
+        with self._lock:
+            record = self.devices.get(str(addr))
+        return record is not None and record["config"] == config and record["profile"] == profile
+
+    def record(self, addr: Address, config: str, profile: str) -> None:
+        with self._lock:
+            self.devices[str(addr)] = {"config": config, "profile": profile, "time": time.time()}
+
+    def forget(self, addr: Address) -> None:
+        with self._lock:
+            self.devices.pop(str(addr), None)
+
+
+class FingerprintStoreTest(unittest.TestCase):
+    def test_matches(self):
+        with tempfile.TemporaryDirectory() as path:
+            store = FingerprintStore(os.path.join(path, "fingerprints.json"))
+            addr = Address("10.0.0.1")
+            config = config_fingerprint(b"a=1\n")
+            self.assertFalse(store.matches(addr, config, "p1"), "Unknown device matched")
+            store.record(addr, config, "p1")
+            self.assertTrue(store.matches(addr, config, "p1"), "Recorded configuration did not match")
+            self.assertFalse(store.matches(addr, config, "p2"), "Configuration matched other profile")
+            self.assertFalse(store.matches(addr, config_fingerprint(b"a=2\n"), "p1"), "Changed configuration matched")
+            store.save()
+
+            loaded = FingerprintStore(store.path)
+            self.assertTrue(loaded.matches(addr, config, "p1"), "Store was not saved")
+            loaded.forget(addr)
+            self.assertFalse(loaded.matches(addr, config, "p1"), "Device was not forgotten")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+#############################################
+# Run one command on many devices at once
+# Author: MattTheCoder-W
+#############################################
+
+import unittest
+from collections import namedtuple
+from typing import Iterable, Iterator
+
+from paramiko import Transport
+from paramiko.ssh_exception import SSHException
+
+from .address import Address
+from .connector import Executor, SessionPool
+from .credstore import CredentialStore
+from .sshtools import PasswordScheduler
+from .pipeline import imap_unordered
+
+# Result of command on one device (`truncated` when output was cut at `max_bytes`, `status` is None then)
+HostResult = namedtuple("HostResult", ["addr", "out", "err", "status", "error", "truncated"], defaults=(False,))
+
+
+def run_command(addr: Address, uname: str, passwd: str, command: str, transport: Transport = None, port: int = 22,
+                timeout: float = 30, max_bytes: int = 1 << 20, pool: SessionPool = None) -> HostResult:
+    """Run command on single device and return its `HostResult` (errors are returned, not raised).
+
+    With `pool` session is taken from pool (or added to it) and stays open after command.
+    """
+    airos = None
+    try:
+        if pool is not None:
+            airos = pool.get(str(addr), port, uname, passwd, transport=transport)
+        else:
+            airos = Executor(str(addr), port, uname, passwd, transport=transport)
+        stream = airos.exec_stream(command, max_bytes=max_bytes, timeout=timeout)
+        out = stream.readlines()
+        error = "output truncated" if stream.truncated else None
+        return HostResult(addr, out, stream.err.decode(errors="replace").splitlines(keepends=True), stream.status, error,
+                          stream.truncated)
+    except TimeoutError:
+        return HostResult(addr, [], [], None, f"command did not finish in {timeout} seconds")
+    except (SSHException, EOFError, OSError) as e:
+        return HostResult(addr, [], [], None, f"connection error: {e}")
+    finally:
+        if airos is not None and pool is not None:
+            pool.release(airos)
+        elif airos is not None:
+            airos.close()
+        elif transport is not None:
+            transport.close()
+
+
+def run_on_fleet(hosts: Iterable[Address], command: str, uname: str, passwords: list, max_workers: int = 20,
+                 timeout: float = 30, max_bytes: int = 1 << 20, store: CredentialStore = None,
+                 port: int = 22, pool: SessionPool = None) -> Iterator[HostResult]:
+    """Run command on every device and yield `HostResult` as soon as device finishes.
+
+    Passwords are searched with `PasswordScheduler` and command is run over
+    the same authenticated connection. At most `max_workers` devices are
+    searched and at most `max_workers` commands run at once (two `imap_unordered` stages). Hosts may come
+    from generator (e.g. `Finder.iter_found`), they are consumed in background.
+    With `pool`, sessions stay open between calls, so devices are searched
+    and logged in only once for many commands.
+
+    Arguments:
+        hosts (Iterable[Address]) -- Devices to run command on.
+        command (str) -- Shell command.
+        uname (str) -- User name on devices.
+        passwords (list) -- Candidate passwords.
+        max_workers [opt] (int) -- Number of devices handled at once (Default: 20).
+        timeout [opt] (float) -- Timeout of each SSH connection and of the command in seconds, not of the whole device;
+            password search may try several connections (Default: 30).
+        max_bytes [opt] (int) -- Maximum stdout size kept per device (Default: 1 MiB).
+        store [opt] (CredentialStore) -- Remembered passwords (Default: None).
+        port [opt] (int) -- SSH port (Default: 22).
+        pool [opt] (SessionPool) -- Sessions kept between calls (Default: None, every session is closed).
+    """
+    if max_workers < 1:
+        raise ValueError("At least one worker is required!")
+    scheduler = PasswordScheduler(uname, passwords, max_connections=max_workers, store=store, port=port,
+                                  timeout=timeout, pool=pool)
+
+    def run(found: tuple) -> HostResult:
+        addr, passwd, transport = found
+        if addr in scheduler.errors:
+            return HostResult(addr, [], [], None, f"connection error: {scheduler.errors[addr]}")
+        if passwd is None:
+            return HostResult(addr, [], [], None, "password not found")
+        return run_command(addr, uname, passwd, command, transport=transport, port=port, timeout=timeout,
+                           max_bytes=max_bytes, pool=pool)
+
+    return imap_unordered(run, scheduler.run(hosts), max_workers)
+
+
+class FleetTest(unittest.TestCase):
+    def test_pool(self):
+        from .simulator import Simulator
+        with Simulator(3, first="127.0.0.1", port=0) as sim:
+            pool = SessionPool()
+            try:
+                for command in ("hostname", "true"):
+                    for device in sim.devices:  # Every simulated device has its own port
+                        result, = run_on_fleet([device.addr], command, "ubnt", ["wrong", "ubnt"], port=device.port,
+                                               pool=pool)
+                        self.assertEqual(result.status, 0, f"Command failed: {result.error}")
+                self.assertEqual([d.logins for d in sim.devices], [1, 1, 1], "Pooled sessions not reused")
+                self.assertEqual([d.failed_logins for d in sim.devices], [1, 1, 1], "Password searched again")
+                self.assertEqual(len(pool), 3, "Sessions not kept in pool")
+            finally:
+                pool.close_all()
+            result, = run_on_fleet([sim.devices[0].addr], "hostname", "ubnt", ["ubnt"], port=sim.devices[0].port)
+            self.assertEqual((result.status, len(result.out)), (0, 1), "Command without pool failed")
+            self.assertEqual(sim.devices[0].logins, 2, "Session without pool not created")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,211 @@
+#####################################
+# Asynchronous ICMP echo (ping) engine
+# Author: MattTheCoder-W
+#####################################
+
+import os
+import time
+import socket
+import struct
+import asyncio
+import unittest
+from typing import Callable, Iterable, Optional
+
+from .address import Address
+from .ratecontrol import RateController
+
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+
+
+def checksum(data: bytes) -> int:
+    """Return internet checksum (RFC 1071) of data."""
+    if len(data) % 2:
+        data += b"\x00"
+    total = sum(struct.unpack(f"!{len(data)//2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+class Pinger:
+    """Send ICMP echo requests to many addresses at once using one socket.
+
+    Unprivileged ICMP datagram socket is used when system allows it,
+    raw socket (root) otherwise. Replies are matched by address and sequence number.
+
+    Arguments:
+        timeout (float) -- Time to wait for reply in seconds (Default: 1.0).
+        rate (int) -- Maximum number of sent probes per second (Default: 1000).
+        retries (int) -- Number of additional probes for hosts that did not answer (Default: 0).
+        controller [opt] (RateController) -- Window and rate control (Default: fixed `rate` without window limit).
+    """
+
+    def __init__(self, timeout: float = 1.0, rate: int = 1000, retries: int = 0, controller: RateController = None) -> None:
+        if timeout <= 0:
+            raise ValueError("Timeout should be greater than 0!")
+        if rate <= 0:
+            raise ValueError("Rate should be greater than 0!")
+        if retries < 0:
+            raise ValueError("Retries should not be negative!")
+        self.timeout = timeout
+        self.rate = rate
+        self.retries = retries
+        if controller is None:
+            controller = RateController(window=2**16, max_window=2**16, max_rate=rate, adaptive=False)
+        self.controller = controller
+        self._ident = (os.getpid() ^ id(self)) & 0xFFFF
+        self._seq = 0
+        self._sock = None
+        self._raw = False
+        self._pending = {}  # {(address_value, seq): (Address, send_time, tries_left)}
+        self._callback = None
+        self._alive = []
+
+    def _open_socket(self) -> socket.socket:
+        """Open ICMP socket (datagram if allowed, raw otherwise)."""
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+            self._raw = False
+        except PermissionError:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+            self._raw = True
+        sock.setblocking(False)
+        return sock
+
+    def _build_packet(self, seq: int) -> bytes:
+        """Build ICMP echo request packet."""
+        payload = struct.pack("!d", time.monotonic()) + b"\x00" * 24
+        header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, self._ident, seq)
+        csum = checksum(header + payload)
+        return struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, csum, self._ident, seq) + payload
+
+    def _on_readable(self) -> None:
+        """Read all waiting replies from socket."""
+        while True:
+            try:
+                data, (ip, _) = self._sock.recvfrom(1024)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            if self._raw:
+                data = data[(data[0] & 0x0F) * 4:]
+            if len(data) < 8:
+                continue
+            msg_type, _, _, ident, seq = struct.unpack("!BBHHH", data[:8])
+            if msg_type != ICMP_ECHO_REPLY:
+                continue
+            if self._raw and ident != self._ident:  # Reply for other process
+                continue
+            probe = self._pending.pop((Address.from_str(ip).value, seq), None)
+            if probe is None:
+                continue
+            addr, sent, tries_left = probe
+            self.controller.on_reply(addr, time.monotonic() - sent)
+            if tries_left < self.retries:  # Host is up but earlier probe was lost
+                self.controller.on_loss(addr)
+            self._alive.append(addr)
+            if self._callback is not None:
+                self._callback(addr, time.monotonic() - sent)
+
+    async def _send(self, loop: asyncio.AbstractEventLoop, addr: Address, tries_left: int) -> None:
+        """Send single probe and register it as pending."""
+        seq = self._seq
+        self._seq = (self._seq + 1) & 0xFFFF
+        self._pending[(addr.value, seq)] = (addr, time.monotonic(), tries_left)
+        self.controller.on_send(addr)
+        try:
+            await loop.sock_sendto(self._sock, self._build_packet(seq), (str(addr), 0))
+        except OSError:  # Unreachable network, full buffers, etc.
+            if self._pending.pop((addr.value, seq), None) is not None:
+                self.controller.on_timeout(addr)
+                self.controller.on_loss(addr)
+
+    def _expire(self, now: float) -> list:
+        """Remove timed out probes, return addresses that should be probed again."""
+        again = []
+        expired = []
+        for key, (addr, sent, tries_left) in self._pending.items():  # Ordered by send time
+            if now - sent < self.timeout:
+                break
+            expired.append(key)
+            self.controller.on_timeout(addr)
+            if tries_left > 0:
+                again.append((addr, tries_left - 1))
+        for key in expired:
+            del self._pending[key]
+        return again
+
+    async def sweep(self, addresses: Iterable[Address], callback: Callable = None) -> list:
+        """Probe all addresses and return list of addresses that replied.
+
+        Arguments:
+            addresses (Iterable) -- Addresses to probe (e.g. `Network.hosts`).
+            callback [opt] (Callable) -- Called as `callback(addr, rtt)` for every reply.
+        """
+        loop = asyncio.get_running_loop()
+        self._sock = self._open_socket()
+        self._callback = callback
+        self._alive = []
+        self._pending = {}
+        loop.add_reader(self._sock, self._on_readable)
+        try:
+            queue = ((addr, self.retries) for addr in addresses)
+            retry = []
+            tick = min(self.timeout / 10, 0.05)
+            while True:
+                item = retry.pop() if retry else next(queue, None)
+                if item is None:
+                    if not self._pending:
+                        break
+                    await asyncio.sleep(tick)
+                    retry = self._expire(time.monotonic())
+                    continue
+                while not self.controller.can_send(item[0]):  # Window or subnet limit reached
+                    await asyncio.sleep(min(tick, 0.005))
+                    retry.extend(self._expire(time.monotonic()))
+                delay = self.controller.delay()
+                if delay > 0.001:  # Sleep only when we are ahead of schedule
+                    await asyncio.sleep(delay)
+                    retry.extend(self._expire(time.monotonic()))
+                await self._send(loop, *item)
+        finally:
+            loop.remove_reader(self._sock)
+            self._sock.close()
+            self._sock = None
+        return self._alive
+
+    async def ping(self, addr: Address) -> Optional[float]:
+        """Probe single address, return round trip time in seconds (None when host is down)."""
+        rtts = []
+        await self.sweep([addr], callback=lambda _, rtt: rtts.append(rtt))
+        return rtts[0] if rtts else None
+
+
+class PingerTest(unittest.TestCase):
+    def test_checksum(self):
+        self.assertEqual(checksum(b"\x08\x00\x00\x00\x00\x01\x00\x01"), 0xF7FD, "Wrong checksum")
+
+    def test_loopback(self):
+        try:
+            socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP).close()
+        except PermissionError:
+            try:
+                socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP).close()
+            except PermissionError:
+                self.skipTest("ICMP sockets are not allowed")
+        pinger = Pinger(timeout=0.5, rate=5000)
+        hosts = [Address("127.0.0.1") + x for x in range(50)]
+        alive = asyncio.run(pinger.sweep(hosts))
+        self.assertEqual(sorted(alive), hosts, "Not all loopback addresses replied")
+
+        pinger = Pinger(timeout=0.5, controller=RateController(window=2, max_window=8, subnet_limit=4))
+        alive = asyncio.run(pinger.sweep(hosts))
+        self.assertEqual(sorted(alive), hosts, "Not all loopback addresses replied with adaptive window")
+        self.assertEqual(pinger.controller.in_flight, 0, "Probes left in flight")
+        self.assertIsNotNone(asyncio.run(pinger.ping(Address("127.0.0.1"))), "Loopback did not reply")
+
+
+if __name__ == "__main__":
+    unittest.main()
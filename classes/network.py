@@ -1,6 +1,78 @@
-from .address import Address, Octet
+from .address import Address, Octet, MAX_VALUE, is_mask_int
 from abc import ABC, abstractmethod, abstractproperty
-import copy
+from collections.abc import Sequence
+from typing import Union
+import unittest
+
+
+class AddressRange(Sequence):
+    """Lazy, read-only sequence of consecutive addresses.
+
+    Addresses are created only when accessed, so length, indexing,
+    slicing and membership tests are O(1) regardless of range size.
+
+    Arguments:
+        first (Address) -- First address in range.
+        last (Address) -- Last address in range (inclusive).
+    """
+
+    __slots__ = ["_range"]
+
+    def __init__(self, first: Address, last: Address) -> None:
+        if not isinstance(first, Address) or not isinstance(last, Address):
+            raise TypeError("Range bounds have to be Address objects!")
+        self._range = range(first.value, last.value + 1)
+
+    @classmethod
+    def _from_range(cls, int_range: range) -> "AddressRange":
+        """Create view directly from range of integer address values."""
+        view = cls.__new__(cls)
+        view._range = int_range
+        return view
+
+    def __len__(self) -> int:
+        return len(self._range)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Address, "AddressRange"]:
+        if isinstance(index, slice):
+            return AddressRange._from_range(self._range[index])
+        return Address.from_int(self._range[index])
+
+    def __iter__(self):
+        from_int = Address.from_int
+        for value in self._range:
+            yield from_int(value)
+
+    def __reversed__(self):
+        from_int = Address.from_int
+        for value in reversed(self._range):
+            yield from_int(value)
+
+    def __contains__(self, addr: Address) -> bool:
+        if not isinstance(addr, Address):
+            return False
+        return addr.value in self._range
+
+    def index(self, addr: Address) -> int:
+        if not isinstance(addr, Address):
+            raise TypeError("Searched value has to be Address object!")
+        return self._range.index(addr.value)
+
+    def count(self, addr: Address) -> int:
+        return 1 if addr in self else 0
+
+    def __eq__(self, other: "AddressRange") -> bool:
+        if isinstance(other, AddressRange):
+            return self._range == other._range
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self._range)
+
+    def __str__(self) -> str:
+        if not len(self):
+            return "[]"
+        return f"[{self[0]} - {self[-1]}]"
 
 
 class iNetwork(ABC):
@@ -50,10 +122,15 @@ class Network(iNetwork):
     def mask(self, value: Address) -> None:
         if not isinstance(value, Address):
             raise TypeError("Network creation address have to be Address object!")
-        if "01" in value.get_binary():
+        if not is_mask_int(value.value):
             raise ValueError(f"{value} is not a mask address!")
         self._mask = value
 
+    @property
+    def prefix(self) -> int:
+        """Return mask prefix length (e.g. 24 for 255.255.255.0)."""
+        return int(self._mask)
+
     @property
     def net_addr(self) -> Address:
         return self._net_addr
@@ -75,29 +152,26 @@ class Network(iNetwork):
         self._broad_addr = value
 
     @property
-    def hosts(self) -> list:
+    def hosts(self) -> AddressRange:
+        """Return lazy view of host addresses (without network and broadcast address)."""
         return self.addresses[1:-1]
 
     @hosts.setter
-    def hosts(self, value: list) -> None:
-        if type(value) is not list or not all([isinstance(x, Address) for x in value]):
+    def hosts(self, value: Union[list, AddressRange]) -> None:
+        if not isinstance(value, AddressRange) and (type(value) is not list or not all([isinstance(x, Address) for x in value])):
             raise TypeError("Invalid types in hosts value!")
         self._hosts = value
 
     @property
-    def addresses(self) -> list:
+    def addresses(self) -> AddressRange:
+        """Return lazy view of all addresses in network (including network and broadcast address)."""
         if self._net_addr is None or self._broad_addr is None:
             raise ValueError("Network was not initialized!")
-        addresses = []
-        cur_addr = copy.copy(self._net_addr)
-        while cur_addr < self._broad_addr:
-            addresses.append(cur_addr)
-            cur_addr += 1
-        return addresses
+        return AddressRange(self._net_addr, self._broad_addr)
     
     @addresses.setter
-    def addresses(self, value: list) -> None:
-        if type(value) is not list or not all([isinstance(x, Address) for x in value]):
+    def addresses(self, value: Union[list, AddressRange]) -> None:
+        if not isinstance(value, AddressRange) and (type(value) is not list or not all([isinstance(x, Address) for x in value])):
             raise TypeError("Invalid types in hosts value!")
         self._addresses = value
 
@@ -112,35 +186,134 @@ class Network(iNetwork):
     def net_setup(self) -> None:
         if self._addr is None or self._mask is None:
             raise ValueError("Address or mask is not set!")
-        bin_net_addr = ''.join(["0" if self._mask.get_binary()[x] == "0" else self._addr.get_binary()[x] for x in range(32)])
-        self._net_addr = Address(bin_net_addr)
-        bin_broad_addr = ''.join(["1" if self._mask.get_binary()[x] == "0" else self._addr.get_binary()[x] for x in range(32)])
-        self._broad_addr = Address(bin_broad_addr)
+        mask = self._mask.value
+        net = self._addr.value & mask
+        self._net_addr = Address.from_int(net)
+        self._broad_addr = Address.from_int(net | (~mask & MAX_VALUE))
         self._n_hosts = 2**(32-int(self._mask)) - 2
     
     def get_difference_mask(self, sub_mask: Address) -> Address:
         if not isinstance(sub_mask, Address) or not sub_mask.mask:
             raise TypeError("Sub Mask should be Mask Address!")
-        str_mask1, str_mask2 = [self._mask.get_binary(), sub_mask.get_binary()]
-        str_diff_mask = ""
-        for i in range(32):
-            if str_mask1[i] != str_mask2[i]:
-                str_diff_mask += "1"
-            else:
-                str_diff_mask += "0"
-        return Address(str_diff_mask)
-
-    def get_sub_networks(self, mask: Address) -> list:
+        return Address.from_int(self._mask.value ^ sub_mask.value)
+
+    def get_sub_networks(self, mask: Address) -> "SubNetworkRange":
+        """Return lazy sequence of all sub-networks with given mask."""
         if not isinstance(mask, Address):
             raise TypeError("Mask address should be `Address` object")
-        n_subnets = 2**abs(int(self._mask) - int(mask))
-        diff_mask = self.get_difference_mask(mask)
-        cur_net_addr = copy.deepcopy(self._net_addr)
-        sub_nets = []
-        for i in range(n_subnets):
-            sub_nets.append(SubNetwork(self, copy.deepcopy(cur_net_addr), mask))
-            cur_net_addr = cur_net_addr.increment_with_difference_mask(diff_mask)
-        return sub_nets
+        return SubNetworkRange(self, mask)
+
+    def get_sub_network(self, mask: Address, index: int) -> "SubNetwork":
+        """Return sub-network with given mask at given index (without creating other ones)."""
+        return self.get_sub_networks(mask)[index]
+
+    def get_super_network(self, mask: Address) -> "Network":
+        """Return network with given (shorter) mask that contains this network."""
+        if not isinstance(mask, Address) or not mask.mask:
+            raise TypeError("Mask should be Mask Address!")
+        if int(mask) > int(self._mask):
+            raise ValueError(f"Mask {mask} is longer than network mask {self._mask}!")
+        return Network(self._net_addr, mask)
+
+    def __contains__(self, value: Union[Address, "Network"]) -> bool:
+        if isinstance(value, Network):
+            return value.net_addr.value in self.addresses._range and value.broad_addr.value in self.addresses._range
+        if isinstance(value, Address):
+            return value.value & self._mask.value == self._net_addr.value
+        return False
+
+    def __str__(self) -> str:
+        return f"{self._net_addr}/{int(self._mask)}"
+
+
+class SubNetworkRange(Sequence):
+    """Lazy sequence of sub-networks of parent network.
+
+    Arguments:
+        parent (Network) -- Network that is divided.
+        mask (Address) -- Mask of sub-networks (not shorter than parent mask).
+    """
+
+    __slots__ = ["_parent", "_mask", "_range"]
+
+    def __init__(self, parent: Network, mask: Address) -> None:
+        if not isinstance(parent, Network):
+            raise TypeError("Parent should be `Network` object!")
+        if not isinstance(mask, Address) or not mask.mask:
+            raise TypeError("Sub Mask should be Mask Address!")
+        if int(mask) < int(parent.mask):
+            raise ValueError(f"Sub Mask {mask} is shorter than network mask {parent.mask}!")
+        self._parent = parent
+        self._mask = mask
+        step = 1 << (32 - int(mask))
+        self._range = range(parent.net_addr.value, parent.broad_addr.value + 1, step)
+
+    @property
+    def mask(self) -> Address:
+        return self._mask
+
+    def __len__(self) -> int:
+        return len(self._range)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union["SubNetwork", "SubNetworkRange"]:
+        if isinstance(index, slice):
+            view = SubNetworkRange.__new__(SubNetworkRange)
+            view._parent, view._mask, view._range = self._parent, self._mask, self._range[index]
+            return view
+        return SubNetwork(self._parent, Address.from_int(self._range[index]), self._mask)
+
+    def __iter__(self):
+        for value in self._range:
+            yield SubNetwork(self._parent, Address.from_int(value), self._mask)
+
+    def index_of(self, addr: Address) -> int:
+        """Return index of sub-network containing given address."""
+        if not isinstance(addr, Address):
+            raise TypeError("Address should be `Address` object!")
+        net_value = addr.value & self._mask.value
+        if net_value not in self._range:
+            raise ValueError(f"{addr} is not in this range of sub-networks!")
+        return self._range.index(net_value)
+
+    def find(self, addr: Address) -> "SubNetwork":
+        """Return sub-network containing given address."""
+        return self[self.index_of(addr)]
+
+    def __contains__(self, value: Union[Address, Network]) -> bool:
+        if isinstance(value, Network):
+            return int(value.mask) == int(self._mask) and value.net_addr.value in self._range
+        if isinstance(value, Address):
+            return value.value & self._mask.value in self._range
+        return False
+
+
+def collapse_networks(networks: list) -> list:
+    """Summarise networks into smallest list of networks covering the same addresses.
+
+    Overlapping and adjacent networks are merged (e.g. 10.0.0.0/25 and
+    10.0.0.128/25 become 10.0.0.0/24).
+    """
+    if not all([isinstance(x, Network) for x in networks]):
+        raise TypeError("All values should be `Network` objects!")
+    intervals = sorted((x.net_addr.value, x.broad_addr.value) for x in networks)
+    merged = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+
+    collapsed = []
+    for start, end in merged:
+        while start <= end:
+            # Largest block aligned at `start` that does not pass `end`
+            size = (start & -start) if start else 1 << 32
+            while start + size - 1 > end:
+                size >>= 1
+            prefix = 32 - (size.bit_length() - 1)
+            collapsed.append(Network(Address.from_int(start), Address.from_prefix(prefix)))
+            start += size
+    return collapsed
 
 
 class SubNetwork(Network):
@@ -149,6 +322,7 @@ class SubNetwork(Network):
         self.parent = parent
         self.mask = mask
         self.addr = addr
+        self.net_setup()
     
     @property
     def parent(self) -> Network:
@@ -172,8 +346,7 @@ class SubNetwork(Network):
     def addr(self, value: Address) -> None:
         if not isinstance(value, Address):
             raise TypeError("Wrong value type!")
-        bin_addr = ''.join(["0" if self._mask.get_binary()[x] == "0" else value.get_binary()[x] for x in range(32)])
-        self._addr = Address(bin_addr)
+        self._addr = Address.from_int(value.value & self._mask.value)
     
     @property
     def mask(self) -> Address:
@@ -185,6 +358,54 @@ class SubNetwork(Network):
     def mask(self, value: Address) -> None:
         if not isinstance(value, Address):
             raise TypeError("Wrong value type!")
-        if "01" in value.get_binary():
+        if not is_mask_int(value.value):
             raise ValueError(f"{value} is not a mask address!")
         self._mask = value
+
+
+class NetworkTest(unittest.TestCase):
+    def test_addresses(self):
+        net = Network(Address("192.168.1.7"), Address(24))
+        self.assertEqual(len(net.addresses), 256, "Wrong number of addresses")
+        self.assertEqual(len(net.hosts), net.n_hosts, "Wrong number of hosts")
+        self.assertEqual(str(net.hosts[0]), "192.168.1.1", "Wrong first host")
+        self.assertEqual(str(net.hosts[-1]), "192.168.1.254", "Wrong last host")
+        self.assertIn(Address("192.168.1.100"), net.hosts, "Host not in network")
+        self.assertNotIn(Address("192.168.1.255"), net.hosts, "Broadcast address in hosts")
+        self.assertEqual([str(x) for x in net.addresses[2:8:3]], ["192.168.1.2", "192.168.1.5"], "Wrong slicing")
+
+    def test_large_network(self):
+        net = Network(Address("10.0.0.0"), Address(8))
+        self.assertEqual(len(net.hosts), 2**24 - 2, "Wrong number of hosts")
+        self.assertEqual(net.addresses.index(Address("10.1.0.0")), 65536, "Wrong address index")
+
+    def test_sub_networks(self):
+        net = Network(Address("192.168.1.7"), Address(24))
+        subnets = net.get_sub_networks(Address(26))
+        self.assertEqual([str(x) for x in subnets], ["192.168.1.0/26", "192.168.1.64/26", "192.168.1.128/26", "192.168.1.192/26"],
+                         "Wrong sub-networks")
+        self.assertEqual(str(subnets[2].broad_addr), "192.168.1.191", "Wrong sub-network broadcast")
+        self.assertEqual(str(net.get_difference_mask(Address(26))), "0.0.0.192", "Wrong difference mask")
+
+        big = Network(Address("10.0.0.0"), Address(8)).get_sub_networks(Address(30))
+        self.assertEqual(len(big), 2**22, "Wrong number of sub-networks")
+        self.assertEqual(str(big[-1]), "10.255.255.252/30", "Wrong last sub-network")
+        self.assertEqual(big.index_of(Address("10.0.1.5")), 65, "Wrong sub-network index")
+        self.assertEqual(str(big.find(Address("10.0.1.5"))), "10.0.1.4/30", "Wrong sub-network lookup")
+
+    def test_super_networks(self):
+        net = Network(Address("192.168.1.64"), Address(26))
+        self.assertEqual(str(net.get_super_network(Address(16))), "192.168.0.0/16", "Wrong super-network")
+        self.assertIn(net, net.get_super_network(Address(24)), "Network not in super-network")
+        self.assertRaises(ValueError, net.get_super_network, Address(28))
+
+    def test_collapse(self):
+        nets = [Network(Address(x), Address(25)) for x in ["10.0.0.0", "10.0.0.128", "10.0.1.0"]]
+        nets.append(Network(Address("10.0.1.0"), Address(26)))
+        self.assertEqual([str(x) for x in collapse_networks(nets)], ["10.0.0.0/24", "10.0.1.0/25"], "Wrong collapse")
+        nets = [Network(Address("10.0.0.128"), Address(25)), Network(Address("10.0.1.0"), Address(25))]
+        self.assertEqual([str(x) for x in collapse_networks(nets)], ["10.0.0.128/25", "10.0.1.0/25"], "Wrong collapse")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+#############################################
+# Local generation of airOS password hashes
+# Author: MattTheCoder-W
+#############################################
+
+import secrets
+import hashlib
+import unittest
+import functools
+
+MAGIC = "$1$"  # MD5-crypt, format used by airOS in `/etc/passwd` and `users.1.password`
+ITOA64 = "./0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+
+
+def _to64(value: int, length: int) -> str:
+    out = ""
+    for _ in range(length):
+        out += ITOA64[value & 0x3f]
+        value >>= 6
+    return out
+
+
+def md5_crypt(password: str, salt: str) -> str:
+    """Return MD5-crypt (`$1$salt$hash`) of password, same as `crypt(3)` and `openssl passwd -1`.
+
+    Pure Python replacement for deprecated `crypt` module (only first 8 characters of salt are used).
+    """
+    if salt.startswith(MAGIC):
+        salt = salt[len(MAGIC):]
+    salt = salt.split("$", 1)[0][:8]
+    pw, s, magic = password.encode(), salt.encode(), MAGIC.encode()
+
+    final = hashlib.md5(pw + s + pw).digest()
+    ctx = pw + magic + s
+    for length in range(len(pw), 0, -16):
+        ctx += final[:min(16, length)]
+    i = len(pw)
+    while i:
+        ctx += b"\0" if i & 1 else pw[:1]
+        i >>= 1
+    final = hashlib.md5(ctx).digest()
+
+    for i in range(1000):  # Slow down brute force (part of the format)
+        ctx = pw if i & 1 else final
+        if i % 3:
+            ctx += s
+        if i % 7:
+            ctx += pw
+        ctx += final if i & 1 else pw
+        final = hashlib.md5(ctx).digest()
+
+    encoded = "".join(_to64((final[a] << 16) | (final[b] << 8) | final[c], 4)
+                      for a, b, c in ((0, 6, 12), (1, 7, 13), (2, 8, 14), (3, 9, 15), (4, 10, 5)))
+    encoded += _to64(final[11], 2)
+    return f"{MAGIC}{salt}${encoded}"
+
+
+def make_salt(length: int = 8) -> str:
+    """Return random salt from crypt alphabet."""
+    return "".join(secrets.choice(ITOA64) for _ in range(length))
+
+
+@functools.lru_cache(maxsize=None)
+def password_hash(password: str, salt: str = None) -> str:
+    """Return MD5-crypt hash of password, computed once per password and salt.
+
+    When salt is None random salt is drawn on first call and the same hash
+    is returned for the rest of the run, so all devices getting the same
+    password share one hash computation.
+    """
+    return md5_crypt(password, make_salt() if salt is None else salt)
+
+
+class PasswordHashTest(unittest.TestCase):
+    def test_md5_crypt(self):
+        # Reference values from `openssl passwd -1 -salt SALT PASSWORD`
+        self.assertEqual(md5_crypt("secret", "abcdefgh"), "$1$abcdefgh$cHJi5PXp/ki/ktXzqlk6I1", "Wrong hash")
+        self.assertEqual(md5_crypt("", "x"), "$1$x$fwjfZtMwarkdetsjiQreU1", "Wrong hash of empty password")
+        self.assertEqual(md5_crypt("a" * 40, "$1$saltsalt$"), "$1$saltsalt$xbcEYb2v/vQerF.rDxN620",
+                         "Wrong hash of long password")
+
+    def test_password_hash(self):
+        first = password_hash("ubnt")
+        self.assertTrue(first.startswith("$1$"), "Wrong hash format")
+        self.assertEqual(password_hash("ubnt"), first, "Hash was computed again")
+        self.assertEqual(md5_crypt("ubnt", first), first, "Hash does not verify")
+        self.assertEqual(password_hash("ubnt", "abcdefgh"), md5_crypt("ubnt", "abcdefgh"), "Fixed salt was not used")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+#############################################
+# Bounded worker pools chained into pipeline
+# Author: MattTheCoder-W
+#############################################
+
+import queue
+import threading
+import unittest
+import concurrent.futures
+from typing import Callable, Iterable, Iterator
+
+
+def imap_unordered(func: Callable, items: Iterable, workers: int, backlog: int = None) -> Iterator:
+    """Call `func` on every item in pool of `workers` threads and yield results as soon as they are ready.
+
+    Items are taken from iterable in background thread, so it may be slow
+    generator (e.g. `Finder.iter_found` or other `imap_unordered`) and
+    stages can be chained into pipeline. At most `backlog` items are taken
+    ahead of results read by caller. Exception raised by `func` is raised
+    when its result is yielded.
+
+    Arguments:
+        func (Callable) -- Function called with single item.
+        items (Iterable) -- Input items.
+        workers (int) -- Number of threads.
+        backlog [opt] (int) -- Maximum number of items taken but not yielded yet (Default: 2 * workers).
+    """
+    if workers < 1:
+        raise ValueError("At least one worker is required!")
+    results = queue.Queue()
+    slots = threading.Semaphore(backlog or 2 * workers)
+    stop = threading.Event()
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+    submitted = [0]
+    feeding_errors = []
+
+    def feed() -> None:
+        try:
+            for item in items:
+                slots.acquire()
+                if stop.is_set():
+                    break
+                future = executor.submit(func, item)
+                future.add_done_callback(results.put)
+                submitted[0] += 1
+        except Exception as e:
+            feeding_errors.append(e)
+        finally:
+            results.put(None)  # All items submitted
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    try:
+        done, fed = 0, False
+        while not fed or done < submitted[0]:
+            future = results.get()
+            if future is None:
+                fed = True
+                continue
+            done += 1
+            slots.release()
+            yield future.result()
+        if feeding_errors:
+            raise feeding_errors[0]
+    finally:
+        stop.set()
+        slots.release()  # Wake up feeder waiting for free slot
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+class PipelineTest(unittest.TestCase):
+    def test_results(self):
+        self.assertEqual(sorted(imap_unordered(lambda x: x * 2, range(100), workers=8)), list(range(0, 200, 2)),
+                         "Wrong results")
+        stages = imap_unordered(lambda x: x + 1, imap_unordered(lambda x: x * 2, iter(range(10)), workers=3), workers=2)
+        self.assertEqual(sorted(stages), [x * 2 + 1 for x in range(10)], "Wrong results of chained stages")
+
+    def test_errors(self):
+        def fail(x):
+            if x == 3:
+                raise KeyError(x)
+            return x
+
+        with self.assertRaises(KeyError):
+            list(imap_unordered(fail, range(5), workers=2))
+
+        def broken():
+            yield 1
+            raise ValueError("broken input")
+
+        with self.assertRaises(ValueError):
+            list(imap_unordered(fail, broken(), workers=2))
+
+    def test_backlog(self):
+        taken = []
+
+        def items():
+            for x in range(100):
+                taken.append(x)
+                yield x
+
+        results = imap_unordered(lambda x: x, items(), workers=1, backlog=2)
+        next(results)
+        self.assertLessEqual(len(taken), 4, "Too many items taken ahead")
+        results.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
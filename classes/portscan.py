@@ -0,0 +1,168 @@
+###################################
+# Asynchronous TCP connect port scan
+# Author: MattTheCoder-W
+###################################
+
+import time
+import queue
+import socket
+import asyncio
+import unittest
+import threading
+from typing import Callable, Iterable, Iterator, Tuple
+
+from .address import Address, Port
+
+
+async def check_port(port: Port, timeout: float = 1.0) -> bool:
+    """Check if TCP port accepts connections (without pinging host first)."""
+    if not isinstance(port, Port):
+        raise TypeError("Value should be `Port` object!")
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(str(port.addr), port.value), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return True
+
+
+async def scan_ports_async(addresses: Iterable[Address], ports: Iterable[int] = (22,), timeout: float = 1.0,
+                           concurrency: int = 256, callback: Callable = None, on_result: Callable = None) -> dict:
+    """Probe every (address, port) pair concurrently.
+
+    Addresses may be asynchronous iterable, then probes start while
+    addresses still arrive (see `iter_scan`).
+
+    Arguments:
+        addresses (Iterable) -- Addresses to check (iterable or asynchronous iterable).
+        ports [opt] (Iterable) -- Port numbers to check on every address (Default: 22).
+        timeout [opt] (float) -- Connection timeout in seconds (Default: 1.0).
+        concurrency [opt] (int) -- Maximum number of simultaneous connection attempts (Default: 256).
+        callback [opt] (Callable) -- Called as `callback(port)` for every open `Port`.
+        on_result [opt] (Callable) -- Called as `on_result(port, is_open)` for every checked `Port`.
+
+    Returns:
+        dict -- {Address: [open port numbers]} for every checked address.
+    """
+    if concurrency < 1:
+        raise ValueError("Concurrency should be at least 1!")
+    ports = list(ports)
+    limit = asyncio.Semaphore(concurrency)
+    results = {}
+    tasks = set()
+
+    async def probe(port: Port) -> None:
+        try:
+            is_open = await check_port(port, timeout)
+        finally:
+            limit.release()
+        if is_open:
+            results[port.addr].append(port.value)
+            if callback is not None:
+                callback(port)
+        if on_result is not None:
+            on_result(port, is_open)
+
+    async def start(addr: Address) -> None:
+        results[addr] = []
+        for value in ports:
+            await limit.acquire()  # Only `concurrency` probes in flight, slow one does not hold back the rest
+            task = asyncio.ensure_future(probe(Port(addr, value)))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+    if hasattr(addresses, "__aiter__"):
+        async for addr in addresses:
+            await start(addr)
+    else:
+        for addr in addresses:
+            await start(addr)
+    await asyncio.gather(*tasks)
+    for open_ports in results.values():
+        open_ports.sort()
+    return results
+
+
+def scan_ports(addresses: Iterable[Address], ports: Iterable[int] = (22,), timeout: float = 1.0,
+               concurrency: int = 256) -> dict:
+    """Synchronous wrapper for `scan_ports_async`."""
+    return asyncio.run(scan_ports_async(addresses, ports, timeout, concurrency))
+
+
+def iter_scan(addresses: Iterable[Address], ports: Iterable[int] = (22,), timeout: float = 1.0,
+              concurrency: int = 256) -> Iterator[Tuple[Port, bool]]:
+    """Probe ports in one event loop and yield (Port, is open) as soon as every probe finishes.
+
+    Addresses may come from slow generator (e.g. `Finder.iter_found`), it
+    is read in background thread, so probes of already found hosts run
+    while scan continues.
+    """
+    results = queue.Queue()
+    stop = threading.Event()
+    end = object()
+
+    async def pull():
+        loop = asyncio.get_running_loop()
+        items = iter(addresses)
+        while not stop.is_set():
+            addr = await loop.run_in_executor(None, next, items, end)
+            if addr is end:
+                break
+            yield addr
+
+    def run() -> None:
+        try:
+            asyncio.run(scan_ports_async(pull(), ports, timeout, concurrency,
+                                         on_result=lambda port, is_open: results.put((port, is_open))))
+        except Exception as e:
+            results.put(e)
+        finally:
+            results.put(end)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = results.get()
+            if item is end:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()  # Caller stopped reading, do not take more addresses
+
+
+class PortScanTest(unittest.TestCase):
+    def test_loopback(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(("127.0.0.1", 0))
+        server.listen(8)
+        open_port = server.getsockname()[1]
+
+        closed = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        closed.bind(("127.0.0.1", 0))
+        closed_port = closed.getsockname()[1]  # Bound but not listening
+        try:
+            addr = Address("127.0.0.1")
+            result = scan_ports([addr], [open_port, closed_port], timeout=0.5)
+            self.assertEqual(result, {addr: [open_port]}, "Wrong open ports")
+
+            def found():  # Slow generator like `Finder.iter_found`
+                for host in ("127.0.0.1", "127.0.0.2", "127.0.0.3"):
+                    time.sleep(0.05)
+                    yield Address(host)
+            result = sorted((str(port.addr), is_open) for port, is_open in iter_scan(found(), [open_port], timeout=0.5))
+            self.assertEqual(result, [("127.0.0.1", True), ("127.0.0.2", False), ("127.0.0.3", False)],
+                             "Wrong streamed results")
+        finally:
+            server.close()
+            closed.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,197 @@
+#############################################
+# Declarative configuration profiles
+# Author: MattTheCoder-W
+#############################################
+
+import os
+import json
+import hashlib
+import threading
+import unittest
+import tempfile
+from collections import namedtuple
+
+try:
+    import tomllib  # Python 3.11+
+except ImportError:
+    tomllib = None
+
+from .address import Address
+from .network import Network
+from .configurator import Configurator
+
+ProfilePatch = namedtuple("ProfilePatch", ["cfg", "commands", "fingerprint"])  # Compiled settings for device
+
+SETTINGS = ["dns", "snmp", "ntp", "timezone", "compliance_test", "hostname", "language", "set"]
+SNMP_SETTINGS = ["community", "contact", "location"]
+
+
+class Profile:
+    """Settings applied on devices, with overrides for subnets and single hosts.
+
+    Profile is dictionary (or JSON/TOML file) like:
+        {
+            "dns": ["91.232.50.10", "91.232.52.10"],
+            "snmp": {"community": "local", "contact": "admin@example.com", "location": "Banino"},
+            "ntp": "91.232.52.123",
+            "timezone": "-1",
+            "compliance_test": false,
+            "set": {"gui.language": "en_US"},
+            "overrides": [
+                {"match": "10.0.1.0/24", "snmp": {"location": "Tower 1"}},
+                {"match": "10.0.1.15", "hostname": "ap-15"}
+            ]
+        }
+
+    Settings are translated to `system.cfg` properties by `Configurator`
+    once for every distinct set of matching overrides, so configuring device
+    is just merging flat patch. More specific override (longer prefix) wins,
+    `snmp` and `set` are merged key by key.
+
+    Arguments:
+        data (dict) -- Profile content.
+    """
+
+    def __init__(self, data: dict) -> None:
+        if not isinstance(data, dict):
+            raise TypeError("Profile should be dictionary!")
+        self.settings = self._check(data, allowed=SETTINGS + ["overrides"])
+        self.overrides = []  # [(Network, settings)] from least to most specific
+        for override in data.get("overrides", []):
+            override = self._check(override, allowed=SETTINGS + ["match"])
+            addr, _, prefix = override["match"].partition("/")
+            network = Network(Address(addr), Address(int(prefix or 32)))
+            self.overrides.append((network, {k: v for k, v in override.items() if k != "match"}))
+        self.overrides.sort(key=lambda override: override[0].prefix)  # Stable, so file order stays for equal prefixes
+        self._compiled = {}  # {indexes of matching overrides: ProfilePatch}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _check(data: dict, allowed: list) -> dict:
+        unknown = [key for key in data if key not in allowed]
+        if unknown:
+            raise ValueError(f"Unknown profile settings: {', '.join(unknown)}")
+        if "overrides" not in allowed and "match" not in data:
+            raise ValueError("Override without `match`!")
+        if "snmp" in data:
+            if not isinstance(data["snmp"], dict):
+                raise ValueError("SNMP settings should be dictionary!")
+            unknown = [key for key in data["snmp"] if key not in SNMP_SETTINGS]
+            if unknown:
+                raise ValueError(f"Unknown SNMP settings: {', '.join(unknown)} (allowed: {', '.join(SNMP_SETTINGS)})")
+        return data
+
+    @classmethod
+    def load(cls, path: str) -> "Profile":
+        """Load profile from JSON or TOML (`.toml` extension) file."""
+        if path.endswith(".toml"):
+            if tomllib is None:
+                raise ImportError("TOML profiles require Python 3.11 or newer, use JSON instead!")
+            with open(path, "rb") as f:
+                return cls(tomllib.load(f))
+        with open(path, "r") as f:
+            return cls(json.load(f))
+
+    def _merge(self, indexes: tuple) -> dict:
+        settings = {key: value for key, value in self.settings.items() if key != "overrides"}
+        for i in indexes:
+            for key, value in self.overrides[i][1].items():
+                if isinstance(value, dict) and isinstance(settings.get(key), dict):
+                    settings[key] = {**settings[key], **value}
+                else:
+                    settings[key] = value
+        return settings
+
+    @staticmethod
+    def compile(settings: dict) -> ProfilePatch:
+        """Translate settings into flat {property_name: value} patch and commands."""
+        conf = Configurator({})
+        if "dns" in settings:
+            conf.set_dns(*[Address(x) for x in settings["dns"]])
+        if "snmp" in settings:
+            snmp = settings["snmp"]
+            missing = [key for key in SNMP_SETTINGS if key not in snmp]  # Overrides may set only some of them
+            if missing:
+                raise ValueError(f"Missing SNMP settings: {', '.join(missing)}")
+            conf.set_snmp(snmp["community"], snmp["contact"], snmp["location"])
+        if "ntp" in settings:
+            conf.set_ntp(Address(settings["ntp"]))
+        if "timezone" in settings:
+            conf.set_timezone(str(settings["timezone"]))
+        if "compliance_test" in settings:
+            if settings["compliance_test"]:
+                conf.enable_compliance_test()
+            else:
+                conf.disable_compliance_test()
+        if "hostname" in settings:
+            conf.set_hostname(settings["hostname"])
+        if "language" in settings:
+            if settings["language"] not in Configurator.languages:
+                raise ValueError(f"Unsupported language: {settings['language']}")
+            conf.change_language(settings["language"])
+        for key, value in settings.get("set", {}).items():
+            conf.cfg[key] = str(value)
+        content = json.dumps([conf.cfg, conf.commands], sort_keys=True).encode()
+        return ProfilePatch(conf.cfg, conf.commands, hashlib.md5(content).hexdigest())
+
+    def patch_for(self, addr: Address) -> ProfilePatch:
+        """Return compiled settings for device (compiled once for every combination of overrides)."""
+        indexes = tuple(i for i, (network, _) in enumerate(self.overrides) if addr in network)
+        with self._lock:
+            patch = self._compiled.get(indexes)
+            if patch is None:
+                patch = self._compiled[indexes] = self.compile(self._merge(indexes))
+        return patch
+
+
+class ProfileTest(unittest.TestCase):
+    data = {
+        "dns": ["91.232.50.10", "91.232.52.10"],
+        "snmp": {"community": "local", "contact": "admin@example.com", "location": "Banino"},
+        "timezone": "-1",
+        "compliance_test": False,
+        "overrides": [
+            {"match": "10.0.1.15", "hostname": "ap-15", "set": {"gui.language": "en_US"}},
+            {"match": "10.0.1.0/24", "snmp": {"location": "Tower 1"}, "timezone": 2},
+        ],
+    }
+
+    def test_patch(self):
+        profile = Profile(self.data)
+        base = profile.patch_for(Address("10.0.2.1"))
+        self.assertEqual(base.cfg["resolv.nameserver.2.ip"], "91.232.52.10", "DNS was not compiled")
+        self.assertEqual(base.cfg["system.timezone"], "GMT-1", "Wrong timezone")
+        self.assertEqual(base.commands, ["rm -f /etc/persistent/ct"], "Compliance test command missing")
+
+        tower = profile.patch_for(Address("10.0.1.20"))
+        self.assertEqual(tower.cfg["snmp.location"], "Tower 1", "Subnet override not applied")
+        self.assertEqual(tower.cfg["snmp.community"], "local", "SNMP settings were not merged")
+        self.assertEqual(tower.cfg["system.timezone"], "GMT2", "Wrong overridden timezone")
+        self.assertNotEqual(tower.fingerprint, base.fingerprint, "Different patches have same fingerprint")
+
+        host = profile.patch_for(Address("10.0.1.15"))
+        self.assertEqual(host.cfg["resolv.host.1.name"], "ap-15", "Host override not applied")
+        self.assertEqual(host.cfg["snmp.location"], "Tower 1", "Less specific override not applied")
+        self.assertEqual(host.cfg["gui.language"], "en_US", "Raw properties not applied")
+        self.assertIs(profile.patch_for(Address("10.0.1.20")), tower, "Patch was compiled again")
+
+    def test_load(self):
+        with tempfile.TemporaryDirectory() as path:
+            with open(os.path.join(path, "profile.json"), "w") as f:
+                json.dump(self.data, f)
+            profile = Profile.load(os.path.join(path, "profile.json"))
+            self.assertEqual(len(profile.overrides), 2, "Overrides not loaded")
+        with self.assertRaises(ValueError):
+            Profile({"dsn": ["1.1.1.1"]})
+        with self.assertRaises(ValueError):
+            Profile({"overrides": [{"hostname": "x"}]})
+        with self.assertRaises(ValueError):
+            Profile({"snmp": {"community": "local", "contact": "a@b.c", "locaton": "Banino"}})
+        with self.assertRaises(ValueError):
+            Profile({"overrides": [{"match": "10.0.0.1", "snmp": {"comunity": "local"}}]})
+        with self.assertRaises(ValueError):
+            Profile({"overrides": [{"match": "10.0.0.1", "snmp": {"location": "x"}}]}).patch_for(Address("10.0.0.1"))
+
+
+if __name__ == "__main__":
+    unittest.main()
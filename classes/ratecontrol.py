@@ -0,0 +1,202 @@
+#################################################
+# Adaptive concurrency and rate control for scans
+# Author: MattTheCoder-W
+#################################################
+
+import time
+import threading
+import unittest
+
+from .address import Address
+
+
+class RateController:
+    """Limit number of probes in flight and probes per second.
+
+    In adaptive mode the in-flight window is controlled AIMD-style: it grows
+    while replies come back with stable latency and is cut down when
+    latency rises or loss is detected (at most once per round trip).
+
+    Arguments:
+        window [opt] (int) -- Initial number of probes in flight (Default: 15).
+        min_window [opt] (int) -- Lowest allowed window (Default: 1).
+        max_window [opt] (int) -- Highest allowed window (Default: 1024).
+        max_rate [opt] (float) -- Global cap of probes per second, None for no cap (Default: None).
+        subnet_prefix [opt] (int) -- Prefix length used for grouping addresses into subnets (Default: 24).
+        subnet_limit [opt] (int) -- Maximum probes in flight per subnet, None for no limit (Default: None).
+        adaptive [opt] (bool) -- Change window based on latency and loss (Default: True).
+        increase [opt] (float) -- Window growth per window of replies (Default: 1.0).
+        decrease [opt] (float) -- Window multiplier on congestion (Default: 0.5).
+        latency_factor [opt] (float) -- Reply slower than `base_rtt * latency_factor` means congestion (Default: 3.0).
+    """
+
+    def __init__(self, window: int = 15, min_window: int = 1, max_window: int = 1024, max_rate: float = None,
+                 subnet_prefix: int = 24, subnet_limit: int = None, adaptive: bool = True, increase: float = 1.0,
+                 decrease: float = 0.5, latency_factor: float = 3.0) -> None:
+        if min_window < 1 or max_window < min_window:
+            raise ValueError("Window limits should satisfy 1 <= min_window <= max_window!")
+        if max_rate is not None and max_rate <= 0:
+            raise ValueError("Rate should be greater than 0!")
+        if subnet_prefix not in range(0, 33):
+            raise ValueError("Subnet prefix out of range 0-32!")
+        if not 0 < decrease < 1:
+            raise ValueError("Decrease factor should be in range (0, 1)!")
+        self.min_window = min_window
+        self.max_window = max_window
+        self.max_rate = max_rate
+        self.subnet_prefix = subnet_prefix
+        self.subnet_limit = subnet_limit
+        self.adaptive = adaptive
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+
+        self._window = float(min(max(window, min_window), max_window))
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._subnets = {}  # {subnet_value: probes in flight}
+        self._next_send = time.monotonic()
+        self._slow_start = adaptive
+        self._last_decrease = 0.0
+        self.srtt = None  # Smoothed round trip time
+        self.base_rtt = None  # Lowest observed round trip time
+        self.peak_window = int(self._window)
+        self.sent = self.replies = self.losses = self.timeouts = 0
+
+    @property
+    def window(self) -> int:
+        return int(self._window)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _subnet(self, addr: Address) -> int:
+        return addr.value >> (32 - self.subnet_prefix) if self.subnet_prefix else 0
+
+    ### Admission
+
+    def can_send(self, addr: Address) -> bool:
+        """Check if probe to address fits into window and subnet limit."""
+        with self._lock:
+            if self._in_flight >= int(self._window):
+                return False
+            if self.subnet_limit is not None and self._subnets.get(self._subnet(addr), 0) >= self.subnet_limit:
+                return False
+            return True
+
+    def delay(self) -> float:
+        """Return time in seconds until next probe is allowed by rate cap."""
+        if self.max_rate is None:
+            return 0.0
+        return max(0.0, self._next_send - time.monotonic())
+
+    def on_send(self, addr: Address) -> None:
+        """Register sent probe."""
+        with self._lock:
+            self._in_flight += 1
+            subnet = self._subnet(addr)
+            self._subnets[subnet] = self._subnets.get(subnet, 0) + 1
+            self.sent += 1
+            if self.max_rate is not None:
+                interval = 1 / self.max_rate
+                self._next_send = max(self._next_send, time.monotonic() - interval) + interval
+
+    def _release(self, addr: Address) -> None:
+        self._in_flight = max(0, self._in_flight - 1)
+        subnet = self._subnet(addr)
+        left = self._subnets.get(subnet, 0) - 1
+        if left > 0:
+            self._subnets[subnet] = left
+        else:
+            self._subnets.pop(subnet, None)
+
+    ### Feedback
+
+    def on_reply(self, addr: Address, rtt: float) -> None:
+        """Register reply with its round trip time (in seconds)."""
+        with self._lock:
+            self._release(addr)
+            self.replies += 1
+            self.base_rtt = rtt if self.base_rtt is None else min(self.base_rtt, rtt)
+            self.srtt = rtt if self.srtt is None else 0.875 * self.srtt + 0.125 * rtt
+            if not self.adaptive:
+                return
+            if rtt > self.base_rtt * self.latency_factor and rtt - self.base_rtt > 0.005:
+                self._decrease()
+            elif self._slow_start:
+                self._window = min(self.max_window, self._window + 1)
+            else:
+                self._window = min(self.max_window, self._window + self.increase / self._window)
+            self.peak_window = max(self.peak_window, int(self._window))
+
+    def on_timeout(self, addr: Address) -> None:
+        """Register probe without reply (host is down or probe was lost, unknown which)."""
+        with self._lock:
+            self._release(addr)
+            self.timeouts += 1
+
+    def on_loss(self, addr: Address = None) -> None:
+        """Register detected loss (e.g. known host answered only to retry, send error)."""
+        with self._lock:
+            self.losses += 1
+            if self.adaptive:
+                self._decrease()
+
+    def _decrease(self) -> None:
+        """Cut window, at most once per round trip."""
+        now = time.monotonic()
+        if now - self._last_decrease < (self.srtt or 0):
+            return
+        self._last_decrease = now
+        self._slow_start = False
+        self._window = max(self.min_window, self._window * self.decrease)
+
+    ### Reporting
+
+    def stats(self) -> dict:
+        """Return current controller state."""
+        return {"window": self.window, "peak_window": self.peak_window, "in_flight": self._in_flight,
+                "srtt": self.srtt, "base_rtt": self.base_rtt, "sent": self.sent, "replies": self.replies,
+                "timeouts": self.timeouts, "losses": self.losses}
+
+    def __str__(self) -> str:
+        srtt = f"{self.srtt * 1000:.1f}ms" if self.srtt is not None else "-"
+        return (f"window={self.window} (peak {self.peak_window}), srtt={srtt}, "
+                f"sent={self.sent}, replies={self.replies}, losses={self.losses}")
+
+
+class RateControllerTest(unittest.TestCase):
+    def test_growth_and_decrease(self):
+        ctl = RateController(window=4, max_window=64)
+        addr = Address("10.0.0.1")
+        for _ in range(20):
+            ctl.on_send(addr)
+            ctl.on_reply(addr, 0.01)
+        self.assertGreater(ctl.window, 4, "Window did not grow")
+        grown = ctl.window
+        ctl.on_loss(addr)
+        self.assertEqual(ctl.window, grown // 2, "Window was not cut on loss")
+        ctl.on_loss(addr)
+        self.assertEqual(ctl.window, grown // 2, "Window was cut twice in one round trip")
+
+    def test_limits(self):
+        ctl = RateController(window=2, subnet_limit=1, adaptive=False)
+        first, second, other = Address("10.0.0.1"), Address("10.0.0.2"), Address("10.0.1.1")
+        ctl.on_send(first)
+        self.assertFalse(ctl.can_send(second), "Subnet limit was not applied")
+        self.assertTrue(ctl.can_send(other), "Other subnet was limited")
+        ctl.on_send(other)
+        self.assertFalse(ctl.can_send(Address("10.0.2.1")), "Window limit was not applied")
+        ctl.on_timeout(first)
+        self.assertTrue(ctl.can_send(second), "Slot was not released")
+
+    def test_rate(self):
+        ctl = RateController(max_rate=10, adaptive=False)
+        ctl.on_send(Address("10.0.0.1"))
+        ctl.on_send(Address("10.0.0.2"))
+        self.assertGreater(ctl.delay(), 0.05, "Rate cap was not applied")
+
+
+if __name__ == "__main__":
+    unittest.main()
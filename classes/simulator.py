@@ -0,0 +1,1111 @@
+#############################################
+# Simulator of airOS devices (SSH server)
+# Author: MattTheCoder-W
+#############################################
+
+import re
+import time
+import random
+import logging
+import socket
+import hashlib
+import posixpath
+import threading
+import unittest
+
+import paramiko
+
+from .address import Address
+from .passhash import md5_crypt, make_salt
+from .sysconfig import SystemConfig
+
+# Shell operators, longest first
+OPERATORS = ["2>>", "2>&", "2>", "&&", "||", ">>", "<<", ">&", ";", "&", "|", "(", ")", "<", ">", "\n"]
+REDIRECTIONS = ["<", ">", ">>", "2>", "2>>", "2>&", ">&"]
+NAME = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+CLOSE_TIMEOUT = 5.0  # Seconds given to client for closing finished channel
+TRANSPORT_LOG = f"{__name__}.transport"  # Port probes drop connections before banner, errors are not interesting
+
+logging.getLogger(TRANSPORT_LOG).addHandler(logging.NullHandler())
+
+
+class ShellSyntaxError(Exception):
+    pass
+
+
+class ShellExit(Exception):
+    def __init__(self, status: int) -> None:
+        super().__init__(status)
+        self.status = status
+
+
+def tokenize(script: str) -> tuple:
+    """Split shell script into tokens.
+
+    Returns:
+        tuple -- ([(kind, value, quoted)], [heredoc bodies]) where kind is `word`, `op` or `heredoc`
+    """
+    tokens, heredocs, pending = [], [], []
+    word, in_word, quoted = "", False, False
+    i, n = 0, len(script)
+
+    def end_word() -> None:
+        nonlocal word, in_word, quoted
+        if in_word:
+            tokens.append(("word", word, quoted))
+        word, in_word, quoted = "", False, False
+
+    while i < n:
+        c = script[i]
+        if c in " \t":
+            end_word()
+            i += 1
+        elif c == "\n":
+            end_word()
+            tokens.append(("op", "\n", False))
+            i += 1
+            for index, delimiter in pending:  # Heredoc bodies start after end of line
+                lines = []
+                while i < n:
+                    j = script.find("\n", i)
+                    j = n if j == -1 else j
+                    line, i = script[i:j], j + 1
+                    if line == delimiter:
+                        break
+                    lines.append(line + "\n")
+                heredocs[index] = "".join(lines)
+            pending = []
+        elif c == "#" and not in_word:
+            j = script.find("\n", i)
+            i = n if j == -1 else j
+        elif c == "'":
+            j = script.find("'", i + 1)
+            if j == -1:
+                raise ShellSyntaxError("Unterminated quoted string")
+            word, in_word, quoted, i = word + script[i + 1:j], True, True, j + 1
+        elif c == '"':
+            j = i + 1
+            while j < n and script[j] != '"':
+                if script[j] == "\\" and j + 1 < n and script[j + 1] in '"\\$`':
+                    j += 1
+                word += script[j]
+                j += 1
+            if j >= n:
+                raise ShellSyntaxError("Unterminated quoted string")
+            in_word, quoted, i = True, True, j + 1
+        elif c == "\\":
+            if script.startswith("\\\n", i):  # Line continuation
+                i += 2
+                continue
+            word, in_word, quoted, i = word + script[i + 1:i + 2], True, True, i + 2
+        else:
+            op = next((op for op in OPERATORS if script.startswith(op, i)), None)
+            if op is None or (op[0] == "2" and in_word):
+                word, in_word, i = word + c, True, i + 1
+                continue
+            end_word()
+            i += len(op)
+            if op != "<<":
+                tokens.append(("op", op, False))
+                continue
+            while i < n and script[i] in " \t":
+                i += 1
+            if i < n and script[i] in "'\"":
+                j = script.find(script[i], i + 1)
+                delimiter, i = script[i + 1:j], j + 1
+            else:
+                j = i
+                while j < n and script[j] not in " \t\n;&|()<>":
+                    j += 1
+                delimiter, i = script[i:j], j
+            if not delimiter:
+                raise ShellSyntaxError("Missing heredoc delimiter")
+            tokens.append(("heredoc", len(heredocs), False))
+            pending.append((len(heredocs), delimiter))
+            heredocs.append("")
+    end_word()
+    return tokens, heredocs
+
+
+class Parser:
+    """Parse tokens into tree of tuples:
+        ("list", [(node, background)]), ("and_or", first, [(op, node)]), ("pipe", [nodes]),
+        ("subshell", list, redirections), ("simple", assignments, words, redirections)
+    """
+
+    def __init__(self, tokens: list) -> None:
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self, kind: str = "op") -> str:
+        if self.pos < len(self.tokens) and self.tokens[self.pos][0] == kind:
+            return self.tokens[self.pos][1]
+        return None
+
+    def skip_newlines(self) -> None:
+        while self.peek() in (";", "\n"):
+            self.pos += 1
+
+    def parse(self) -> tuple:
+        node = self.parse_list()
+        if self.pos < len(self.tokens):
+            raise ShellSyntaxError(f"Unexpected `{self.tokens[self.pos][1]}`")
+        return node
+
+    def parse_list(self, end: str = None) -> tuple:
+        items = []
+        self.skip_newlines()
+        while self.pos < len(self.tokens) and (end is None or self.peek() != end):
+            node = self.parse_and_or()
+            background = self.peek() == "&"
+            if self.peek() in ("&", ";", "\n"):
+                self.pos += 1
+            items.append((node, background))
+            self.skip_newlines()
+        return ("list", items)
+
+    def parse_and_or(self) -> tuple:
+        first, rest = self.parse_pipe(), []
+        while self.peek() in ("&&", "||"):
+            op = self.peek()
+            self.pos += 1
+            while self.peek() == "\n":
+                self.pos += 1
+            rest.append((op, self.parse_pipe()))
+        return ("and_or", first, rest) if rest else first
+
+    def parse_pipe(self) -> tuple:
+        commands = [self.parse_command()]
+        while self.peek() == "|":
+            self.pos += 1
+            commands.append(self.parse_command())
+        return ("pipe", commands) if len(commands) > 1 else commands[0]
+
+    def parse_redirections(self, redirections: list) -> bool:
+        if self.peek("heredoc") is not None:
+            redirections.append(("<<", self.peek("heredoc")))
+            self.pos += 1
+            return True
+        op = self.peek()
+        if op not in REDIRECTIONS:
+            return False
+        self.pos += 1
+        if self.peek("word") is None:
+            raise ShellSyntaxError(f"Missing target of `{op}`")
+        redirections.append((op, self.tokens[self.pos][1:]))
+        self.pos += 1
+        return True
+
+    def parse_command(self) -> tuple:
+        redirections = []
+        if self.peek() == "(":
+            self.pos += 1
+            body = self.parse_list(end=")")
+            if self.peek() != ")":
+                raise ShellSyntaxError("Missing `)`")
+            self.pos += 1
+            while self.parse_redirections(redirections):
+                pass
+            return ("subshell", body, redirections)
+        assignments, words = [], []
+        while True:
+            if self.peek("word") is not None:
+                value, quoted = self.tokens[self.pos][1:]
+                name, sep, _ = value.partition("=")
+                if not words and sep and NAME.fullmatch(name):
+                    assignments.append((value, quoted))
+                else:
+                    words.append((value, quoted))
+                self.pos += 1
+            elif not self.parse_redirections(redirections):
+                break
+        if not (assignments or words or redirections):
+            token = self.tokens[self.pos][1] if self.pos < len(self.tokens) else "end of script"
+            raise ShellSyntaxError(f"Unexpected `{token}`")
+        return ("simple", assignments, words, redirections)
+
+
+class Output:
+    """Destination of command output (channel, buffer or nothing)."""
+
+    def __init__(self, send=None) -> None:
+        self.send = send
+        self.data = bytearray()
+
+    def write(self, data) -> None:
+        if isinstance(data, str):
+            data = data.encode()
+        if self.send is not None:
+            self.send(data)
+        else:
+            self.data += data
+
+
+class NullOutput(Output):
+    def write(self, data) -> None:
+        pass
+
+
+class Input:
+    """Standard input read whole on first use (from channel or bytes)."""
+
+    def __init__(self, data: bytes = b"", reader=None) -> None:
+        self._data = data
+        self._reader = reader
+
+    def read(self) -> bytes:
+        if self._reader is not None:
+            self._data, self._reader = self._reader(), None
+        return self._data
+
+
+class Context:
+    def __init__(self, device, stdin: Input, stdout: Output, stderr: Output, cwd: str, variables: dict) -> None:
+        self.device = device
+        self.stdin = stdin
+        self.stdout = stdout
+        self.stderr = stderr
+        self.cwd = cwd
+        self.vars = variables
+
+    def copy(self, **changes) -> "Context":
+        ctx = Context(self.device, self.stdin, self.stdout, self.stderr, self.cwd, dict(self.vars))
+        for key, value in changes.items():
+            setattr(ctx, key, value)
+        return ctx
+
+    def path(self, path: str) -> str:
+        if path == "~" or path.startswith("~/"):
+            path = self.device.home + path[1:]
+        return posixpath.normpath(posixpath.join(self.cwd, path))
+
+
+class Shell:
+    """Interpreter of busybox `sh` subset used by this tool (and typical admin one-liners)."""
+
+    def __init__(self, device) -> None:
+        self.device = device
+
+    def run(self, script: str, stdin: Input, stdout: Output, stderr: Output) -> int:
+        ctx = Context(self.device, stdin, stdout, stderr, self.device.home, {"?": "0"})
+        try:
+            tokens, heredocs = tokenize(script)
+            tree = Parser(tokens).parse()
+        except ShellSyntaxError as e:
+            stderr.write(f"sh: syntax error: {e}\n")
+            return 2
+        self._heredocs = heredocs
+        try:
+            return self.run_node(tree, ctx)
+        except ShellExit as e:
+            return e.status
+
+    def run_node(self, node: tuple, ctx: Context) -> int:
+        kind = node[0]
+        if kind == "list":
+            status = 0
+            for item, background in node[1]:
+                if background:
+                    quiet = ctx.copy(stdin=Input(), stdout=NullOutput(), stderr=NullOutput())
+                    threading.Thread(target=self._background, args=(item, quiet), daemon=True).start()
+                    status = 0
+                else:
+                    status = self.run_node(item, ctx)
+                ctx.vars["?"] = str(status)
+            return status
+        if kind == "and_or":
+            status = self.run_node(node[1], ctx)
+            for op, item in node[2]:
+                if (op == "&&") == (status == 0):
+                    status = self.run_node(item, ctx)
+                ctx.vars["?"] = str(status)
+            return status
+        if kind == "pipe":
+            data = None
+            for i, item in enumerate(node[1]):
+                last = i == len(node[1]) - 1
+                out = ctx.stdout if last else Output()
+                status = self.run_node(item, ctx.copy(stdin=ctx.stdin if data is None else Input(data), stdout=out))
+                data = bytes(out.data)
+            return status
+        if kind == "subshell":
+            sub = self.redirect(node[2], ctx.copy())
+            if sub is None:
+                return 1
+            try:
+                status = self.run_node(node[1], sub)
+            except ShellExit as e:
+                status = e.status
+            self.finish(sub)
+            return status
+        return self.run_simple(node, ctx)
+
+    def _background(self, node: tuple, ctx: Context) -> None:
+        try:
+            self.run_node(node, ctx)
+        except ShellExit:
+            pass
+
+    def expand(self, word: tuple, ctx: Context) -> str:
+        value, quoted = word
+        if not quoted:
+            match = re.fullmatch(r"\$(\?|[A-Za-z_][A-Za-z0-9_]*)", value)
+            if match:
+                return ctx.vars.get(match.group(1), "")
+            if value == "~" or value.startswith("~/"):
+                return self.device.home + value[1:]
+        return value
+
+    def redirect(self, redirections: list, ctx: Context) -> Context:
+        """Apply redirections to context copy (None when file could not be opened)."""
+        ctx.pending = []
+        for op, target in redirections:
+            if op == "<<":
+                ctx.stdin = Input(self._heredocs[target].encode())
+                continue
+            path = self.expand(target, ctx)
+            if op == "<":
+                data = b"" if path == "/dev/null" else self.device.read(ctx.path(path))
+                if data is None:
+                    ctx.stderr.write(f"sh: can't open '{path}': No such file or directory\n")
+                    return None
+                ctx.stdin = Input(data)
+            elif op in (">&", "2>&"):
+                if path not in ("1", "2"):
+                    ctx.stderr.write(f"sh: {path}: bad file descriptor\n")
+                    return None
+                stream = ctx.stdout if path == "1" else ctx.stderr
+                if op == ">&":
+                    ctx.stdout = stream
+                else:
+                    ctx.stderr = stream
+            else:
+                out = NullOutput() if path == "/dev/null" else Output()
+                if path != "/dev/null":
+                    if not self.device.is_dir(posixpath.dirname(ctx.path(path))):
+                        ctx.stderr.write(f"sh: can't create {path}: nonexistent directory\n")
+                        return None
+                    ctx.pending.append((ctx.path(path), op.endswith(">>"), out))
+                if op.startswith("2"):
+                    ctx.stderr = out
+                else:
+                    ctx.stdout = out
+        return ctx
+
+    def finish(self, ctx: Context) -> None:
+        """Write redirected output to files."""
+        for path, append, out in ctx.pending:
+            old = self.device.read(path) if append else None
+            self.device.write(path, (old or b"") + bytes(out.data))
+
+    def run_simple(self, node: tuple, ctx: Context) -> int:
+        _, assignments, words, redirections = node
+        args = [self.expand(word, ctx) for word in words]
+        if not args:
+            for value, quoted in assignments:
+                name, _, value = value.partition("=")
+                ctx.vars[name] = self.expand((value, quoted), ctx)
+            sub = self.redirect(redirections, ctx.copy())
+            if sub is not None:
+                self.finish(sub)
+            return 0 if sub is not None else 1
+        sub = self.redirect(redirections, ctx.copy())
+        if sub is None:
+            return 1
+        self.device.commands.append(" ".join(args))
+        handler = self.cmd_test if args[0] == "[" else getattr(self, f"cmd_{args[0]}", None)
+        if handler is None:
+            sub.stderr.write(f"sh: {args[0]}: not found\n")
+            status = 127
+        else:
+            status = handler(args[1:], sub)
+        if args[0] == "cd" and status == 0:
+            ctx.cwd = sub.cwd
+        self.finish(sub)
+        return status
+
+    # Commands ==============================================================
+
+    def _files(self, args: list, ctx: Context, name: str):
+        """Yield (path, content) of arguments or of standard input."""
+        if not args or args == ["-"]:
+            yield "-", ctx.stdin.read()
+            return
+        for arg in args:
+            data = self.device.read(ctx.path(arg))
+            if data is None:
+                ctx.stderr.write(f"{name}: can't open '{arg}': No such file or directory\n")
+                yield arg, None
+            else:
+                yield arg, data
+
+    def cmd_true(self, args: list, ctx: Context) -> int:
+        return 0
+
+    def cmd_false(self, args: list, ctx: Context) -> int:
+        return 1
+
+    def cmd_test(self, args: list, ctx: Context) -> int:
+        if args and args[-1] == "]":
+            args = args[:-1]
+        negate = bool(args) and args[0] == "!"
+        if negate:
+            args = args[1:]
+        numeric = {"-eq": "__eq__", "-ne": "__ne__", "-lt": "__lt__", "-le": "__le__", "-gt": "__gt__", "-ge": "__ge__"}
+        try:
+            if len(args) == 3 and args[1] in numeric:
+                result = getattr(int(args[0]), numeric[args[1]])(int(args[2]))
+            elif len(args) == 3 and args[1] in ("=", "!="):
+                result = (args[0] == args[2]) == (args[1] == "=")
+            elif len(args) == 2 and args[0] in ("-e", "-f", "-d", "-s"):
+                path = ctx.path(args[1])
+                data = self.device.read(path)
+                result = {"-e": data is not None or self.device.is_dir(path), "-f": data is not None,
+                          "-d": self.device.is_dir(path), "-s": bool(data)}[args[0]]
+            elif len(args) == 2 and args[0] in ("-n", "-z"):
+                result = bool(args[1]) == (args[0] == "-n")
+            elif len(args) <= 1:
+                result = bool(args and args[0])
+            else:
+                raise ValueError(" ".join(args))
+        except ValueError as e:
+            ctx.stderr.write(f"sh: test: bad expression: {e}\n")
+            return 2
+        return 0 if result != negate else 1
+
+    def cmd_exit(self, args: list, ctx: Context) -> int:
+        raise ShellExit(int(args[0]) if args else int(ctx.vars.get("?", "0")))
+
+    def cmd_cd(self, args: list, ctx: Context) -> int:
+        path = ctx.path(args[0] if args else "~")
+        if not self.device.is_dir(path):
+            ctx.stderr.write(f"sh: cd: can't cd to {args[0]}: No such file or directory\n")
+            return 2
+        ctx.cwd = path
+        return 0
+
+    def cmd_pwd(self, args: list, ctx: Context) -> int:
+        ctx.stdout.write(ctx.cwd + "\n")
+        return 0
+
+    def cmd_echo(self, args: list, ctx: Context) -> int:
+        newline = not (args and args[0] == "-n")
+        ctx.stdout.write(" ".join(args[0 if newline else 1:]) + ("\n" if newline else ""))
+        return 0
+
+    def cmd_printf(self, args: list, ctx: Context) -> int:
+        if not args:
+            ctx.stderr.write("printf: usage: printf FORMAT [ARGUMENT]...\n")
+            return 1
+        fmt, values = args[0], iter(args[1:])
+        escapes = {"n": "\n", "t": "\t", "\\": "\\", "r": "\r"}
+        out = re.sub(r"\\(.)", lambda m: escapes.get(m.group(1), m.group(0)), fmt)
+        out = re.sub(r"%([ds%])", lambda m: "%" if m.group(1) == "%" else
+                     str(int(next(values, "0") or 0)) if m.group(1) == "d" else next(values, ""), out)
+        ctx.stdout.write(out)
+        return 0
+
+    def cmd_cat(self, args: list, ctx: Context) -> int:
+        status = 0
+        for _, data in self._files(args, ctx, "cat"):
+            if data is None:
+                status = 1
+            else:
+                ctx.stdout.write(data)
+        return status
+
+    def cmd_touch(self, args: list, ctx: Context) -> int:
+        for arg in args:
+            path = ctx.path(arg)
+            if not self.device.is_dir(posixpath.dirname(path)):
+                ctx.stderr.write(f"touch: {arg}: No such file or directory\n")
+                return 1
+            if self.device.read(path) is None:
+                self.device.write(path, b"")
+        return 0
+
+    def cmd_rm(self, args: list, ctx: Context) -> int:
+        force = any(arg.startswith("-") and "f" in arg for arg in args)
+        status = 0
+        for arg in [arg for arg in args if not arg.startswith("-")]:
+            if not self.device.remove(ctx.path(arg)) and not force:
+                ctx.stderr.write(f"rm: can't remove '{arg}': No such file or directory\n")
+                status = 1
+        return status
+
+    def cmd_cp(self, args: list, ctx: Context, move: bool = False) -> int:
+        name = "mv" if move else "cp"
+        if len(args) != 2:
+            ctx.stderr.write(f"{name}: need source and destination\n")
+            return 1
+        source, target = ctx.path(args[0]), ctx.path(args[1])
+        data = self.device.read(source)
+        if data is None:
+            ctx.stderr.write(f"{name}: can't stat '{args[0]}': No such file or directory\n")
+            return 1
+        if self.device.is_dir(target):
+            target = posixpath.join(target, posixpath.basename(source))
+        if not self.device.is_dir(posixpath.dirname(target)):
+            ctx.stderr.write(f"{name}: can't create '{args[1]}': No such file or directory\n")
+            return 1
+        self.device.write(target, data)
+        if move:
+            self.device.remove(source)
+        return 0
+
+    def cmd_mv(self, args: list, ctx: Context) -> int:
+        return self.cmd_cp(args, ctx, move=True)
+
+    def cmd_ls(self, args: list, ctx: Context) -> int:
+        path = ctx.path(args[-1] if args and not args[-1].startswith("-") else ".")
+        if not self.device.is_dir(path):
+            ctx.stderr.write(f"ls: {path}: No such file or directory\n")
+            return 1
+        for name in self.device.list_dir(path):
+            ctx.stdout.write(name + "\n")
+        return 0
+
+    def cmd_md5sum(self, args: list, ctx: Context) -> int:
+        status = 0
+        for name, data in self._files(args, ctx, "md5sum"):
+            if data is None:
+                status = 1
+            else:
+                ctx.stdout.write(f"{hashlib.md5(data).hexdigest()}  {name}\n")
+        return status
+
+    def cmd_wc(self, args: list, ctx: Context) -> int:
+        files = [arg for arg in args if not arg.startswith("-")]
+        status = 0
+        for name, data in self._files(files, ctx, "wc"):
+            if data is None:
+                status = 1
+            elif "-c" in args:
+                ctx.stdout.write(f"{len(data)}\n" if name == "-" else f"{len(data)} {name}\n")
+            else:
+                lines = data.count(b"\n")
+                ctx.stdout.write(f"{lines} {len(data.split())} {len(data)}\n")
+        return status
+
+    def cmd_grep(self, args: list, ctx: Context) -> int:
+        options = "".join(arg[1:] for arg in args if arg.startswith("-") and len(arg) > 1)
+        args = [arg for arg in args if not arg.startswith("-") or len(arg) == 1]
+        if not args:
+            ctx.stderr.write("Usage: grep [-cvqi] PATTERN [FILE]...\n")
+            return 2
+        regex = re.compile(args[0], re.IGNORECASE if "i" in options else 0)
+        found, status = 0, None
+        for name, data in self._files(args[1:], ctx, "grep"):
+            if data is None:
+                status = 2
+                continue
+            lines = [line for line in data.decode(errors="replace").splitlines()
+                     if bool(regex.search(line)) != ("v" in options)]
+            found += len(lines)
+            if "c" in options:
+                ctx.stdout.write(f"{len(lines)}\n")
+            elif "q" not in options:
+                ctx.stdout.write("".join(line + "\n" for line in lines))
+        return status if status is not None and not found else (0 if found else 1)
+
+    def cmd_sed(self, args: list, ctx: Context) -> int:
+        in_place = "-i" in args
+        args = [arg for arg in args if arg != "-i"]
+        if not args or len(args[0]) < 2 or args[0][0] != "s":
+            ctx.stderr.write("sed: only `s` command is supported\n")
+            return 1
+        delimiter = args[0][1]
+        parts = re.split(r"(?<!\\)" + re.escape(delimiter), args[0][2:])
+        if len(parts) != 3:
+            ctx.stderr.write(f"sed: unterminated `s' command\n")
+            return 1
+        pattern, replacement, flags = parts
+        regex = re.compile(pattern.replace("\\(", "(").replace("\\)", ")"))
+        repl = lambda m: re.sub(r"\\(\d)|&", lambda r: m.group(int(r.group(1))) if r.group(1) else m.group(0),
+                                replacement)
+        status = 0
+        for name, data in self._files(args[1:], ctx, "sed"):
+            if data is None:
+                status = 1
+                continue
+            lines = data.decode(errors="surrogateescape").split("\n")
+            result = "\n".join(regex.sub(repl, line, count=0 if "g" in flags else 1) for line in lines)
+            result = result.encode(errors="surrogateescape")
+            if in_place and name != "-":
+                self.device.write(ctx.path(name), result)
+            else:
+                ctx.stdout.write(result)
+        return status
+
+    def cmd_sleep(self, args: list, ctx: Context) -> int:
+        try:
+            seconds = float(args[0])
+        except (IndexError, ValueError):
+            ctx.stderr.write("sleep: invalid number\n")
+            return 1
+        return 0 if self.device.sleep(seconds) else 143  # 143 -- killed by SIGTERM
+
+    def cmd_killall(self, args: list, ctx: Context) -> int:
+        if args != ["sleep"] or not self.device.kill_sleeps():
+            ctx.stderr.write(f"killall: {args[0] if args else ''}: no process killed\n")
+            return 1
+        return 0
+
+    def cmd_reboot(self, args: list, ctx: Context) -> int:
+        self.device.reboot()
+        return 0
+
+    def cmd_cfgmtd(self, args: list, ctx: Context) -> int:
+        if "-w" in args:
+            self.device.flash = self.device.read("/tmp/system.cfg")
+            return 0
+        if "-r" in args:
+            self.device.write("/tmp/system.cfg", self.device.flash)
+            return 0
+        ctx.stderr.write("Usage: cfgmtd -w|-r [-f file]\n")
+        return 1
+
+    def cmd_passwd(self, args: list, ctx: Context) -> int:
+        user = args[0] if args else self.device.uname
+        lines = ctx.stdin.read().decode(errors="replace").split("\n")
+        ctx.stdout.write(f"Changing password for {user}\nNew password:\nRetype password:\n")
+        if len(lines) < 2 or lines[0] != lines[1]:
+            ctx.stderr.write(f"passwd: password for {user} is unchanged\n")
+            return 1
+        self.device.set_password(user, md5_crypt(lines[0], make_salt()))
+        ctx.stdout.write(f"Password for {user} changed by root\n")
+        return 0
+
+    def cmd_uptime(self, args: list, ctx: Context) -> int:
+        seconds = int(time.monotonic() - self.device.boot_time)
+        ctx.stdout.write(f" up {seconds // 60} min,  load average: 0.00, 0.00, 0.00\n")
+        return 0
+
+    def cmd_hostname(self, args: list, ctx: Context) -> int:
+        cfg = SystemConfig(self.device.read("/tmp/system.cfg") or b"")
+        ctx.stdout.write(cfg.get("resolv.host.1.name", "ubnt") + "\n")
+        return 0
+
+
+def default_config(name: str, passwd_hash: str, uname: str = "ubnt") -> bytes:
+    """Return `system.cfg` of freshly reset airOS device."""
+    lines = [
+        "aaa.status=disabled", "bridge.status=enabled", "bridge.1.devname=br0", "bridge.1.port.1.devname=eth0",
+        "bridge.1.port.2.devname=ath0", "dhcpc.status=disabled", "ebtables.status=enabled",
+        "gui.language=en_US", "httpd.status=enabled", "httpd.https.status=enabled",
+        "netconf.1.devname=eth0", "netconf.1.ip=0.0.0.0", "netconf.1.status=enabled",
+        "netconf.2.devname=ath0", "netconf.2.status=enabled", "netconf.3.devname=br0",
+        "netconf.3.ip=192.168.1.20", "netconf.3.netmask=255.255.255.0", "netconf.3.status=enabled",
+        "ntpclient.status=disabled", "radio.1.countrycode=840", "radio.1.dfs.status=disabled",
+        "radio.1.mode=managed", "radio.1.chanbw=20", "radio.1.txpower=26", "radio.countrycode=840",
+        "resolv.host.1.name=" + name, "resolv.host.1.status=enabled", "resolv.nameserver.1.status=disabled",
+        "resolv.nameserver.2.status=disabled", "snmp.status=disabled", "snmp.community=public",
+        "snmp.contact=", "snmp.location=", "sshd.port=22", "sshd.status=enabled",
+        "system.timezone=GMT", "users.status=enabled", "users.1.name=" + uname,
+        "users.1.password=" + passwd_hash, "users.1.status=enabled", "wireless.1.ssid=ubnt=" + name,
+        "wireless.1.security.type=none", "wireless.status=enabled",
+    ]
+    return ("\n".join(lines) + "\n").encode()
+
+
+class FakeDevice:
+    """State of one simulated airOS device (files, flash, processes).
+
+    Arguments:
+        addr (Address) -- Address of device.
+        port (int) -- SSH port (0 for any free port).
+        uname (str) -- User name.
+        passwd (str) -- Password.
+        time_scale [opt] (float) -- Multiplier of `sleep` durations (Default: 1).
+        reboot_time [opt] (float) -- Seconds in which rebooting device does not accept connections (Default: 0).
+    """
+
+    home = "/etc/persistent"
+    dirs = {"/", "/tmp", "/etc", "/etc/persistent", "/var", "/var/log", "/dev", "/bin", "/usr", "/proc"}
+
+    def __init__(self, addr: Address, port: int, uname: str, passwd: str, time_scale: float = 1.0,
+                 reboot_time: float = 0.0) -> None:
+        self.addr = addr
+        self.port = port
+        self.uname = uname
+        self.time_scale = time_scale
+        self.reboot_time = reboot_time
+        self.lock = threading.RLock()
+        self.commands = []  # Every executed command (for tests)
+        self.execs = 0  # Number of exec requests (round trips)
+        self.logins = 0
+        self.failed_logins = 0
+        self.reboots = 0
+        self.transports = []
+        self.down_until = 0.0
+        self._sleeps = set()  # Events of running `sleep` commands
+        passwd_hash = md5_crypt(passwd, make_salt())
+        self.flash = default_config(f"sim-{str(addr).replace('.', '-')}-{port}", passwd_hash, uname)
+        self.files = {}
+        self.boot()
+
+    def boot(self) -> None:
+        """Load configuration from flash, like airOS does on boot."""
+        with self.lock:
+            persistent = {path: data for path, data in self.files.items() if path.startswith(self.home + "/")}
+            cfg = SystemConfig(self.flash)
+            self.files = {"/tmp/system.cfg": self.flash, "/etc/hosts": b"127.0.0.1 localhost\n",
+                          "/var/log/messages": b"", **persistent}
+            self.set_password(cfg.get("users.1.name", self.uname), cfg.get("users.1.password", "!"))
+            self.boot_time = time.monotonic()
+
+    def read(self, path: str) -> bytes:
+        with self.lock:
+            return self.files.get(path)
+
+    def write(self, path: str, data: bytes) -> None:
+        with self.lock:
+            self.files[path] = bytes(data)
+
+    def remove(self, path: str) -> bool:
+        with self.lock:
+            return self.files.pop(path, None) is not None
+
+    def is_dir(self, path: str) -> bool:
+        with self.lock:
+            return path in self.dirs or any(name.startswith(path.rstrip("/") + "/") for name in self.files)
+
+    def list_dir(self, path: str) -> list:
+        prefix = path.rstrip("/") + "/"
+        with self.lock:
+            names = {name[len(prefix):].split("/")[0] for name in list(self.files) + list(self.dirs)
+                     if name.startswith(prefix) and name != prefix}
+        return sorted(names)
+
+    def password_hash(self, user: str) -> str:
+        for line in (self.read("/etc/passwd") or b"").decode().split("\n"):
+            fields = line.split(":")
+            if len(fields) > 1 and fields[0] == user:
+                return fields[1]
+        return None
+
+    def set_password(self, user: str, passwd_hash: str) -> None:
+        self.write("/etc/passwd", f"{user}:{passwd_hash}:0:0:Administrator:{self.home}:/bin/sh\n".encode())
+
+    def check_password(self, user: str, passwd: str) -> bool:
+        passwd_hash = self.password_hash(user)
+        return passwd_hash is not None and passwd_hash.startswith("$1$") and md5_crypt(passwd, passwd_hash) == passwd_hash
+
+    def sleep(self, seconds: float) -> bool:
+        """Sleep (scaled), return False when killed by `killall sleep`."""
+        event = threading.Event()
+        with self.lock:
+            self._sleeps.add(event)
+        killed = event.wait(seconds * self.time_scale)
+        with self.lock:
+            self._sleeps.discard(event)
+        return not killed
+
+    def kill_sleeps(self) -> int:
+        with self.lock:
+            sleeps, self._sleeps = self._sleeps, set()
+        for event in sleeps:
+            event.set()
+        return len(sleeps)
+
+    def reboot(self) -> None:
+        """Drop connections and boot again (after command returns)."""
+        def restart():
+            time.sleep(0.05)
+            with self.lock:
+                self.reboots += 1
+                self.down_until = time.monotonic() + self.reboot_time
+                transports, self.transports = self.transports, []
+            self.kill_sleeps()
+            for transport in transports:
+                transport.close()
+            self.boot()
+        threading.Thread(target=restart, daemon=True).start()
+
+    @property
+    def cfg(self) -> SystemConfig:
+        """Current (running) configuration."""
+        return SystemConfig(self.read("/tmp/system.cfg") or b"")
+
+
+class _DeviceServer(paramiko.ServerInterface):
+    """SSH server side of one connection to `FakeDevice`."""
+
+    def __init__(self, simulator: "Simulator", device: FakeDevice, transport: paramiko.Transport) -> None:
+        self.simulator = simulator
+        self.device = device
+        self.transport = transport
+        self.failures = 0
+
+    def get_allowed_auths(self, username: str) -> str:
+        return self.simulator.auth_methods
+
+    def _check(self, username: str, passwd: str) -> int:
+        self.simulator.delay()
+        if self.device.check_password(username, passwd):
+            self.device.logins += 1
+            return paramiko.AUTH_SUCCESSFUL
+        self.device.failed_logins += 1
+        self.failures += 1
+        if self.simulator.auth_delay:
+            time.sleep(self.simulator.auth_delay)
+        if self.failures >= self.simulator.max_auth_tries:  # Disconnect like dropbear does
+            threading.Timer(0.01, self.transport.close).start()
+        return paramiko.AUTH_FAILED
+
+    def check_auth_password(self, username: str, password: str) -> int:
+        if "password" not in self.simulator.auth_methods:
+            return paramiko.AUTH_FAILED
+        return self._check(username, password)
+
+    def check_auth_interactive(self, username: str, submethods: str):
+        if "keyboard-interactive" not in self.simulator.auth_methods:
+            return paramiko.AUTH_FAILED
+        self._username = username
+        query = paramiko.server.InteractiveQuery()
+        query.add_prompt("Password: ", False)
+        return query
+
+    def check_auth_interactive_response(self, responses: list) -> int:
+        return self._check(self._username, responses[0] if responses else "")
+
+    def check_channel_request(self, kind: str, chanid: int) -> int:
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_exec_request(self, channel: paramiko.Channel, command: bytes) -> bool:
+        self.device.execs += 1
+        threading.Thread(target=self.simulator.execute, args=(self.device, channel, command.decode(errors="replace")),
+                         daemon=True).start()
+        return True
+
+
+class Simulator:
+    """Many simulated airOS devices listening on loopback addresses (or ports).
+
+    Devices run a subset of busybox shell (`cat`, `cp`, `mv`, `rm`, `md5sum`,
+    `sed`, `passwd`, `cfgmtd`, `reboot`, `sleep`, `killall`, ...) on
+    in-memory files, so hundreds of devices fit in one process.
+
+    Arguments:
+        count [opt] (int) -- Number of devices (Default: 1).
+        first [opt] (str) -- Address of first device, next ones get following addresses (Default: 127.0.0.2).
+        port [opt] (int) -- SSH port, 0 gives every device its own free port (Default: 22).
+        uname [opt] (str) -- User name on devices (Default: ubnt).
+        passwords [opt] (list) -- Passwords of devices, used in turn (Default: ["ubnt"]).
+        latency [opt] (float) -- Delay in seconds added to every login attempt and command (Default: 0).
+        jitter [opt] (float) -- Random extra delay up to given seconds (Default: 0).
+        loss [opt] (float) -- Probability of dropping new connection (Default: 0).
+        auth_methods [opt] (str) -- Allowed methods, `password` and/or `keyboard-interactive` (Default: password).
+        auth_delay [opt] (float) -- Delay in seconds after failed login (Default: 0).
+        max_auth_tries [opt] (int) -- Failed logins after which connection is closed (Default: 10).
+        time_scale [opt] (float) -- Multiplier of `sleep` durations (Default: 1).
+        reboot_time [opt] (float) -- Seconds in which rebooting device refuses connections (Default: 0).
+    """
+
+    _host_key = None
+    _host_key_lock = threading.Lock()
+
+    def __init__(self, count: int = 1, first: str = "127.0.0.2", port: int = 22, uname: str = "ubnt",
+                 passwords: list = None, latency: float = 0.0, jitter: float = 0.0, loss: float = 0.0,
+                 auth_methods: str = "password", auth_delay: float = 0.0, max_auth_tries: int = 10,
+                 time_scale: float = 1.0, reboot_time: float = 0.0) -> None:
+        if count < 1:
+            raise ValueError("At least one device is required!")
+        passwords = passwords or ["ubnt"]
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.auth_methods = auth_methods
+        self.auth_delay = auth_delay
+        self.max_auth_tries = max_auth_tries
+        start = Address(first)
+        self.devices = [FakeDevice(start + i, port, uname, passwords[i % len(passwords)], time_scale=time_scale,
+                                   reboot_time=reboot_time) for i in range(count)]
+        self._sockets = []
+        self._running = False
+
+    @classmethod
+    def host_key(cls) -> paramiko.RSAKey:
+        """Host key shared by all simulators in process (generated once, it is slow)."""
+        with cls._host_key_lock:
+            if cls._host_key is None:
+                cls._host_key = paramiko.RSAKey.generate(2048)
+            return cls._host_key
+
+    @property
+    def addresses(self) -> list:
+        return [device.addr for device in self.devices]
+
+    def device(self, addr: Address, port: int = None) -> FakeDevice:
+        for device in self.devices:
+            if device.addr == addr and (port is None or device.port == port):
+                return device
+        raise KeyError(f"No simulated device at {addr}")
+
+    def delay(self) -> None:
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def start(self) -> "Simulator":
+        self.host_key()
+        self._running = True
+        for device in self.devices:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind((str(device.addr), device.port))
+            sock.listen(128)
+            device.port = sock.getsockname()[1]
+            self._sockets.append(sock)
+            threading.Thread(target=self._accept, args=(sock, device), daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._running = False
+        for sock in self._sockets:
+            sock.close()
+        self._sockets = []
+        for device in self.devices:
+            device.kill_sleeps()
+            with device.lock:
+                transports, device.transports = device.transports, []
+            for transport in transports:
+                transport.close()
+
+    def __enter__(self) -> "Simulator":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _accept(self, sock: socket.socket, device: FakeDevice) -> None:
+        while self._running:
+            try:
+                client, _ = sock.accept()
+            except OSError:
+                return
+            if time.monotonic() < device.down_until or (self.loss and random.random() < self.loss):
+                client.close()  # Device is rebooting or packet was lost
+                continue
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)  # Real devices do not add Nagle delays
+            threading.Thread(target=self._serve, args=(client, device), daemon=True).start()
+
+    def _serve(self, client: socket.socket, device: FakeDevice) -> None:
+        transport = paramiko.Transport(client)
+        transport.set_log_channel(TRANSPORT_LOG)
+        transport.add_server_key(self.host_key())
+        with device.lock:
+            device.transports.append(transport)
+        try:
+            transport.start_server(server=_DeviceServer(self, device, transport))
+        except (paramiko.SSHException, EOFError, OSError):
+            transport.close()
+            return
+        channels = []  # Keep references, channel is closed when garbage collected
+        while transport.is_active():
+            channel = transport.accept(1)
+            if channel is not None:
+                channels.append(channel)
+                channels = [chan for chan in channels if not chan.closed]
+        with device.lock:
+            if transport in device.transports:
+                device.transports.remove(transport)
+
+    def execute(self, device: FakeDevice, channel: paramiko.Channel, command: str) -> None:
+        """Run command on device and send output, exit status and EOF over channel."""
+        self.delay()
+
+        def read_stdin() -> bytes:
+            data = []
+            while True:
+                chunk = channel.recv(32768)
+                if not chunk:
+                    return b"".join(data)
+                data.append(chunk)
+
+        try:
+            status = Shell(device).run(command, Input(reader=read_stdin), Output(channel.sendall),
+                                       Output(channel.sendall_stderr))
+            channel.send_exit_status(status)
+            channel.shutdown_write()
+            # Reply to exec request is sent by paramiko after `check_channel_exec_request` returns, closing channel
+            # earlier makes client fail with "Channel closed" -- client closes it after reading exit status
+            deadline = time.monotonic() + CLOSE_TIMEOUT
+            while not channel.closed and time.monotonic() < deadline:
+                time.sleep(0.01)
+            channel.close()
+        except (OSError, EOFError, paramiko.SSHException):
+            pass  # Client or reboot closed connection
+
+
+class ShellTest(unittest.TestCase):
+    def run_script(self, device: FakeDevice, script: str, stdin: bytes = b"") -> tuple:
+        out, err = Output(), Output()
+        status = Shell(device).run(script, Input(stdin), out, err)
+        return bytes(out.data), bytes(err.data), status
+
+    def test_commands(self):
+        device = FakeDevice(Address("127.0.0.2"), 22, "ubnt", "ubnt")
+        out, err, status = self.run_script(device, "cat /tmp/system.cfg | md5sum")
+        self.assertEqual(out.split()[0].decode(), hashlib.md5(device.read("/tmp/system.cfg")).hexdigest(),
+                         "Wrong pipe output")
+        self.assertEqual(self.run_script(device, "cat > /tmp/x.upload && mv /tmp/x.upload /tmp/x", b"data")[2], 0)
+        self.assertEqual(device.read("/tmp/x"), b"data", "Upload through stdin failed")
+        self.assertEqual(self.run_script(device, "wc -c < /tmp/x")[0], b"4\n", "Wrong size")
+        out, err, status = self.run_script(device, "cat /nope; echo $?")
+        self.assertEqual((out, status), (b"1\n", 0), "Wrong exit status variable")
+        self.assertIn(b"No such file", err, "Missing error message")
+        self.assertEqual(self.run_script(device, "( echo a; exit 3\n) < /dev/null; echo b >&2")[1:], (b"b\n", 0))
+        self.assertEqual(self.run_script(device, "nope")[2], 127, "Unknown command did not fail")
+        self.assertEqual(self.run_script(device, "rc=3; [ $rc -eq 0 ] || exit $rc")[2], 3, "Wrong test result")
+        self.assertEqual(self.run_script(device, "cd /tmp; pwd && false || echo x")[0], b"/tmp\nx\n")
+        self.assertEqual(self.run_script(device, "cat <<'EOF'\nline $1$x\nEOF\necho end")[0], b"line $1$x\nend\n",
+                         "Wrong heredoc")
+        self.assertEqual(self.run_script(device, "printf '\\nM:%d:%d\\n' 1 $?")[0], b"\nM:1:0\n", "Wrong printf")
+
+    def test_device_commands(self):
+        device = FakeDevice(Address("127.0.0.2"), 22, "ubnt", "ubnt", time_scale=0.001)
+        self.assertTrue(device.check_password("ubnt", "ubnt"), "Default password does not work")
+        self.run_script(device, "passwd ubnt", b"new\nnew\n")
+        self.assertTrue(device.check_password("ubnt", "new"), "Password was not changed")
+        out, err, status = self.run_script(device, "passwd ubnt", b"one\ntwo\n")
+        self.assertEqual((err, status), (b"passwd: password for ubnt is unchanged\n", 1), "Wrong mismatch error")
+        self.run_script(device, "sed -i 's|^ubnt:[^:]*:|ubnt:$1$abc$def:|' /etc/passwd")
+        self.assertEqual(device.password_hash("ubnt"), "$1$abc$def", "sed did not replace hash")
+
+        self.run_script(device, "echo x=1 >> /tmp/system.cfg && cfgmtd -w")
+        self.assertEqual(device.flash, device.read("/tmp/system.cfg"), "Configuration was not written to flash")
+        self.run_script(device, "sleep 1000 && reboot &")
+        time.sleep(0.05)
+        self.assertEqual(self.run_script(device, "killall sleep")[2], 0, "Sleep was not killed")
+        self.assertEqual(self.run_script(device, "killall sleep")[2], 1, "Killed sleep twice")
+        time.sleep(0.1)
+        self.assertEqual(device.reboots, 0, "Killed reboot was executed")
+
+
+class SimulatorTest(unittest.TestCase):
+    def test_executor(self):
+        from .connector import Executor
+
+        with Simulator(count=2, first="127.0.0.1", port=0, passwords=["ubnt", "secret"], time_scale=0.001) as sim:
+            second = sim.devices[1]
+            airos = Executor(str(second.addr), second.port, "ubnt", "secret")
+            try:
+                self.assertEqual(airos.get_location(), FakeDevice.home, "Wrong home directory")
+                results = airos.exec_batch(["cp /tmp/system.cfg ~/system.cfg.bak", "cat /tmp/system.cfg", "false"])
+                self.assertEqual([result.status for result in results], [0, 0, 1], "Wrong batch statuses")
+                self.assertEqual("".join(results[1].out).encode(), second.read("/tmp/system.cfg"),
+                                 "Wrong configuration")
+                airos.put("/tmp/system.cfg", b"a=1\n")
+                self.assertEqual(airos.get("/tmp/system.cfg"), b"a=1\n", "Upload failed")
+                self.assertEqual(second.execs > 3, True, "Commands were not counted")
+            finally:
+                airos.close()
+            with self.assertRaises(paramiko.AuthenticationException):
+                Executor(str(second.addr), second.port, "ubnt", "ubnt")
+
+
+if __name__ == "__main__":
+    unittest.main()
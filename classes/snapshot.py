@@ -0,0 +1,205 @@
+#########################################
+# Discovery snapshots as live-host bitmaps
+# Author: MattTheCoder-W
+#########################################
+
+import os
+import time
+import struct
+import unittest
+import tempfile
+from typing import Iterable, Iterator
+
+from .address import Address
+from .network import Network
+
+MAGIC = b"DSNP"
+HEADER = struct.Struct("!4sBIBd")  # magic, version, network address, prefix, timestamp
+VERSION = 1
+
+
+class Snapshot:
+    """Set of live hosts in network stored as bitmap (one bit per address).
+
+    Arguments:
+        network (Network) -- Scanned network.
+        hosts [opt] (Iterable) -- Live hosts.
+        timestamp [opt] (float) -- Time of scan (Default: now).
+    """
+
+    __slots__ = ["_net", "_prefix", "_bitmap", "timestamp"]
+
+    def __init__(self, network: Network, hosts: Iterable[Address] = (), timestamp: float = None) -> None:
+        if not isinstance(network, Network):
+            raise TypeError("Network should be `Network` object!")
+        self._net = network.net_addr.value
+        self._prefix = network.prefix
+        self._bitmap = bytearray(max(1, (1 << (32 - self._prefix)) // 8))
+        self.timestamp = time.time() if timestamp is None else timestamp
+        for addr in hosts:
+            self.add(addr)
+
+    @property
+    def network(self) -> Network:
+        return Network(Address.from_int(self._net), Address.from_prefix(self._prefix))
+
+    @property
+    def age(self) -> float:
+        """Return seconds since scan."""
+        return time.time() - self.timestamp
+
+    def _offset(self, addr: Address) -> int:
+        offset = addr.value - self._net
+        if offset < 0 or offset >= 1 << (32 - self._prefix):
+            raise ValueError(f"{addr} is not in network {self.network}!")
+        return offset
+
+    def add(self, addr: Address) -> None:
+        offset = self._offset(addr)
+        self._bitmap[offset >> 3] |= 1 << (offset & 7)
+
+    def discard(self, addr: Address) -> None:
+        offset = self._offset(addr)
+        self._bitmap[offset >> 3] &= ~(1 << (offset & 7)) & 0xFF
+
+    def __contains__(self, addr: Address) -> bool:
+        if not isinstance(addr, Address):
+            return False
+        offset = addr.value - self._net
+        if offset < 0 or offset >= 1 << (32 - self._prefix):
+            return False
+        return bool(self._bitmap[offset >> 3] & (1 << (offset & 7)))
+
+    def _offsets(self, bitmap: bytes) -> Iterator[int]:
+        for index, byte in enumerate(bitmap):
+            while byte:
+                low = byte & -byte
+                yield (index << 3) + low.bit_length() - 1
+                byte ^= low
+
+    def hosts(self) -> Iterator[Address]:
+        """Yield live hosts in address order."""
+        for offset in self._offsets(self._bitmap):
+            yield Address.from_int(self._net + offset)
+
+    def __iter__(self) -> Iterator[Address]:
+        return self.hosts()
+
+    def __len__(self) -> int:
+        return int.from_bytes(self._bitmap, "little").bit_count()
+
+    ### Comparing
+
+    def diff(self, older: "Snapshot") -> tuple:
+        """Return (appeared, disappeared) hosts compared to older snapshot of the same network."""
+        if not isinstance(older, Snapshot):
+            raise TypeError("Value should be `Snapshot` object!")
+        if (older._net, older._prefix) != (self._net, self._prefix):
+            raise ValueError("Snapshots are not from the same network!")
+        new = int.from_bytes(self._bitmap, "little")
+        old = int.from_bytes(older._bitmap, "little")
+        size = len(self._bitmap)
+        appeared = (new & ~old).to_bytes(size, "little")
+        disappeared = (old & ~new).to_bytes(size, "little")
+        return ([Address.from_int(self._net + x) for x in self._offsets(appeared)],
+                [Address.from_int(self._net + x) for x in self._offsets(disappeared)])
+
+    ### Saving
+
+    def to_bytes(self) -> bytes:
+        return HEADER.pack(MAGIC, VERSION, self._net, self._prefix, self.timestamp) + bytes(self._bitmap)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Snapshot":
+        magic, version, net, prefix, timestamp = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Data is not a discovery snapshot!")
+        snapshot = cls(Network(Address.from_int(net), Address.from_prefix(prefix)), timestamp=timestamp)
+        bitmap = data[HEADER.size:]
+        if len(bitmap) != len(snapshot._bitmap):
+            raise ValueError("Snapshot bitmap has wrong size!")
+        snapshot._bitmap[:] = bitmap
+        return snapshot
+
+
+class SnapshotStore:
+    """Directory with discovery snapshots (newest `keep` snapshots per network are kept).
+
+    Arguments:
+        path (str) -- Directory path (created when missing).
+        keep [opt] (int) -- Number of snapshots kept for every network (Default: 10).
+    """
+
+    def __init__(self, path: str, keep: int = 10) -> None:
+        if keep < 1:
+            raise ValueError("At least one snapshot has to be kept!")
+        self.path = path
+        self.keep = keep
+        os.makedirs(path, exist_ok=True)
+
+    @staticmethod
+    def _prefix(network: Network) -> str:
+        return f"{network.net_addr}_{network.prefix}_"
+
+    def history(self, network: Network) -> list:
+        """Return paths of snapshots for network, newest first."""
+        prefix = self._prefix(network)
+        names = [x for x in os.listdir(self.path) if x.startswith(prefix) and x.endswith(".snap")]
+        return [os.path.join(self.path, x) for x in sorted(names, reverse=True)]
+
+    def save(self, snapshot: Snapshot) -> str:
+        """Save snapshot and remove the oldest ones, return path of saved file."""
+        name = f"{self._prefix(snapshot.network)}{int(snapshot.timestamp * 1000):015d}.snap"
+        path = os.path.join(self.path, name)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(snapshot.to_bytes())
+        os.replace(tmp_path, path)
+        for old in self.history(snapshot.network)[self.keep:]:
+            os.remove(old)
+        return path
+
+    def load(self, path: str) -> Snapshot:
+        with open(path, "rb") as f:
+            return Snapshot.from_bytes(f.read())
+
+    def latest(self, network: Network, skip: int = 0) -> Snapshot:
+        """Return newest snapshot of network (or older one with `skip`), None if there is none."""
+        history = self.history(network)
+        if len(history) <= skip:
+            return None
+        return self.load(history[skip])
+
+
+class SnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.net = Network(Address("10.1.0.0"), Address(16))
+
+    def test_bitmap(self):
+        snapshot = Snapshot(self.net, [Address("10.1.0.5"), Address("10.1.255.254")])
+        self.assertEqual(len(snapshot.to_bytes()) - HEADER.size, 8192, "Wrong bitmap size")
+        self.assertIn(Address("10.1.0.5"), snapshot, "Host not in snapshot")
+        self.assertNotIn(Address("10.1.0.6"), snapshot, "Wrong host in snapshot")
+        self.assertNotIn(Address("10.2.0.5"), snapshot, "Host from other network in snapshot")
+        self.assertEqual([str(x) for x in snapshot], ["10.1.0.5", "10.1.255.254"], "Wrong hosts")
+        self.assertRaises(ValueError, snapshot.add, Address("10.2.0.1"))
+
+    def test_diff(self):
+        old = Snapshot(self.net, [Address("10.1.0.1"), Address("10.1.0.2")])
+        new = Snapshot(self.net, [Address("10.1.0.2"), Address("10.1.3.3")])
+        appeared, disappeared = new.diff(old)
+        self.assertEqual([str(x) for x in appeared], ["10.1.3.3"], "Wrong appeared hosts")
+        self.assertEqual([str(x) for x in disappeared], ["10.1.0.1"], "Wrong disappeared hosts")
+
+    def test_store(self):
+        with tempfile.TemporaryDirectory() as path:
+            store = SnapshotStore(path, keep=2)
+            for i in range(3):
+                store.save(Snapshot(self.net, [Address("10.1.0.1") + i], timestamp=1000 + i))
+            self.assertEqual(len(store.history(self.net)), 2, "Old snapshots were not removed")
+            self.assertEqual([str(x) for x in store.latest(self.net)], ["10.1.0.3"], "Wrong latest snapshot")
+            self.assertEqual(store.latest(self.net, skip=1).timestamp, 1001, "Wrong previous snapshot")
+
+
+if __name__ == "__main__":
+    unittest.main()
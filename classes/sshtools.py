@@ -1,9 +1,261 @@
+import time
+import socket
+import threading
+import unittest
+from typing import Iterable, Iterator, Tuple
+
+from paramiko import Transport
+from paramiko.ssh_exception import SSHException, AuthenticationException, BadAuthenticationType
+
 from .address import Address
-import os
+from .credstore import CredentialStore, get_mac
+from .connector import SessionPool
+from .pipeline import imap_unordered
+
+
+class AttemptBudget:
+    """Thread-safe counter of password attempts shared by many searches.
+
+    Arguments:
+        total [opt] (int) -- Number of allowed attempts, None for no limit (Default: None).
+    """
+
+    def __init__(self, total: int = None) -> None:
+        if total is not None and total < 0:
+            raise ValueError("Budget should not be negative!")
+        self.total = total
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        """Use one attempt, return False when budget is exhausted."""
+        with self._lock:
+            if self.total is not None and self.used >= self.total:
+                return False
+            self.used += 1
+            return True
+
+
+class PasswordFinder:
+    """Find correct SSH password using paramiko, without spawning processes.
+
+    Key exchange is done once and password authentication is retried on
+    the same transport for as long as server allows it (new connection is
+    opened only when server drops the old one).
+
+    Arguments:
+        addr (Address) -- Address of device.
+        uname (str) -- User name on device.
+        port [opt] (int) -- SSH port (Default: 22).
+        timeout [opt] (float) -- Connection and authentication timeout in seconds (Default: 10).
+        store [opt] (CredentialStore) -- Reorder candidates using remembered passwords and failures (Default: None).
+        max_attempts [opt] (int) -- Maximum number of passwords tried on this device (Default: no limit).
+        interval [opt] (float) -- Minimal time in seconds between attempts on this device (Default: 0).
+        budget [opt] (AttemptBudget) -- Attempt budget shared with other searches (Default: no limit).
+    """
+
+    def __init__(self, addr: Address, uname: str, port: int = 22, timeout: float = 10, store: CredentialStore = None,
+                 max_attempts: int = None, interval: float = 0.0, budget: AttemptBudget = None) -> None:
+        if not isinstance(addr, Address):
+            raise TypeError("Address should be an `Address` object!")
+        self.addr = addr
+        self.uname = uname
+        self.port = port
+        self.timeout = timeout
+        self.store = store
+        self.max_attempts = max_attempts
+        self.interval = interval
+        self.budget = budget
+        self.attempts = 0  # Number of tried passwords
+        self.connections = 0  # Number of performed key exchanges
+        self._transport = None
+
+    def _connect(self) -> Transport:
+        """Open new connection and perform key exchange."""
+        sock = socket.create_connection((str(self.addr), self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        transport = Transport(sock)
+        transport.banner_timeout = self.timeout
+        transport.auth_timeout = self.timeout
+        try:
+            transport.start_client(timeout=self.timeout)
+        except Exception:
+            transport.close()
+            raise
+        self.connections += 1
+        return transport
+
+    def _try_password(self, transport: Transport, passwd: str) -> bool:
+        """Try single password, return authentication result."""
+        try:
+            transport.auth_password(self.uname, passwd)
+        except BadAuthenticationType as e:
+            if "keyboard-interactive" not in e.allowed_types:
+                raise
+            handler = lambda title, instructions, prompts: [passwd for _ in prompts]
+            try:
+                transport.auth_interactive(self.uname, handler)
+            except AuthenticationException:
+                return False
+        except AuthenticationException:
+            return False
+        return transport.is_authenticated()
+
+    def find(self, pass_list: list) -> Tuple[str, Transport]:
+        """Try passwords from list.
+
+        Returns:
+            tuple -- (password, authenticated transport) or (None, None) when no password matched.
+        """
+        mac = None
+        if self.store is not None:
+            mac = get_mac(self.addr)
+            pass_list = self.store.ordered(self.addr, pass_list, mac=mac)
+        last_attempt = 0.0
+        for passwd in pass_list:
+            if self.max_attempts is not None and self.attempts >= self.max_attempts:
+                break
+            if self.budget is not None and not self.budget.take():
+                break
+            wait = last_attempt + self.interval - time.monotonic()
+            if wait > 0:  # Pace attempts so device does not throttle us
+                time.sleep(wait)
+            last_attempt = time.monotonic()
+            for retry in range(2):  # Second round only when server dropped connection
+                if self._transport is None or not self._transport.is_active():
+                    if self._transport is not None:
+                        self._transport.close()
+                    self._transport = self._connect()
+                try:
+                    found = self._try_password(self._transport, passwd)
+                except (SSHException, EOFError, OSError):
+                    if self._transport.is_active() or retry:  # Password could not be tested, do not skip it
+                        raise
+                    continue  # Connection was closed by server, retry with new one
+                self.attempts += 1
+                if found:
+                    if self.store is not None:
+                        self.store.record_success(self.addr, passwd, mac=mac)
+                    transport, self._transport = self._transport, None
+                    return passwd, transport
+                if self.store is not None:
+                    self.store.record_failure(self.addr, passwd, mac=mac)
+                break
+        self.close()
+        return None, None
+
+    def close(self) -> None:
+        """Close connection used for search."""
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+
+class PasswordScheduler:
+    """Search passwords on many devices concurrently.
+
+    Arguments:
+        uname (str) -- User name on devices.
+        pass_list (list) -- Candidate passwords.
+        max_connections [opt] (int) -- Number of devices searched at once (Default: 10).
+        max_attempts [opt] (int) -- Maximum number of passwords tried per device (Default: no limit).
+        interval [opt] (float) -- Minimal time in seconds between attempts on one device (Default: 0).
+        budget [opt] (int) -- Maximum number of attempts on all devices together (Default: no limit).
+        store [opt] (CredentialStore) -- Remembered passwords (Default: None).
+        port [opt] (int) -- SSH port (Default: 22).
+        timeout [opt] (float) -- Connection timeout in seconds (Default: 10).
+        pool [opt] (SessionPool) -- Devices with live session in pool are not searched, its transport is returned (Default: None).
+    """
+
+    def __init__(self, uname: str, pass_list: list, max_connections: int = 10, max_attempts: int = None,
+                 interval: float = 0.0, budget: int = None, store: CredentialStore = None, port: int = 22,
+                 timeout: float = 10, pool: SessionPool = None) -> None:
+        if max_connections < 1:
+            raise ValueError("At least one connection is required!")
+        self.uname = uname
+        self.pass_list = pass_list
+        self.max_connections = max_connections
+        self.max_attempts = max_attempts
+        self.interval = interval
+        self.budget = AttemptBudget(budget)
+        self.store = store
+        self.port = port
+        self.timeout = timeout
+        self.pool = pool
+        self.errors = {}  # {Address: exception} for devices where search could not finish
+
+    def _search(self, addr: Address) -> Tuple[Address, str, Transport]:
+        if self.pool is not None:
+            session = self.pool.find(str(addr), self.port, self.uname)
+            if session is not None:  # Logged in by earlier run
+                return addr, session.data["passwd"], session.transport
+        finder = PasswordFinder(addr, self.uname, port=self.port, timeout=self.timeout, store=self.store,
+                                max_attempts=self.max_attempts, interval=self.interval, budget=self.budget)
+        try:
+            passwd, transport = finder.find(self.pass_list)
+        except (SSHException, EOFError, OSError) as e:
+            finder.close()
+            self.errors[addr] = e
+            return addr, None, None
+        return addr, passwd, transport
+
+    def run(self, addresses: Iterable[Address]) -> Iterator[Tuple[Address, str, Transport]]:
+        """Yield (address, password, authenticated transport) as soon as every search finishes.
+
+        Password and transport are None when password was not found. Addresses
+        may come from generator (e.g. `Finder.iter_found`), they are consumed in background
+        (see `imap_unordered`).
+        """
+        return imap_unordered(self._search, addresses, self.max_connections)
+
 
 def find_ssh_password(addr: Address, uname: str, pass_list: list):
     """Find correct SSH password from given list."""
-    for passwd in pass_list:
-        if os.system(f'sshpass -p "{passwd}" ssh -o StrictHostKeyChecking=no -t -l "{uname}" {str(addr)} ":" > /dev/null 2>&1') == 0:
-            return passwd
-    return None
+    finder = PasswordFinder(addr, uname)
+    try:
+        passwd, transport = finder.find(pass_list)
+    except (SSHException, EOFError, OSError):
+        finder.close()
+        return None
+    if transport is not None:
+        transport.close()
+    return passwd
+
+
+class PasswordFinderTest(unittest.TestCase):
+    def setUp(self):
+        from .simulator import Simulator
+        self.sim = Simulator(1, first="127.0.0.1", port=0).start()
+        self.device = self.sim.devices[0]
+
+    def tearDown(self):
+        self.sim.stop()
+
+    def test_find(self):
+        finder = PasswordFinder(self.device.addr, "ubnt", port=self.device.port)
+        passwd, transport = finder.find(["wrong", "ubnt"])
+        transport.close()
+        self.assertEqual((passwd, finder.attempts, finder.connections), ("ubnt", 2, 1), "Wrong search result")
+
+    def test_dropped_connection(self):
+        from unittest import mock
+        finder = PasswordFinder(self.device.addr, "ubnt", port=self.device.port)
+
+        def drop(transport, passwd):  # Server closes connection during every attempt
+            transport.close()
+            raise EOFError()
+        finder._try_password = drop
+        with self.assertRaises(EOFError):
+            finder.find(["ubnt", "other"])
+        self.assertEqual(finder.connections, 2, "Dropped attempt was not retried once")
+        finder.close()
+
+        scheduler = PasswordScheduler("ubnt", ["ubnt"], port=self.device.port)
+        with mock.patch.object(PasswordFinder, "_try_password", lambda _, transport, passwd: drop(transport, passwd)):
+            results = list(scheduler.run([self.device.addr]))
+        self.assertEqual(results, [(self.device.addr, None, None)], "Untested device reported as searched")
+        self.assertIn(self.device.addr, scheduler.errors, "Dropped device not in errors")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,209 @@
+#############################################
+# Lossless airOS system.cfg parser
+# Author: MattTheCoder-W
+#############################################
+
+import sys
+import time
+import bisect
+import unittest
+from collections.abc import MutableMapping
+
+ENCODING = "utf-8"
+ERRORS = "surrogateescape"  # Invalid bytes survive decoding and encoding unchanged
+
+
+class SystemConfig(MutableMapping):
+    """Content of airOS `system.cfg` as ordered mapping {property_name: value}.
+
+    File is parsed in single pass and serialized back byte for byte: line
+    order, blank lines, lines without `=` and `=` inside values are kept.
+    Changed values are written in place, new properties are added at the end.
+    Property repeated in file has value of its last line, but change or
+    removal applies to all its lines.
+
+    Arguments:
+        data [opt] (bytes) -- File content (Default: empty configuration).
+
+    Methods:
+        to_bytes -- Serialize configuration
+        prefix -- Properties with names starting with given prefix
+    """
+
+    __slots__ = ["_lines", "_index", "_duplicates", "_sorted"]
+
+    def __init__(self, data: bytes = b"") -> None:
+        if not isinstance(data, bytes):
+            raise TypeError("Configuration should be bytes!")
+        self._lines = data.decode(ENCODING, ERRORS).split("\n")  # Raw lines, None for deleted ones
+        # {key: line number}, lines without property name are kept as they are
+        keys = [(line[:pos], i) for i, line in enumerate(self._lines) if (pos := line.find("=")) > 0]
+        self._index = dict(keys)  # Last line of repeated property
+        self._duplicates = {}  # {key: [line numbers of earlier lines]} for properties repeated in file
+        if len(self._index) < len(keys):
+            for key, i in keys:
+                if i != self._index[key]:
+                    self._duplicates.setdefault(key, []).append(i)
+        self._sorted = None  # Sorted keys for `prefix`, built on first use
+
+    @classmethod
+    def from_dict(cls, cfg: dict) -> "SystemConfig":
+        """Create configuration from {property_name: value} dictionary (ends with new line)."""
+        config = cls(b"")
+        for key, value in cfg.items():
+            config[key] = value
+        return config
+
+    def to_bytes(self) -> bytes:
+        """Return configuration in `system.cfg` format."""
+        lines = self._lines
+        if None in lines:
+            lines = [line for line in lines if line is not None]
+        return "\n".join(lines).encode(ENCODING, ERRORS)
+
+    def prefix(self, prefix: str) -> dict:
+        """Return {property_name: value} for names starting with prefix (e.g. `radio.1.` or `radio.1.*`)."""
+        if prefix.endswith("*"):
+            prefix = prefix[:-1]
+        if self._sorted is None:
+            self._sorted = sorted(self._index)
+        keys = self._sorted
+        result = {}
+        for i in range(bisect.bisect_left(keys, prefix), len(keys)):
+            if not keys[i].startswith(prefix):
+                break
+            result[keys[i]] = self[keys[i]]
+        return result
+
+    def __getitem__(self, key: str) -> str:
+        return self._lines[self._index[key]][len(key) + 1:]
+
+    def __setitem__(self, key: str, value: str) -> None:
+        if not isinstance(key, str) or not key or "=" in key or "\n" in key:
+            raise KeyError(f"Incorrect property name: {key!r}")
+        value = str(value)
+        if "\n" in value:
+            raise ValueError("Value should not contain new line!")
+        line = f"{key}={value}"
+        i = self._index.get(key)
+        if i is not None:
+            self._lines[i] = line
+            for j in self._duplicates.get(key, ()):
+                self._lines[j] = line
+            return
+        lines = self._lines
+        if lines == [""]:  # Empty file
+            lines[0] = line
+            self._index[key] = 0
+            lines.append("")
+        elif lines[-1] == "":  # Keep new line at the end of file
+            self._index[key] = len(lines) - 1
+            lines.insert(len(lines) - 1, line)
+        else:
+            self._index[key] = len(lines)
+            lines.append(line)
+        self._sorted = None
+
+    def __delitem__(self, key: str) -> None:
+        i = self._index.pop(key)
+        self._lines[i] = None  # Line numbers of other properties stay valid
+        for j in self._duplicates.pop(key, ()):
+            self._lines[j] = None
+        self._sorted = None
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key) -> bool:
+        return key in self._index
+
+    def __repr__(self) -> str:
+        return f"SystemConfig({len(self)} properties)"
+
+
+def sample_config(size: int = 1000) -> bytes:
+    """Return generated `system.cfg` with about `size` properties (for tests and benchmarks)."""
+    lines = []
+    for i in range(size // 4):
+        lines.append(f"radio.{i % 4 + 1}.chanbw.{i}=20")
+        lines.append(f"wireless.{i}.ssid=net=work {i}")
+        lines.append(f"users.{i}.password=$1$abc{i}$xyz/Q=")
+        lines.append(f"snmp.{i}.status=enabled")
+    return ("\n".join(lines) + "\n").encode()
+
+
+def benchmark(data: bytes = None, rounds: int = 200) -> dict:
+    """Compare parse, single change and serialize times of `SystemConfig` and dictionary approach.
+
+    Returns:
+        dict -- {"dict": seconds per round, "SystemConfig": seconds per round}
+    """
+    data = sample_config() if data is None else data
+    times = {}
+
+    start = time.perf_counter()
+    for _ in range(rounds):  # Approach used before `SystemConfig` (loses `=` in values)
+        cfg = {}
+        for elem in [x.strip().split("=") for x in data.decode().splitlines(keepends=True)]:
+            cfg[elem[0]] = elem[1]
+        cfg["system.timezone"] = "GMT-1"
+        out = "".join([f"{key}={cfg[key]}\n" for key in list(cfg.keys())]).encode()
+    times["dict"] = (time.perf_counter() - start) / rounds
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        cfg = SystemConfig(data)
+        cfg["system.timezone"] = "GMT-1"
+        out = cfg.to_bytes()
+    times["SystemConfig"] = (time.perf_counter() - start) / rounds
+    return times
+
+
+class SystemConfigTest(unittest.TestCase):
+    def test_round_trip(self):
+        for data in [b"", b"\n", b"a=1", b"a=1\n", b"a=1\n\nb=x=y\n", b"# comment\nno value line\nc=\n=d\n",
+                     b"a=1\r\nb=\xff\xfe\n", sample_config(100)]:
+            self.assertEqual(SystemConfig(data).to_bytes(), data, f"Round trip changed {data[:20]!r}")
+
+    def test_values(self):
+        cfg = SystemConfig(b"a=1\n\nb=x=y\nc=\n")
+        self.assertEqual(cfg["b"], "x=y", "Value with `=` was cut")
+        self.assertEqual(cfg["c"], "", "Empty value was lost")
+        self.assertEqual(list(cfg), ["a", "b", "c"], "Wrong order of properties")
+        cfg["a"] = "2"
+        cfg["d"] = "new"
+        del cfg["b"]
+        self.assertEqual(cfg.to_bytes(), b"a=2\n\nc=\nd=new\n", "Wrong serialization after changes")
+        self.assertEqual(SystemConfig.from_dict({"a": "1", "b": "2"}).to_bytes(), b"a=1\nb=2\n", "Wrong file from dict")
+        with self.assertRaises(KeyError):
+            cfg["bad=key"] = "1"
+
+    def test_duplicates(self):
+        data = b"a=1\nb=x\na=2\nc=3\na=4\n"
+        self.assertEqual(SystemConfig(data).to_bytes(), data, "Round trip changed repeated property")
+        cfg = SystemConfig(data)
+        self.assertEqual((cfg["a"], len(cfg)), ("4", 3), "Repeated property not read from its last line")
+        cfg["a"] = "5"
+        self.assertEqual(cfg.to_bytes(), b"a=5\nb=x\na=5\nc=3\na=5\n", "Old value of repeated property kept")
+        del cfg["a"]
+        self.assertEqual(cfg.to_bytes(), b"b=x\nc=3\n", "Repeated property not removed")
+        self.assertNotIn("a", SystemConfig(cfg.to_bytes()), "Removed property still in file")
+
+    def test_prefix(self):
+        cfg = SystemConfig(b"radio.1.mode=ap\nradio.10.mode=sta\nradio.1.countrycode=616\nresolv.host.1.name=x\n")
+        self.assertEqual(cfg.prefix("radio.1."), {"radio.1.countrycode": "616", "radio.1.mode": "ap"},
+                         "Wrong properties for prefix")
+        cfg["radio.1.dfs.status"] = "enabled"
+        self.assertEqual(len(cfg.prefix("radio.1.*")), 3, "Prefix lookup did not see new property")
+        self.assertEqual(cfg.prefix("wireless."), {}, "Found properties for missing prefix")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["bench"]:
+        for name, seconds in benchmark().items():
+            print(f"{name:<13} {seconds * 1000:.3f} ms per parse + change + serialize")
+    else:
+        unittest.main()
@@ -8,12 +8,16 @@ import random
 import datetime
 import dateutil.parser
 from argparse import ArgumentParser
-from paramiko.ssh_exception import SSHException, NoValidConnectionsError, AuthenticationException
+from paramiko.ssh_exception import SSHException
 
 from classes.finder import Finder
-from classes.address import Address, Port
+from classes.ratecontrol import RateController
+from classes.snapshot import SnapshotStore
+from classes.address import Address
+from classes.portscan import iter_scan
 from classes.connector import Executor
-from classes.sshtools import find_ssh_password
+from classes.sshtools import PasswordScheduler
+from classes.credstore import CredentialStore
 
 # Parse user arguments using argaprse in two modes:
 # mode: reboot (plan reboots on devices)
@@ -28,6 +32,16 @@ reboot_parser.add_argument("mask", type=str, help="Mask address")
 reboot_parser.add_argument("uname", type=str, help="Username on all devices")
 reboot_parser.add_argument("passwords", type=str, help="Password list or path to file with password list in it")
 reboot_parser.add_argument("time", type=str, help="Time Inverval (START-END)")
+reboot_parser.add_argument("--scan-mode", type=str, choices=Finder.modes, default="system", help="Device discovery mode (icmp = in-process asynchronous ping)")
+reboot_parser.add_argument("--scan-rate", type=int, default=1000, help="Probes per second in icmp scan mode")
+reboot_parser.add_argument("--adaptive-scan", action="store_true", help="Adapt number of probes in flight to network latency and loss")
+reboot_parser.add_argument("--snapshots", type=str, help="Directory for saving discovery results (enables --known-first and --snapshot-ttl)")
+reboot_parser.add_argument("--known-first", action="store_true", help="Check hosts found in last scan before the rest of network")
+reboot_parser.add_argument("--snapshot-ttl", type=float, help="Skip scan when last scan is younger than given number of seconds")
+reboot_parser.add_argument("--credentials", type=str, help="File for remembering working passwords (tried first on next runs)")
+reboot_parser.add_argument("--auth-workers", type=int, default=10, help="Number of devices searched for password at once")
+reboot_parser.add_argument("--probe-workers", type=int, default=50, help="Number of devices checked for open SSH port at once")
+reboot_parser.add_argument("--port", type=int, default=22, help="SSH port of devices")
 
 # Clear mode arguments
 undo_parser = subparsers.add_parser("clear", help="Clear all pending reboots")
@@ -35,6 +49,16 @@ undo_parser.add_argument("address", type=str, help="Network address")
 undo_parser.add_argument("mask", type=str, help="Mask address")
 undo_parser.add_argument("uname", type=str, help="Username on all devices")
 undo_parser.add_argument("passwords", type=str, help="Password list or path to file with password list in it")
+undo_parser.add_argument("--scan-mode", type=str, choices=Finder.modes, default="system", help="Device discovery mode (icmp = in-process asynchronous ping)")
+undo_parser.add_argument("--scan-rate", type=int, default=1000, help="Probes per second in icmp scan mode")
+undo_parser.add_argument("--adaptive-scan", action="store_true", help="Adapt number of probes in flight to network latency and loss")
+undo_parser.add_argument("--snapshots", type=str, help="Directory for saving discovery results (enables --known-first and --snapshot-ttl)")
+undo_parser.add_argument("--known-first", action="store_true", help="Check hosts found in last scan before the rest of network")
+undo_parser.add_argument("--snapshot-ttl", type=float, help="Skip scan when last scan is younger than given number of seconds")
+undo_parser.add_argument("--credentials", type=str, help="File for remembering working passwords (tried first on next runs)")
+undo_parser.add_argument("--auth-workers", type=int, default=10, help="Number of devices searched for password at once")
+undo_parser.add_argument("--probe-workers", type=int, default=50, help="Number of devices checked for open SSH port at once")
+undo_parser.add_argument("--port", type=int, default=22, help="SSH port of devices")
 
 args = vars(parser.parse_args())
 
@@ -46,6 +70,7 @@ else:
         passwds = [line.strip() for line in f.readlines()]
 
 uname = args['uname']
+credentials = CredentialStore(args['credentials']) if args['credentials'] else None
 
 if "time" in args:  # "time" is in args dict when user run `reboot` mode
     start, end = args['time'].split("-")
@@ -57,60 +82,72 @@ if "time" in args:  # "time" is in args dict when user run `reboot` mode
         start += datetime.timedelta(days=1)
         end += datetime.timedelta(days=1)
 
-# Get all active devices in network
-devices = Finder(Address(args['address']), Address(args['mask'])).find_all()
+# Get all active devices in network (devices are handled while scan continues)
+controller = RateController(max_rate=args['scan_rate']) if args['adaptive_scan'] else None
+store = SnapshotStore(args['snapshots']) if args['snapshots'] else None
+finder = Finder(Address(args['address']), Address(args['mask']), mode=args['scan_mode'], rate=args['scan_rate'], controller=controller,
+                store=store, known_first=args['known_first'], ttl=args['snapshot_ttl'])
 
-print("Found", len(devices), "devices!")
 if "time" in args:  # Reboot mode
-    print("Generating random minutes...")
-
-    choosen = []
-    minutes = list(range(0, int((end-start).total_seconds()//60)))  # List of possible minutes
-
-    for _ in range(len(devices)):
-        # For every device pick random minute and add it to start time
-        delta = random.choice(minutes)
-        cur_date = start + datetime.timedelta(minutes=delta)
-        choosen.append(cur_date)
-        minutes.remove(delta)
-
-    print("Random minutes generated!")
+    minutes = max(1, int((end-start).total_seconds()//60))  # Number of possible minutes
+
+def ssh_devices():
+    """Yield found devices with open SSH port (probed in one event loop while scan continues, filtered hosts do not stall others)."""
+    for port, is_open in iter_scan(finder.iter_found(), [args['port']], concurrency=args['probe_workers']):
+        if is_open:
+            yield port.addr
+
+# Search passwords on many devices at once (class from `classes/sshtools.py`)
+scheduler = PasswordScheduler(uname, passwds, max_connections=args['auth_workers'], store=credentials,
+                              port=args['port'])
+
+for addr, passwd, transport in scheduler.run(ssh_devices()):
+    if credentials is not None:
+        credentials.save()
+    if addr in scheduler.errors:  # SSH was closed
+        print(f"{addr} not SSH")
+        continue
 
-for i, addr in enumerate(devices):
-    if not bool(Port(addr, 22)):  # Check for ssh connection
+    if passwd is None:
+        print(f"Correct password not found for {addr}!")
         continue
 
     if "time" in args:
-        exec_time = choosen[i]
+        # Pick random minute (many devices may share it) and add it to start time
+        exec_time = start + datetime.timedelta(minutes=random.randrange(minutes))
         print(f"{addr} will reboot at {exec_time}")
 
-    passwd = find_ssh_password(addr, uname, passwds)  # Function from `classes/sshtools.py`
-    if passwd is None:
-        print(f"Correct password not found for {addr}!")
-        continue
-    
+    airos = None
     try:
-        # Connect to device
-        airos = Executor(str(addr), 22, uname, passwd)
+        # Connect to device (reusing connection from password search)
+        airos = Executor(str(addr), args['port'], uname, passwd, transport=transport)
         print(f"Logged in with uname={uname}, passwd={passwd}")
-    except NoValidConnectionsError:  # SSH was closed
-        print(f"{addr} not SSH")
-        continue
-    except AuthenticationException:  # Wrong password
-        raise ValueError(f"Password `{passwd}` is not valid!")
 
-    if "time" in args:
-        # Convert picked delay in minutes into seconds
-        target_seconds = int(round((exec_time - datetime.datetime.now()).total_seconds(), 0))
-        print(f"Device will reboot in {target_seconds} seconds")
-        # Reboot device after `target_seconds` seconds
-        if len(airos.exec(f"sleep {target_seconds} && reboot &")[1]):
-            print("Error occured while executing command!")
-    else:  # Clear mode
-        _, err = airos.exec("killall sleep")  # Kill all sleep processes (scheduled reboots)
-        if err:
-            print("error while executing killall command:", err)
-        else:
-            print(f"Pending reboots cleared for {addr}")
-    
+        if "time" in args:
+            # Convert picked delay in minutes into seconds
+            target_seconds = int(round((exec_time - datetime.datetime.now()).total_seconds(), 0))
+            print(f"Device will reboot in {target_seconds} seconds")
+            # Reboot device after `target_seconds` seconds
+            if len(airos.exec(f"sleep {target_seconds} && reboot &")[1]):
+                print("Error occured while executing command!")
+        else:  # Clear mode
+            _, err = airos.exec("killall sleep")  # Kill all sleep processes (scheduled reboots)
+            if err:
+                print("error while executing killall command:", err)
+            else:
+                print(f"Pending reboots cleared for {addr}")
+    except (SSHException, EOFError, OSError) as e:  # Device dropped connection, go on with the rest
+        print(f"Connection error on {addr}: {e}")
+    finally:
+        if airos is not None:
+            airos.close()
+        elif transport is not None:
+            transport.close()
+
+print("Found", len(finder.found), "devices!")
+if controller is not None:
+    print(f"Scan concurrency: {controller}")
+if store is not None and finder.previous is not None:
+    appeared, disappeared = finder.diff()
+    print(f"Since last scan: {len(appeared)} new devices, {len(disappeared)} gone")
 print("All devices done!")
@@ -0,0 +1,53 @@
+##############################################
+# Benchmarks of Discovery, Auth and Configuration
+# Author: MattTheCoder-W
+##############################################
+
+import sys
+import importlib.util
+from argparse import ArgumentParser
+
+from classes.benchmark import SUITE, run_suite, load_baseline, save_baseline, compare, format_result
+
+parser = ArgumentParser(description="Measure throughput, latency and memory of addressing, discovery, password search and configuration.")
+parser.add_argument("benchmarks", type=str, nargs="*", help=f"Benchmarks to run (Default: all): {', '.join(SUITE)}")
+parser.add_argument("--quick", action="store_true", help="Run few rounds only (checks that benchmarks work, numbers are noisy)")
+parser.add_argument("--baseline", type=str, default="data/benchmark-baseline.json", help="Baseline file to compare with")
+parser.add_argument("--save-baseline", action="store_true", help="Save results as new baseline")
+parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed throughput drop against baseline (0.25 = 25%%)")
+parser.add_argument("--check", action="store_true", help="Exit with status 1 when any benchmark regressed")
+parser.add_argument("--output", type=str, help="Also write report to given file")
+args = vars(parser.parse_args())
+
+# `configure_device` lives in script with dash in name, so it is loaded from path
+spec = importlib.util.spec_from_file_location("setup_dev_oop", "setup-dev-oop.py")
+setup_dev_oop = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(setup_dev_oop)
+
+baseline = load_baseline(args['baseline'])
+results, report, regressions = [], [], []
+for result in run_suite(args['benchmarks'] or None, quick=args['quick'], configure=setup_dev_oop.configure_device):
+    ratio, regressed = compare(result, baseline, args['tolerance'])
+    results.append(result)
+    if regressed:
+        regressions.append(result.name)
+    line = format_result(result, ratio, regressed)
+    report.append(line)
+    print(line, flush=True)
+
+summary = f"{len(results)} benchmarks, {len(regressions)} regressed" + (f": {', '.join(regressions)}" if regressions else "")
+if not baseline:
+    summary += f" (no baseline in {args['baseline']})"
+report.append(summary)
+print(summary)
+
+if args['output']:
+    with open(args['output'], "w") as f:
+        f.write("\n".join(report) + "\n")
+
+if args['save_baseline']:
+    save_baseline(args['baseline'], results)
+    print(f"Baseline saved to {args['baseline']}")
+
+if args['check'] and regressions:
+    sys.exit(1)
@@ -0,0 +1,70 @@
+##############################################
+# Run Command on All Ubiquiti Devices in Network
+# Author: MattTheCoder-W
+##############################################
+
+import os.path
+from argparse import ArgumentParser
+
+from classes.finder import Finder
+from classes.ratecontrol import RateController
+from classes.snapshot import SnapshotStore
+from classes.address import Address
+from classes.credstore import CredentialStore
+from classes.fleet import run_on_fleet
+
+parser = ArgumentParser(description="Run shell command on all devices in network at once.")
+parser.add_argument("address", type=str, help="Network address")
+parser.add_argument("mask", type=str, help="Mask address")
+parser.add_argument("uname", type=str, help="Username on all devices")
+parser.add_argument("passwords", type=str, help="Password list or path to file with password list in it")
+parser.add_argument("command", type=str, help="Command to run on every device")
+parser.add_argument("--workers", type=int, default=20, help="Number of devices handled at once")
+parser.add_argument("--timeout", type=float, default=30, help="Timeout of each connection attempt and of the command in seconds")
+parser.add_argument("--max-output", type=int, default=1 << 20, help="Maximum number of output bytes kept per device")
+parser.add_argument("--port", type=int, default=22, help="SSH port of devices")
+parser.add_argument("--scan-mode", type=str, choices=Finder.modes, default="system", help="Device discovery mode (icmp = in-process asynchronous ping)")
+parser.add_argument("--scan-rate", type=int, default=1000, help="Probes per second in icmp scan mode")
+parser.add_argument("--adaptive-scan", action="store_true", help="Adapt number of probes in flight to network latency and loss")
+parser.add_argument("--snapshots", type=str, help="Directory for saving discovery results (enables --known-first and --snapshot-ttl)")
+parser.add_argument("--known-first", action="store_true", help="Check hosts found in last scan before the rest of network")
+parser.add_argument("--snapshot-ttl", type=float, help="Skip scan when last scan is younger than given number of seconds")
+parser.add_argument("--credentials", type=str, help="File for remembering working passwords (tried first on next runs)")
+args = vars(parser.parse_args())
+
+# Check if user specified passwords file path or password list
+if not os.path.exists(args['passwords']) or not os.path.isfile(args['passwords']):
+    passwds = args['passwords'].split(" ")
+else:
+    with open(args['passwords'], "r") as f:
+        passwds = [line.strip() for line in f.readlines()]
+
+credentials = CredentialStore(args['credentials']) if args['credentials'] else None
+controller = RateController(max_rate=args['scan_rate']) if args['adaptive_scan'] else None
+store = SnapshotStore(args['snapshots']) if args['snapshots'] else None
+finder = Finder(Address(args['address']), Address(args['mask']), mode=args['scan_mode'], rate=args['scan_rate'], controller=controller,
+                store=store, known_first=args['known_first'], ttl=args['snapshot_ttl'])
+
+# Devices are handled while scan continues, results are printed as soon as device finishes
+succeeded = failed = truncated = errors = 0
+for result in run_on_fleet(finder.iter_found(), args['command'], args['uname'], passwds, max_workers=args['workers'],
+                           timeout=args['timeout'], max_bytes=args['max_output'], store=credentials, port=args['port']):
+    for line in result.out:
+        print(f"{result.addr}: {line}", end="" if line.endswith("\n") else "\n")
+    for line in result.err:
+        print(f"{result.addr} [stderr]: {line}", end="" if line.endswith("\n") else "\n")
+    if result.truncated:  # Command was reached but cut, so it has no exit status
+        truncated += 1
+        print(f"{result.addr}: {result.error}")
+    elif result.status is None:
+        errors += 1
+        print(f"{result.addr}: {result.error}")
+    elif result.status != 0:
+        failed += 1
+        print(f"{result.addr}: exit status {result.status}")
+    else:
+        succeeded += 1
+
+if credentials is not None:
+    credentials.save()
+print(f"Found {len(finder.found)} devices: {succeeded} succeeded, {failed} failed, {truncated} truncated, {errors} not reached")
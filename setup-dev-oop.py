@@ -5,126 +5,125 @@
 
 import os.path
 import argparse
-from copy import deepcopy
-from paramiko.ssh_exception import SSHException, NoValidConnectionsError, AuthenticationException
+from paramiko.ssh_exception import SSHException
 
 from classes.finder import Finder
-from classes.address import Address, Port
-from classes.connector import Executor
-from classes.sshtools import find_ssh_password
-
-
-class Configurator:
-    """Edit ubiquiti device configuration.
-
-    This class does not upload configuration onto device!
-    It only modify downloaded configuration.
-
-    Arguments:
-        cfg (dict) -- Configuration from ubnt device.
-
-    Methods:
-        set_dns -- Set DNS addresses
-        set_snmp -- Set SNMP info
-        set_ntp -- Set NTP address
-        set_timezone -- Set device timezone
-        change_passwd -- Change ubnt user password
-        enable_compliance_test -- Enable compliance test
-        disable_compliance_test -- Disable compliance test
-        set_hostname -- Set device hostname
-        change_language -- Change device Web Configuration language
+from classes.ratecontrol import RateController
+from classes.snapshot import SnapshotStore
+from classes.address import Address
+from classes.portscan import iter_scan
+from classes.connector import Executor, SessionPool
+from classes.sshtools import PasswordScheduler
+from classes.credstore import CredentialStore, get_mac
+from classes.pipeline import imap_unordered
+from classes.sysconfig import SystemConfig
+from classes.fingerprint import FingerprintStore, config_fingerprint
+from classes.configurator import Configurator, COMPLIANCE_TEST_FLAG
+from classes.profile import Profile, ProfilePatch
+
+
+# Settings used when no profile file is given (see `classes/profile.py` for format)
+DEFAULT_PROFILE = {
+    "dns": ["91.232.50.10", "91.232.52.10"],
+    "snmp": {"community": "local", "contact": "test.skryptu.bez.restartu@test.local", "location": "Banino"},
+    "ntp": "91.232.52.123",
+    "timezone": "-1",
+    "compliance_test": False,
+}
+
+
+def configure_device(addr: Address, uname: str, passwd: str, patch: ProfilePatch, transport=None,
+                     new_passwd: str = None, do_restart: bool = False, port: int = 22,
+                     fingerprints: FingerprintStore = None, pool: SessionPool = None) -> tuple:
+    """Download, modify, upload and apply configuration of single device.
+
+    All state belongs to this call, so many devices can be configured at once.
+
+    Parameters:
+        addr (Address) -- Address of device.
+        uname (str) -- Account username on device.
+        passwd (str) -- Current password.
+        patch (ProfilePatch) -- Settings compiled for device (see `Profile.patch_for`).
+        transport [opt] (Transport) -- Authenticated transport from password search.
+        new_passwd [opt] (str) -- New password (None when password should not change).
+        do_restart [opt] (bool) -- Reboot device after saving configuration.
+        port [opt] (int) -- SSH port (Default: 22).
+        fingerprints [opt] (FingerprintStore) -- Skip devices which still have configuration from last run (Default: None).
+        pool [opt] (SessionPool) -- Take session from pool and leave it open there (Default: None, session is closed).
+
+    Returns:
+        tuple -- (outcome, message) where outcome is `configured`, `unchanged` or `failed`.
     """
+    airos = None
+    change_passwd = new_passwd is not None and new_passwd != passwd
+    try:
+        if pool is not None:
+            airos = pool.get(str(addr), port, uname, passwd, transport=transport)
+        else:
+            airos = Executor(str(addr), port, uname, passwd, transport=transport)
+
+        # Device still has configuration applied by last run -- only checksum is transferred
+        if fingerprints is not None and not change_passwd:
+            remote = airos.md5sum("/tmp/system.cfg")
+            if remote is not None and fingerprints.matches(addr, remote, patch.fingerprint):
+                return "unchanged", "Configuration fingerprint matches"
+
+        # Backup and read current configuration and compliance test flag in one round trip
+        # (raw bytes, values may be in any encoding)
+        results = airos.exec_batch(["cp /tmp/system.cfg ~/system.cfg.bak", "cat /tmp/system.cfg",
+                                    f"test -e {COMPLIANCE_TEST_FLAG}"], raw=True)
+        if len(results) != 3:
+            return "failed", f"Error while reading configuration: only {len(results)} of 3 commands finished"
+        backup, current, flag = results
+        if backup.status != 0:  # Do not change device without backup of its configuration
+            return "failed", f"Error while backing up configuration: {backup.err.decode(errors='replace').strip()}"
+        if current.status != 0:
+            return "failed", f"Error while reading configuration: {current.err.decode(errors='replace').strip()}"
 
-    cfg = {}  # Device configuration -- {property_name: property_value}
-    languages = ["pl_PL", "en_US"]  # Supported languages
-    
-    def __init__(self, cfg: dict) -> None:
-        self.cfg = cfg
- 
-    @cfg.setter
-    def cfg(self, value: dict) -> None:
-        if not isinstance(value, dict):
-            raise TypeError("Configuration must be dictionary!")
-        self.cfg = value
-
-    def set_dns(self, dns1: Address, dns2: Address = None) -> None:
-        """Set DNS addresses (only one is required)."""
-        self.cfg["resolv.nameserver.1.ip"] = str(dns1)
-        self.cfg["resolv.nameserver.1.status"] = "enabled"
-        if dns2 is not None:
-            self.cfg["resolv.nameserver.2.status"] = "enabled"
-            self.cfg["resolv.nameserver.2.ip"] = str(dns2)
-
-    def set_snmp(self, community: str, contact: str, location: str) -> None:
-        """Set SNMP related information."""
-        self.cfg["snmp.status"] = "enabled"
-        self.cfg["snmp.community"] = community
-        self.cfg["snmp.contact"] = contact
-        self.cfg["snmp.location"] = location
-
-    def set_ntp(self, addr: Address) -> None:
-        """Set NTP address."""
-        self.cfg["ntpclient.status"] = "enabled"
-        self.cfg["ntpclient.1.status"] = "enabled"
-        self.cfg["ntpclient.1.server"] = str(addr)
-
-    def set_timezone(self, number: str) -> None:
-        """Set timezone in `GMTX` format."""
-        self.cfg["system.timezone"] = f"GMT{number}"
-
-    def change_passwd(self, uname: str, new_password: str, airos: Executor) -> None:
-        """Change password on ubnt device and apply it to system configuration.
-
-        In order to change password on ubnt devices permanently:
-            - Change it in terminal using SSH (paramiko).
-            - Get new password hash from `/etc/passwd`.
-            - Write new password hash to conf file in `users.1.password` field.
-        
-        Parameters:
-            uname (str) -- Account username on device.
-            new_password (str) -- New password.
-            airos (Executor) -- Executor calss object with active connection.
-        """
-        airos.change_password(new_password)  # SSH part
-        
-        # Get hash from /etc/passwd
-        passwd_hash = airos.read_file("/etc/passwd")  
-        for line in passwd_hash:
-            if uname in line:
-                passwd_hash = line.split(":")
-                break
-        for i, elem in enumerate(passwd_hash):
-            if uname in elem:
-                passwd_hash = passwd_hash[i+1]
-                break
-
-        self.cfg['users.1.password'] = passwd_hash  # Apply hash in configuration
-
-    def enable_compliance_test(self, airos: Executor) -> None:
-        """Enable Compliance Test."""
-        airos.exec("touch /etc/persistent/ ct")
-        self.cfg['radio.1.countrycode'] = "511"
-        self.cfg['radio.countrycode'] = "511"
-        self.cfg['radio.1.dfs.status'] = "disabled"
-    
-    def disable_compliance_test(self, airos: Executor) -> None:
-        """Disable Compliance Test"""
-        airos.exec("rm /etc/persistent/ct 2>/dev/null")
-        self.cfg['radio.1.countrycode'] = "616"
-        self.cfg['radio.countrycode'] = "616"
-        self.cfg['radio.1.dfs.status'] = "enabled"
-
-    def set_hostname(self, hostname: str) -> None:
-        """Set device hostname."""
-        self.cfg["resolv.host.1.status"] = "enabled"
-        self.cfg["resolv.host.1.name"] = hostname
-    
-    def change_language(self, language: str) -> None:
-        """Change device Web Configuration language."""
-        if language not in self.languages:
-            print("Language not in language list!")
-            return
-        self.cfg["gui.language"] = language
+        # Main configuration part
+        conf = Configurator(SystemConfig(current.out))
+        conf.apply(patch.cfg, patch.commands)  # Compliance test command is executed later together with `cfgmtd`
+
+        # Change password
+        if change_passwd:  # Hash is computed locally, `/etc/passwd` is updated together with `cfgmtd`
+            conf.change_passwd(uname, new_passwd)
+
+        # Nothing changed -- skip upload, flash write and reboot
+        changes = conf.diff()
+        conf.commands = conf.pending_commands(compliance_test=flag.status == 0)
+        if not changes and not conf.commands:
+            if fingerprints is not None:
+                fingerprints.record(addr, config_fingerprint(conf.cfg.to_bytes()), patch.fingerprint)
+            return "unchanged", "Configuration is up to date"
+        message = f"{len(changes)} properties changed" if changes else f"Executed {'; '.join(conf.commands)}"
+
+        if changes:
+            try:  # Upload over current connection (new password does not matter here)
+                airos.put("/tmp/system.cfg", conf.cfg.to_bytes())
+            except IOError as e:
+                return "failed", f"Error while uploading configuration file: {e}"
+
+        # Queued commands, `cfgmtd` and reboot in one round trip
+        conf.commands.append("cfgmtd -w")
+        if do_restart:
+            conf.commands.append("reboot")
+        results = airos.exec_batch(conf.commands, stop_on_error=True)
+        failed = [result for result in results if result.status != 0]
+        if failed:
+            if fingerprints is not None:
+                fingerprints.forget(addr)
+            return "failed", f"Error while executing `{failed[0].command}`: {''.join(failed[0].err).strip()}"
+        if fingerprints is not None:
+            fingerprints.record(addr, config_fingerprint(conf.cfg.to_bytes()), patch.fingerprint)
+        return "configured", message
+    finally:
+        if airos is None:
+            if transport is not None:  # Session could not be created, do not leak transport from password search
+                transport.close()
+        elif pool is not None:
+            pool.release(airos)  # Rebooted device has dead session, pool drops it
+        else:
+            airos.close()  # Close current connection
 
 
 if __name__ == "__main__":
@@ -137,6 +136,21 @@ if __name__ == "__main__":
     parser.add_argument("--do-restart", "-r", action="store_true", help="Perform reboot after saving configuration")
     parser.add_argument("--new-password", "-p", type=str, help="New password to set on all devices")
     parser.add_argument("--smart-passwords", type=str, help="Path to file with new passwords assigned to specific ip addresses. (format: IP:PASS)")
+    parser.add_argument("--scan-mode", type=str, choices=Finder.modes, default="system", help="Device discovery mode (icmp = in-process asynchronous ping)")
+    parser.add_argument("--scan-rate", type=int, default=1000, help="Probes per second in icmp scan mode")
+    parser.add_argument("--adaptive-scan", action="store_true", help="Adapt number of probes in flight to network latency and loss")
+    parser.add_argument("--snapshots", type=str, help="Directory for saving discovery results (enables --known-first and --snapshot-ttl)")
+    parser.add_argument("--known-first", action="store_true", help="Check hosts found in last scan before the rest of network")
+    parser.add_argument("--snapshot-ttl", type=float, help="Skip scan when last scan is younger than given number of seconds")
+    parser.add_argument("--credentials", type=str, help="File for remembering working passwords (tried first on next runs)")
+    parser.add_argument("--auth-workers", type=int, default=10, help="Number of devices searched for password at once")
+    parser.add_argument("--max-attempts", type=int, help="Maximum number of passwords tried on one device")
+    parser.add_argument("--attempt-interval", type=float, default=0.0, help="Minimal time in seconds between password attempts on one device")
+    parser.add_argument("--probe-workers", type=int, default=50, help="Number of devices checked for open SSH port at once")
+    parser.add_argument("--config-workers", type=int, default=10, help="Number of devices configured at once")
+    parser.add_argument("--profile", type=str, help="JSON or TOML file with settings for devices (see classes/profile.py)")
+    parser.add_argument("--fingerprints", type=str, help="File with checksums of applied configurations (unchanged devices are skipped after `md5sum`)")
+    parser.add_argument("--port", type=int, default=22, help="SSH port of devices")
     args = vars(parser.parse_args())
 
     # Check if user provided password file path or list of passwords
@@ -146,107 +160,100 @@ if __name__ == "__main__":
         with open(args['passwords'], "r") as f:
             passwords = [line.strip() for line in f.readlines()]
 
-    # Get active devices in network
-    devices = Finder(Address(args['net_address']), Address(int(args['mask']))).find_all()
-
-    if not devices:
-        print("No devices in network!")
-        exit(0)
-
-    do_restart: bool = args['do_restart']  # Flag for performing restart after saving configuration
-    uname: str = args['uname'] 
-    change_passwd = smart_passwords = True  # Password changing related flags
-    new_passwd: str = args['new_password']
-
     # Load password assigned to specific IP Addresses
+    smart_passwords = None  # {ip: new password} when file was given
     if args['smart_passwords'] is not None:
         # Check if file exists
         if not os.path.exists(args['smart_passwords']) or not os.path.isfile(args['smart_passwords']):
             raise FileNotFoundError("Specified smart passwords file does not exist:", args['smart_passwords'])
         
-        smart_passwords, new_passwds = [True, {}]
+        smart_passwords = {}
         with open(args['smart_passwords'], "r") as f:
             for line in [line.strip() for line in f.readlines()]:
                 try:
                     ip_addr, passwd = line.split("$to$")
                 except ValueError:  # Exception when `$to$` is not in any line of file
                     raise ValueError("Incorrect smart passwords file content!")
-                new_passwds[ip_addr] = passwd  # Put values into new_passwds dict
+                smart_passwords[ip_addr] = passwd
         print("Loaded smart passwords!")
 
-    CONFIGURED = 0  # Configured devices counter
-    
-    # Configuration of all devices in network
-    for addr in devices:
-        print(f"Trying: {str(addr)}")
-
-        if not bool(Port(addr, 22)):
-            print(f"SSH port not open at {addr}")
-            continue
-
-        print("Searching for password...")
-        passwd = find_ssh_password(addr, uname, passwords)  # Function from `classes/sshtools.py`
-        if new_passwd is None:
-            change_passwd = False
-            new_passwd = passwd
-        if passwd is None:
-            print("Correct password was not found!")
-            continue
-        print(f"Password found: {passwd}")
-
-        try:
-            airos = Executor(str(addr), 22, uname, passwd)
-            print(f"Logged in with uname={uname}, passwd={passwd}", SUCCESS)
-        except NoValidConnectionsError:
-            print(f"{addr} not SSH", ERROR)
-            continue
-        except AuthenticationException:
-            raise ValueError(f"Password `{passwd}` is not valid!")
-
-        airos.exec("cp /tmp/system.cfg ~/system.cfg.bak")  # Backup current configuration
-
-        raw_cfg = [x.strip().split("=") for x in airos.read_file("/tmp/system.cfg")]
-        def_cfg = {}
-        for elem in raw_cfg:
-            def_cfg[elem[0]] = elem[1]
-
-        # Main configuration part
-        conf = Configurator(copy.deepcopy(def_cfg))
-        conf.set_dns(Address("91.232.50.10"), Address("91.232.52.10"))
-        conf.set_snmp("local", "test.skryptu.bez.restartu@test.local", "Banino")
-        conf.set_ntp(Address("91.232.52.123"))
-        conf.set_timezone("-1")
-        conf.disable_compliance_test(airos)
-        
-        # Change password
-        if smart_passwords:
-            try:
-                new_passwd = new_passwds[str(addr)]
-            except KeyError:
-                new_passwd = passwd  # Don't change password when device is not in smart-pass dict
-                
-        if change_passwd or smart_passwords:
-            airos.change_password(new_passwd)
-            conf.change_passwd(uname, new_passwd, airos)
-
-        # Convert cfg dictionary into list of strings (for saving into file)
-        new_cfg = conf.cfg
-        new_cfg_lines = [f"{elem_key}={new_cfg[elem_key]}\n" for elem_key in list(new_cfg.keys())]
-
-        if new_cfg_lines != raw_cfg:  # Only upload if any configuration change was made
-            open("local-system.cfg", "w").writelines(new_cfg_lines)  # Save to local file
-            print(f"Trying to upload configuration file with `{new_passwd}` password")
-
-            # Try to upload file over ssh using new password (if changed)
-            if os.system(f'sshpass -p "{new_passwd}" scp -o StrictHostKeyChecking=no -O local-system.cfg {uname}@{str(addr)}:/tmp/system.cfg') == 0:
-                print("Configuration saved!")
-                airos.exec("cfgmtd -w && reboot") if do_restart else airos.exec("cfgmtd -w")
-                print("Configuration applied!")
+    uname: str = args['uname']
+    credentials = CredentialStore(args['credentials']) if args['credentials'] else None
+    fingerprints = FingerprintStore(args['fingerprints']) if args['fingerprints'] else None
+    profile = Profile.load(args['profile']) if args['profile'] else Profile(DEFAULT_PROFILE)
+
+    # Get active devices in network (devices are configured while scan continues)
+    controller = RateController(max_rate=args['scan_rate']) if args['adaptive_scan'] else None
+    store = SnapshotStore(args['snapshots']) if args['snapshots'] else None
+    finder = Finder(Address(args['net_address']), Address(int(args['mask'])), mode=args['scan_mode'], rate=args['scan_rate'],
+                    controller=controller, store=store, known_first=args['known_first'], ttl=args['snapshot_ttl'])
+
+    outcomes = {}  # Result of every found device -- {Address: (outcome, message)}
+
+    # Pipeline: discovery -> SSH port probe -> password search -> configuration,
+    # every stage has its own pool of workers and devices flow between stages as soon as they are ready
+    def ssh_devices():
+        """Yield found devices with open SSH port (all probes run in one event loop while scan continues)."""
+        for port, is_open in iter_scan(finder.iter_found(), [args['port']], concurrency=args['probe_workers']):
+            if is_open:
+                yield port.addr
             else:
-                raise Exception("Error while uploading configuration file!")
-            os.remove("local-system.cfg")
+                outcomes[port.addr] = ("no ssh", "SSH port not open")
+                print(f"{port.addr}: SSH port not open")
+
+    # Search passwords on many devices at once (class from `classes/sshtools.py`)
+    scheduler = PasswordScheduler(uname, passwords, max_connections=args['auth_workers'], max_attempts=args['max_attempts'],
+                                  interval=args['attempt_interval'], store=credentials, port=args['port'])
 
-        airos.close()  # Close current connection
-        CONFIGURED += 1
+    def configure(found: tuple) -> tuple:
+        addr, passwd, transport = found
+        if addr in scheduler.errors:
+            return addr, "no ssh", str(scheduler.errors[addr])
+        if passwd is None:
+            return addr, "no password", "Correct password was not found"
+        if smart_passwords is not None:  # Only devices from file get new password
+            new_passwd = smart_passwords.get(str(addr))
+        else:
+            new_passwd = args['new_password']
+        try:
+            outcome, message = configure_device(addr, uname, passwd, profile.patch_for(addr), transport=transport,
+                                                new_passwd=new_passwd, do_restart=args['do_restart'],
+                                                port=args['port'], fingerprints=fingerprints)
+        except Exception as e:  # One broken device must not stop the others
+            return addr, "error", f"{type(e).__name__}: {e}"
+        if credentials is not None and new_passwd is not None and outcome == "configured":
+            credentials.remember(addr, new_passwd, mac=get_mac(addr))  # Not a hit, it was not found by search
+        return addr, outcome, message
+
+    for addr, outcome, message in imap_unordered(configure, scheduler.run(ssh_devices()), args['config_workers']):
+        outcomes[addr] = (outcome, message)
+        print(f"{addr}: {outcome} ({message})")
+        if credentials is not None:
+            credentials.save()
+        if fingerprints is not None:
+            fingerprints.save()
+
+    if controller is not None:
+        print(f"Scan concurrency: {controller}")
+    if store is not None and finder.previous is not None:
+        appeared, disappeared = finder.diff()
+        print(f"Since last scan: {len(appeared)} new devices, {len(disappeared)} gone")
+        for addr in appeared:
+            print(f"  + {addr}")
+        for addr in disappeared:
+            print(f"  - {addr}")
+
+    if not finder.found:
+        print("No devices in network!")
+        exit(0)
 
-print(f"Successfully configured {CONFIGURED} devices!")
+    # Summary of every device
+    print("Summary", "=" * 25)
+    for addr in sorted(outcomes):
+        outcome, message = outcomes[addr]
+        print(f"{str(addr):<15} {outcome:<12} {message}")
+    counts = {}
+    for outcome, _ in outcomes.values():
+        counts[outcome] = counts.get(outcome, 0) + 1
+    print(", ".join(f"{outcome}: {count}" for outcome, count in sorted(counts.items())))
+    print(f"Successfully configured {counts.get('configured', 0)} devices!")
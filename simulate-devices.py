@@ -0,0 +1,52 @@
+##############################################
+# Local Simulator of Ubiquiti Devices (load testing)
+# Author: MattTheCoder-W
+##############################################
+
+import time
+from argparse import ArgumentParser
+
+from classes.simulator import Simulator
+
+parser = ArgumentParser(description="Run simulated airOS devices on loopback addresses for testing scripts without real hardware.")
+parser.add_argument("count", type=int, help="Number of simulated devices")
+parser.add_argument("--first", type=str, default="127.0.0.2", help="Address of first device, next devices get following addresses")
+parser.add_argument("--port", type=int, default=2222, help="SSH port of all devices (0 = separate free port for every device)")
+parser.add_argument("--uname", type=str, default="ubnt", help="User name on devices")
+parser.add_argument("--passwords", type=str, default="ubnt", help="Passwords of devices (space separated, assigned in turn)")
+parser.add_argument("--latency", type=float, default=0.0, help="Delay in seconds added to every login attempt and command")
+parser.add_argument("--jitter", type=float, default=0.0, help="Random extra delay up to given number of seconds")
+parser.add_argument("--loss", type=float, default=0.0, help="Probability of dropping new connection (0-1)")
+parser.add_argument("--auth-methods", type=str, default="password", help="Allowed authentication methods (password,keyboard-interactive)")
+parser.add_argument("--auth-delay", type=float, default=0.0, help="Delay in seconds after failed login")
+parser.add_argument("--max-auth-tries", type=int, default=10, help="Failed logins after which connection is closed")
+parser.add_argument("--time-scale", type=float, default=1.0, help="Multiplier of `sleep` durations (e.g. 0.001 makes scheduled reboots happen quickly)")
+parser.add_argument("--reboot-time", type=float, default=0.0, help="Seconds in which rebooting device refuses connections")
+args = vars(parser.parse_args())
+
+simulator = Simulator(args['count'], first=args['first'], port=args['port'], uname=args['uname'],
+                      passwords=args['passwords'].split(" "), latency=args['latency'], jitter=args['jitter'],
+                      loss=args['loss'], auth_methods=args['auth_methods'], auth_delay=args['auth_delay'],
+                      max_auth_tries=args['max_auth_tries'], time_scale=args['time_scale'],
+                      reboot_time=args['reboot_time'])
+simulator.start()
+first, last = simulator.devices[0], simulator.devices[-1]
+print(f"Simulating {len(simulator.devices)} devices: {first.addr}:{first.port} - {last.addr}:{last.port}")
+print("Press Ctrl+C to stop and print statistics")
+
+try:
+    while True:
+        time.sleep(1)
+except KeyboardInterrupt:
+    pass
+finally:
+    simulator.stop()
+
+# Statistics of every device that was used
+print("Statistics", "=" * 25)
+for device in simulator.devices:
+    if device.logins or device.failed_logins:
+        print(f"{str(device.addr):<15} logins: {device.logins}, failed: {device.failed_logins}, "
+              f"commands: {device.execs}, reboots: {device.reboots}")
+print(f"Total: {sum(d.logins for d in simulator.devices)} logins, {sum(d.failed_logins for d in simulator.devices)} failed, "
+      f"{sum(d.execs for d in simulator.devices)} commands, {sum(d.reboots for d in simulator.devices)} reboots")